@@ -3,35 +3,291 @@
 # A program to recommend crops to farmers based on location and environmental parameters
 
 import os
-import json
 import csv
+import heapq
+import io
+import re
+import threading
+from collections import OrderedDict
 from datetime import datetime
-from location_data import LocationManager
+from file_utils import atomic_write
+from crop_catalog import Crop, WaterNeeds, load_catalog, read_crop_rows
+
+# Sort position of each water-needs level when rainfall is high or low; anything else sorts last
+WATER_RANKS = {
+    "high": {WaterNeeds.HIGH: 0, WaterNeeds.MEDIUM: 1},
+    "low": {WaterNeeds.LOW: 0, WaterNeeds.MEDIUM: 1}
+}
+
+# Set bits _iter_bits peels off one at a time before it scans the rest byte by byte
+SPARSE_BITS = 64
+
+_NONZERO_BYTE = re.compile(rb"[^\x00]")
+# Offsets of the set bits of every byte value, lowest first
+_BYTE_BITS = [tuple(offset for offset in range(8) if value >> offset & 1) for value in range(256)]
+
+def _iter_bits(bits):
+    """Yield the positions of the set bits of an integer bitset in ascending order."""
+    # A query matching a few crops costs a few integer operations per match
+    # this way, instead of a string as long as the catalog
+    for _ in range(SPARSE_BITS):
+        if not bits:
+            return
+        lowest = bits & -bits
+        yield lowest.bit_length() - 1
+        bits ^= lowest
+    # Each peel copies the whole bitset, so scan a dense one in one pass,
+    # skipping empty bytes in C
+    data = bits.to_bytes((bits.bit_length() + 7) // 8, "little")
+    for match in _NONZERO_BYTE.finditer(data):
+        index = match.start()
+        for offset in _BYTE_BITS[data[index]]:
+            yield index * 8 + offset
 
 class AgriWiz:
-    def __init__(self):
-        self.crop_data = []
-        self.location_manager = LocationManager()
-        self.load_crop_data()
+    # Comma-separated crop attributes that are matched against query parameters
+    INDEXED_ATTRIBUTES = ("soil_types", "climates", "seasons", "humidity_preference", "soil_fertility")
+    
+    # Default weight of each parameter when scoring partial matches
+    MATCH_WEIGHTS = {
+        "soil_types": 1.0,
+        "climates": 1.0,
+        "seasons": 1.0,
+        "humidity_preference": 1.0,
+        "soil_fertility": 1.0
+    }
+
+    # Column order of the crop CSV file
+    CROP_FIELDS = ["crop_name", "soil_types", "climates", "seasons", "water_needs", "humidity_preference", "soil_fertility"]
+    
+    # Number of appended rows after which the CSV file is rewritten in full
+    COMPACT_AFTER_APPENDS = 1000
+    
+    # Maximum number of distinct queries kept in the recommendation cache
+    RECOMMENDATION_CACHE_SIZE = 32768
+    
+    # Humidity and soil fertility values precomputed by the location view ("" = not provided)
+    LOCATION_VIEW_LEVELS = ("", "low", "medium", "high")
+    
+    # Seasons get_current_season can fall back to
+    CALENDAR_SEASONS = ("winter", "spring", "summer", "fall")
+    
+    def __init__(self, storage=None):
+        self._catalog = None  # Crops and their index once loaded, see _install_index
+        self._catalog_lock = threading.RLock()
+        self.crop_file = "crop_data.csv"
+        self.catalog_file = "crop_data.bin"  # Optional compiled copy, see crop_catalog.py
+        self.storage = storage  # Optional Storage backend (see storage.py) used instead of the files
+        self._appends_since_compaction = 0
+        self._recommendation_cache = OrderedDict()
+        self._alternatives_cache = OrderedDict()  # Same capacity and invalidation as the recommendation cache
+        self._cache_lock = threading.Lock()
+        self.cache_stats = {"hits": 0, "misses": 0, "evictions": 0}
+        self._cache_generation = 0
+        self._location_view = None  # See build_location_view
+        self._location_view_lock = threading.Lock()
+        self._location_view_generation = 0
+        self._location_manager = None  # Loaded on first use, see location_manager
+        self._location_manager_lock = threading.Lock()
+        # A storage backend answers get_recommendations in SQL until something
+        # needs the whole catalog, which is then loaded (see _loaded_catalog)
+        if storage is None:
+            self.load_crop_data()
+    
+    @property
+    def location_manager(self):
+        """The LocationManager, loading the location database the first time it is needed."""
+        if self._location_manager is None:
+            with self._location_manager_lock:
+                if self._location_manager is None:
+                    from location_data import LocationManager
+                    location_manager = LocationManager(self.storage)
+                    location_manager.change_listeners.append(self._update_location_view)
+                    self._location_manager = location_manager
+        return self._location_manager
+    
+    def _loaded_catalog(self):
+        """The catalog tuple (see _install_index), loading the crops on first use."""
+        catalog = self._catalog
+        if catalog is None:
+            with self._catalog_lock:
+                if self._catalog is None:
+                    self.load_crop_data()
+                catalog = self._catalog
+        return catalog
+    
+    @property
+    def crop_data(self):
+        """The Crop records, loaded on first use; assigning a new list indexes it (see _install_index)."""
+        return self._loaded_catalog()[0]
+    
+    @crop_data.setter
+    def crop_data(self, crops):
+        self._build_index(crops)
+    
+    @property
+    def _index(self):
+        """Inverted index of crop_data: attribute -> value -> bitset of crop ids."""
+        return self._loaded_catalog()[1]
+        
+    def load_crop_data(self, repair=True):
+        """
+        Load crop data from the compiled catalog if it is current, else from the CSV file.
         
-    def load_crop_data(self):
-        """Load crop data from the CSV file."""
+        Args:
+            repair: Rewrite the CSV file when its last row is torn. Callers
+                that may only read the file pass False and repair it later
+                with save_crop_data.
+                
+        Returns:
+            True if the CSV file has a torn last row that was left in place
+        """
         try:
-            if os.path.exists("crop_data.csv"):
-                with open("crop_data.csv", "r") as file:
-                    reader = csv.DictReader(file)
-                    self.crop_data = list(reader)
-                print(f"Loaded {len(self.crop_data)} crops from database.")
+            if self.storage is not None:
+                crops = self.storage.load_crops()
+                if crops:
+                    self.crop_data = crops
+                    print(f"Loaded {len(crops)} crops from {self.storage}.")
+                else:
+                    print("Crop database is empty. Creating sample data.")
+                    self.create_sample_data()
+                return
+            
+            catalog = load_catalog(self.catalog_file, self.crop_file)
+            if catalog is not None:
+                # Rows are decoded from the open catalog when accessed
+                crops = catalog.records()
+                self._install_index(crops, catalog.value_bitsets(), catalog.missing_bitsets())
+                print(f"Loaded {len(crops)} crops from compiled catalog.")
+                return
+            
+            if os.path.exists(self.crop_file):
+                rows, extra, torn = read_crop_rows(self.crop_file)
+                if extra:
+                    print(f"Ignoring extra columns in {self.crop_file}: {', '.join(extra)}")
+                self.crop_data = [Crop.from_dict(row) for row in rows]
+                print(f"Loaded {len(rows)} crops from database.")
+                if torn and repair:
+                    print(f"Discarding incomplete last row in {self.crop_file}.")
+                    self.save_crop_data()
+                return torn and not repair
             else:
                 print("Crop database not found. Creating sample data.")
                 self.create_sample_data()
         except Exception as e:
-            print(f"Error loading crop data: {e}")
-            self.create_sample_data()
+            # Never replace a file that could not be read with sample data
+            print(f"Error loading crop data: {e}. Using sample data; {self.crop_file} was left unchanged.")
+            self.create_sample_data(save=False)
+    
+    def _build_index(self, crops=None):
+        """
+        Compile a list of crops (crop_data by default) into an inverted index
+        and install both.
+        
+        For every indexed attribute, each normalized value maps to a bitset
+        (a Python int) with bit i set when crop i lists that value. Crops
+        that lack an optional attribute are tracked in a separate bitset
+        because they match any value for it.
+        """
+        if crops is None:
+            crops = self.crop_data
+        count = len(crops)
+        size = count // 8 + 1
+        bitmaps = {attr: {} for attr in self.INDEXED_ATTRIBUTES}
+        missing = {attr: bytearray(size) for attr in self.INDEXED_ATTRIBUTES}
+        
+        for crop_id, crop in enumerate(crops):
+            byte, mask = crop_id >> 3, 1 << (crop_id & 7)
+            for attr in self.INDEXED_ATTRIBUTES:
+                values = crop.value_set(attr)
+                if values is None:
+                    missing[attr][byte] |= mask
+                    continue
+                for value in values:
+                    bitmap = bitmaps[attr].get(value)
+                    if bitmap is None:
+                        bitmap = bitmaps[attr][value] = bytearray(size)
+                    bitmap[byte] |= mask
+        
+        # Bytearrays keep the build linear; queries use plain int bitsets
+        self._install_index(
+            crops,
+            {attr: {value: int.from_bytes(bitmap, "little") for value, bitmap in values.items()}
+             for attr, values in bitmaps.items()},
+            {attr: int.from_bytes(bitmap, "little") for attr, bitmap in missing.items()}
+        )
+    
+    def _install_index(self, crops, index, missing):
+        """
+        Swap in a list of crops together with its inverted index.
+        
+        The crops, the index, the bitsets of crops missing each optional
+        attribute and the bitset of all crops form one tuple, replaced in a
+        single assignment, so a query running on another thread reads
+        either the old catalog or the new one, never a mix of both.
+        """
+        self._catalog = (crops, index, missing, (1 << len(crops)) - 1)
+        self._encoded_table = None
+        self.clear_recommendation_cache()
+        self._update_location_view(None)
+    
+    def _index_crop(self, crop_id, crop):
+        """Add a single crop to the inverted index."""
+        crops, index, missing, all_crops = self._catalog
+        bit = 1 << crop_id
+        for attr in self.INDEXED_ATTRIBUTES:
+            values = crop.value_set(attr)
+            if values is None:
+                missing[attr] |= bit
+                continue
+            for value in values:
+                index[attr][value] = index[attr].get(value, 0) | bit
+        self._catalog = (crops, index, missing, all_crops | bit)
+        self._encoded_table = None
+        self.clear_recommendation_cache()
+        self._add_crop_to_location_view(crop)
+    
+    def _encode_crop_table(self, catalog):
+        """
+        Encode a catalog's inverted index as NumPy lookup tables for batch queries.
+        
+        Each attribute gets a (values + 2) x crops boolean table: one row per
+        known value, then a row for unknown values and a row for "not
+        provided". Optional attributes also match crops that lack them.
+        """
+        import numpy as np
+        
+        crops, index, missing_bits, _ = catalog
+        count = len(crops)
+        size = (count + 7) // 8
+        
+        def bitset_row(bits):
+            # Through bytes, since the bitsets are wider than a C long past 63 crops
+            packed = np.frombuffer(bits.to_bytes(size, "little"), dtype=np.uint8)
+            return np.unpackbits(packed, count=count, bitorder="little").astype(bool)
+        
+        tables = {}
+        for attr in self.INDEXED_ATTRIBUTES:
+            values = index[attr]
+            optional = attr in ("humidity_preference", "soil_fertility")
+            missing = missing_bits[attr] if optional else 0
+            rows = [bitset_row(bits | missing) for bits in values.values()]
+            rows.append(bitset_row(missing))        # unknown value
+            rows.append(np.ones(count, dtype=bool))  # not provided
+            tables[attr] = ({value: code for code, value in enumerate(values)}, np.vstack(rows))
+        
+        # Water-needs rank per rainfall code: 0 = no ordering, 1 = high, 2 = low
+        ranks = np.zeros((3, count), dtype=np.int64)
+        for crop_id, crop in enumerate(crops):
+            ranks[1, crop_id] = WATER_RANKS["high"].get(crop.water, 2)
+            ranks[2, crop_id] = WATER_RANKS["low"].get(crop.water, 2)
+        
+        self._encoded_table = (catalog, tables, ranks)
+        return self._encoded_table
     
-    def create_sample_data(self):
-        """Create sample crop data if no data file exists."""
-        self.crop_data = [
+    def create_sample_data(self, save=True):
+        """Create sample crop data if no data file exists (and save it unless save is False)."""
+        crops = [
             {"crop_name": "Rice", "soil_types": "clay,loamy,alluvial", "climates": "tropical,subtropical", "seasons": "summer,rainy", "water_needs": "high", "humidity_preference": "high", "soil_fertility": "medium,high"},
             {"crop_name": "Wheat", "soil_types": "loamy,sandy loam,alluvial", "climates": "temperate,subtropical", "seasons": "winter,spring", "water_needs": "medium", "humidity_preference": "low,medium", "soil_fertility": "medium,high"},
             {"crop_name": "Corn", "soil_types": "loamy,sandy,alluvial", "climates": "temperate,subtropical", "seasons": "summer", "water_needs": "medium", "humidity_preference": "medium", "soil_fertility": "medium,high"},
@@ -64,62 +320,340 @@ class AgriWiz:
             {"crop_name": "Cardamom", "soil_types": "loamy,forest", "climates": "tropical", "seasons": "rainy", "water_needs": "high", "humidity_preference": "high", "soil_fertility": "high"},
             {"crop_name": "Black Pepper", "soil_types": "loamy,forest", "climates": "tropical", "seasons": "rainy", "water_needs": "high", "humidity_preference": "high", "soil_fertility": "medium,high"}
         ]
-        self.save_crop_data()
+        self.crop_data = [Crop.from_dict(crop) for crop in crops]
+        if save:
+            self.save_crop_data()
     
     def save_crop_data(self):
-        """Save crop data to CSV file."""
+        """Save crop data to the storage backend, or to the CSV file, replacing it atomically."""
         try:
-            with open("crop_data.csv", "w", newline="") as file:
-                fieldnames = ["crop_name", "soil_types", "climates", "seasons", "water_needs", "humidity_preference", "soil_fertility"]
-                writer = csv.DictWriter(file, fieldnames=fieldnames)
-                writer.writeheader()
-                writer.writerows(self.crop_data)
+            if self.storage is not None:
+                self.storage.save_crops(self.crop_data)
+            else:
+                with atomic_write(self.crop_file, "w", newline="") as file:
+                    writer = csv.DictWriter(file, fieldnames=self.CROP_FIELDS)
+                    writer.writeheader()
+                    writer.writerows(crop.to_dict() for crop in self.crop_data)
+            self._appends_since_compaction = 0
             print("Crop data saved successfully.")
         except Exception as e:
             print(f"Error saving crop data: {e}")
     
+    def compact_crop_data(self):
+        """Rewrite the CSV file from memory, folding in all appended rows."""
+        self.save_crop_data()
+    
+    def _append_crop_data(self, crops):
+        """Append rows to the CSV file instead of rewriting it."""
+        if self.storage is not None:
+            try:
+                self.storage.append_crops(crops)
+            except Exception as e:
+                print(f"Error saving crop data: {e}")
+            return
+        if not os.path.exists(self.crop_file):
+            self.save_crop_data()
+            return
+        try:
+            with open(self.crop_file, "rb+") as file:
+                # A crash mid-append can leave a torn last row; start on a fresh line
+                file.seek(0, os.SEEK_END)
+                if file.tell() > 0:
+                    file.seek(-1, os.SEEK_END)
+                    if file.read(1) not in (b"\n", b"\r"):
+                        file.write(b"\r\n")
+            # Render the batch first so it reaches the file in a single write
+            buffer = io.StringIO()
+            csv.DictWriter(buffer, fieldnames=self.CROP_FIELDS).writerows(crop.to_dict() for crop in crops)
+            with open(self.crop_file, "a", newline="") as file:
+                file.write(buffer.getvalue())
+                file.flush()
+                os.fsync(file.fileno())
+            self._appends_since_compaction += len(crops)
+        except Exception as e:
+            print(f"Error saving crop data: {e}")
+            return
+        
+        if self._appends_since_compaction >= self.COMPACT_AFTER_APPENDS:
+            self.compact_crop_data()
+    
     def add_crop(self, crop_data):
-        """Add a new crop to the database."""
+        """Add a new crop (a crop row dict or Crop) to the database."""
+        crop_data = Crop.from_dict(crop_data)
         self.crop_data.append(crop_data)
-        self.save_crop_data()
+        self._index_crop(len(self.crop_data) - 1, crop_data)
+        self._append_crop_data([crop_data])
         print(f"Added {crop_data['crop_name']} to the database.")
     
+    def add_crops_bulk(self, crops):
+        """
+        Add many crops to the database, writing them to disk in one batch.
+        
+        Returns the number of crops added.
+        """
+        crops = [Crop.from_dict(crop) for crop in crops]
+        if not crops:
+            return 0
+        
+        start = len(self.crop_data)
+        self.crop_data.extend(crops)
+        if len(crops) > len(self.crop_data) // 4:
+            self._build_index()  # Cheaper than indexing a large batch one crop at a time
+        else:
+            for crop_id, crop in enumerate(crops, start):
+                self._index_crop(crop_id, crop)
+        self._append_crop_data(crops)
+        print(f"Added {len(crops)} crops to the database.")
+        return len(crops)
+    
+    def clear_recommendation_cache(self):
+        """Drop all cached recommendation results (called whenever the catalog changes)."""
+        with self._cache_lock:
+            self._recommendation_cache.clear()
+            self._alternatives_cache.clear()
+            self._cache_generation += 1
+    
+    def get_cache_stats(self):
+        """Get hit/miss/eviction counters and the current size of the recommendation cache."""
+        with self._cache_lock:
+            return dict(self.cache_stats, size=len(self._recommendation_cache),
+                        capacity=self.RECOMMENDATION_CACHE_SIZE)
+    
+    def warm_recommendation_cache(self, levels=("", "low", "medium", "high")):
+        """
+        Precompute recommendations for every known soil type, climate and season
+        combined with each rainfall, humidity and soil fertility level.
+        
+        Returns the number of queries computed. Combinations beyond the cache
+        capacity evict the least recently used ones, as usual.
+        """
+        count = 0
+        for soil_type in self._index["soil_types"]:
+            for climate in self._index["climates"]:
+                for season in self._index["seasons"]:
+                    for rainfall in levels:
+                        for humidity in levels:
+                            for soil_fertility in levels:
+                                self.get_recommendations(soil_type, climate, season, rainfall, humidity, soil_fertility)
+                                count += 1
+        return count
+    
     def get_recommendations(self, soil_type, climate, season, rainfall=None, humidity=None, soil_fertility=None):
         """Get crop recommendations based on input parameters."""
-        recommendations = []
-        
-        for crop in self.crop_data:
-            # Core parameters (required matches)
-            soil_match = any(s.strip().lower() == soil_type.lower() 
-                            for s in crop["soil_types"].split(","))
-            climate_match = any(c.strip().lower() == climate.lower() 
-                              for c in crop["climates"].split(","))
-            season_match = any(s.strip().lower() == season.lower() 
-                             for s in crop["seasons"].split(","))
-            
-            # Optional parameters (if provided)
-            humidity_match = True
-            if humidity and "humidity_preference" in crop:
-                humidity_match = any(h.strip().lower() == humidity.lower() 
-                                  for h in crop["humidity_preference"].split(","))
-            
-            soil_fertility_match = True
-            if soil_fertility and "soil_fertility" in crop:
-                soil_fertility_match = any(f.strip().lower() == soil_fertility.lower() 
-                                        for f in crop["soil_fertility"].split(","))
-            
-            if soil_match and climate_match and season_match and humidity_match and soil_fertility_match:
-                recommendations.append(crop)
+        # Results are memoized on the normalized query; empty and None optional
+        # parameters are equivalent
+        key = tuple((value or "").strip().lower()
+                    for value in (soil_type, climate, season, rainfall, humidity, soil_fertility))
+        
+        with self._cache_lock:
+            cached = self._recommendation_cache.get(key)
+            if cached is not None:
+                self._recommendation_cache.move_to_end(key)
+                self.cache_stats["hits"] += 1
+                return list(cached)
+            self.cache_stats["misses"] += 1
+            generation = self._cache_generation
+        
+        recommendations = self._match_recommendations(*key)
+        
+        with self._cache_lock:
+            # Don't store a result computed against a catalog that has since changed
+            if generation != self._cache_generation:
+                return recommendations
+            self._recommendation_cache[key] = tuple(recommendations)
+            if len(self._recommendation_cache) > self.RECOMMENDATION_CACHE_SIZE:
+                self._recommendation_cache.popitem(last=False)
+                self.cache_stats["evictions"] += 1
+        
+        return recommendations
+    
+    def _match_recommendations(self, soil_type, climate, season, rainfall, humidity, soil_fertility):
+        """Match crops against normalized (stripped, lowercase) query parameters."""
+        catalog = self._catalog
+        if catalog is None:
+            # Not loaded: the storage backend runs the same query in SQL
+            return self.storage.get_recommendations(soil_type, climate, season, rainfall, humidity, soil_fertility)
+        crops, index, missing, matches = catalog
+        
+        # Core parameters (required matches)
+        matches &= index["soil_types"].get(soil_type, 0)
+        matches &= index["climates"].get(climate, 0)
+        matches &= index["seasons"].get(season, 0)
+        
+        # Optional parameters (if provided); crops without the attribute still match
+        if humidity:
+            matches &= index["humidity_preference"].get(humidity, 0) | missing["humidity_preference"]
+        if soil_fertility:
+            matches &= index["soil_fertility"].get(soil_fertility, 0) | missing["soil_fertility"]
+        
+        recommendations = [crops[crop_id] for crop_id in _iter_bits(matches)]
         
         # Sort by water needs based on rainfall if provided
-        if rainfall and recommendations:
-            if rainfall.lower() == "high":
-                recommendations.sort(key=lambda x: 0 if x["water_needs"] == "high" else (1 if x["water_needs"] == "medium" else 2))
-            elif rainfall.lower() == "low":
-                recommendations.sort(key=lambda x: 0 if x["water_needs"] == "low" else (1 if x["water_needs"] == "medium" else 2))
+        if rainfall in WATER_RANKS and recommendations:
+            ranks = WATER_RANKS[rainfall]
+            recommendations.sort(key=lambda crop: ranks.get(crop.water, 2))
         
         return recommendations
 
+    def get_alternatives(self, soil_type, climate, season, humidity=None, soil_fertility=None,
+                         top_k=5, min_match=60, weights=None):
+        """
+        Rank crops that only partially match the input parameters.
+        
+        Every matching parameter adds its weight to a crop's score. The match
+        percentage is that score divided by the total weight of the parameters
+        that apply to the crop: the three core ones, plus humidity and soil
+        fertility when they are provided and the crop lists them.
+        
+        Args:
+            top_k: Maximum number of alternatives to return (None for all)
+            min_match: Minimum match percentage for a crop to be considered
+            weights: Optional dict overriding MATCH_WEIGHTS per attribute
+            
+        Returns:
+            List of (crop, score, match_percentage) tuples, best match first
+        """
+        weights = dict(self.MATCH_WEIGHTS, **(weights or {}))
+        soil_type, climate, season, humidity, soil_fertility = (
+            (value or "").strip().lower() for value in (soil_type, climate, season, humidity, soil_fertility))
+        key = (soil_type, climate, season, humidity, soil_fertility, top_k, min_match, tuple(sorted(weights.items())))
+        
+        with self._cache_lock:
+            cached = self._alternatives_cache.get(key)
+            if cached is not None:
+                self._alternatives_cache.move_to_end(key)
+                return list(cached)
+            generation = self._cache_generation
+        
+        alternatives = self._rank_alternatives(soil_type, climate, season, humidity, soil_fertility,
+                                               top_k, min_match, weights)
+        
+        with self._cache_lock:
+            if generation == self._cache_generation:
+                self._alternatives_cache[key] = tuple(alternatives)
+                if len(self._alternatives_cache) > self.RECOMMENDATION_CACHE_SIZE:
+                    self._alternatives_cache.popitem(last=False)
+        return alternatives
+    
+    def _rank_alternatives(self, soil_type, climate, season, humidity, soil_fertility, top_k, min_match, weights):
+        """Score and rank partial matches for normalized query parameters (see get_alternatives)."""
+        crops, index, missing, all_crops = self._loaded_catalog()
+        
+        query = [("soil_types", soil_type), ("climates", climate), ("seasons", season)]
+        full_weight = sum(weights[attr] for attr, _ in query)
+        if humidity:
+            query.append(("humidity_preference", humidity))
+        if soil_fertility:
+            query.append(("soil_fertility", soil_fertility))
+        
+        # Accumulate weighted scores from the precomputed attribute bitsets
+        scores = {}
+        candidates = 0
+        reduced_weight = {}
+        for attr, value in query:
+            bits = index[attr].get(value, 0)
+            candidates |= bits
+            for crop_id in _iter_bits(bits):
+                scores[crop_id] = scores.get(crop_id, 0) + weights[attr]
+            if attr in ("humidity_preference", "soil_fertility"):
+                full_weight += weights[attr]
+                # Crops without this attribute are scored as if it was not asked for
+                for crop_id in _iter_bits(missing[attr]):
+                    reduced_weight[crop_id] = reduced_weight.get(crop_id, 0) + weights[attr]
+        
+        alternatives = []
+        for crop_id in _iter_bits(candidates if min_match > 0 else all_crops):
+            score = scores.get(crop_id, 0)
+            total_weight = full_weight - reduced_weight.get(crop_id, 0)
+            match_percentage = (score / total_weight) * 100 if total_weight else 0
+            if match_percentage >= min_match:
+                alternatives.append((crops[crop_id], score, match_percentage))
+        
+        # Ties keep catalog order, as with a stable descending sort
+        if top_k is None:
+            return sorted(alternatives, key=lambda x: x[2], reverse=True)
+        return heapq.nlargest(top_k, alternatives, key=lambda x: x[2])
+    
+    def get_recommendations_batch(self, soil_types, climates, seasons, rainfall=None, humidity=None, soil_fertility=None):
+        """
+        Get crop recommendations for many parcels at once (requires NumPy).
+        
+        Args:
+            soil_types, climates, seasons: Sequences with one value per parcel
+            rainfall, humidity, soil_fertility: Optional sequences of the same
+                length; None or an empty string means "not provided" for that parcel
+                
+        Returns:
+            Tuple (matches, order):
+                - matches: bool array (parcels x crops), True where a crop suits a parcel
+                - order: int array (parcels x crops) of crop ids; the first
+                  matches[i].sum() entries of row i are the crops that
+                  get_recommendations returns for parcel i, in the same order
+        """
+        return self._recommendations_batch(self._loaded_catalog(), soil_types, climates, seasons, rainfall, humidity, soil_fertility)
+    
+    def _recommendations_batch(self, catalog, soil_types, climates, seasons, rainfall, humidity, soil_fertility):
+        """get_recommendations_batch against a given catalog tuple (see _install_index)."""
+        import numpy as np
+        
+        encoded = self._encoded_table
+        if encoded is None or encoded[0] is not catalog:
+            encoded = self._encode_crop_table(catalog)
+        _, tables, ranks = encoded
+        count = len(catalog[0])
+        parcels = len(soil_types)
+        
+        def encode(values, lookup, optional):
+            # Normalize each distinct value once, then map every parcel through the memo
+            if values is None:
+                return np.full(parcels, len(lookup) + 1, dtype=np.intp)
+            memo = {}
+            for value in set(values):
+                if optional and not value:
+                    memo[value] = len(lookup) + 1
+                else:
+                    memo[value] = lookup.get(str(value or "").strip().lower(), len(lookup))
+            return np.fromiter(map(memo.__getitem__, values), dtype=np.intp, count=parcels)
+        
+        # Parcels that share every parameter share a result, so evaluate each
+        # distinct combination once and broadcast it back to the parcels
+        columns = (("soil_types", soil_types), ("climates", climates), ("seasons", seasons),
+                   ("humidity_preference", humidity), ("soil_fertility", soil_fertility))
+        combined = np.zeros(parcels, dtype=np.int64)
+        for attr, values in columns:
+            lookup, table = tables[attr]
+            combined = combined * len(table) + encode(values, lookup, attr in ("humidity_preference", "soil_fertility"))
+        
+        rainfall_codes = np.zeros(parcels, dtype=np.intp)
+        if rainfall is not None:
+            levels = {"high": 1, "low": 2}
+            memo = {value: levels.get(str(value or "").strip().lower(), 0) for value in set(rainfall)}
+            rainfall_codes = np.fromiter(map(memo.__getitem__, rainfall), dtype=np.intp, count=parcels)
+        combined = combined * 3 + rainfall_codes
+        
+        combinations, inverse = np.unique(combined, return_inverse=True)
+        inverse = inverse.reshape(-1)
+        
+        # Decode the combination keys back into per-attribute codes
+        rainfall_codes = combinations % 3
+        remainder = combinations // 3
+        unique_matches = np.ones((len(combinations), count), dtype=bool)
+        for attr, _ in reversed(columns):
+            table = tables[attr][1]
+            unique_matches &= table[remainder % len(table)]
+            remainder //= len(table)
+        
+        # Rank matched crops by water needs, keeping catalog order for ties and
+        # pushing non-matching crops behind every match
+        crop_ids = np.arange(count, dtype=np.int64)
+        keys = np.where(unique_matches, ranks[rainfall_codes] * count + crop_ids, 3 * count + crop_ids)
+        unique_order = np.argsort(keys.astype(np.int32) if 4 * count < 2 ** 31 else keys, axis=1)
+        
+        matches = unique_matches[inverse]
+        order = unique_order[inverse]
+        
+        return matches, order
+    
     def get_current_season(self):
         """Determine current season based on month."""
         month = datetime.now().month
@@ -132,36 +666,44 @@ class AgriWiz:
         else:  # months 9, 10, 11
             return "fall"
             
+    def _location_query(self, location_info):
+        """Soil type, climate, rainfall and humidity that recommendations for a location are based on."""
+        soil_types = location_info.get("common_soil_types")
+        soil_type = soil_types[0] if soil_types else "loamy"
+        return soil_type, location_info.get("climate"), location_info.get("rainfall"), location_info.get("humidity")
+    
     def get_recommendations_by_location(self, location_name, humidity=None, soil_fertility=None):
         """Get crop recommendations based on location and additional parameters."""
-        location_info = self.location_manager.get_location_info(location_name)
+        location_key = self.location_manager.resolve_location(location_name)
+        location_info = self.location_manager.location_data.get(location_key) if location_key else None
         
         if not location_info:
             return None, "Location not found in database"
         
         # Get current season for location
-        current_month = datetime.now().strftime("%B").lower()
-        current_season = None
-        
-        for season, months in location_info["seasons"].items():
-            if current_month in months:
-                current_season = season
-                break
+        current_season = self.location_manager.season_for(location_key)
         
         if not current_season:
             current_season = self.get_current_season()
         
         # Get recommendations based on location data
-        soil_type = location_info["common_soil_types"][0] if location_info["common_soil_types"] else "loamy"
-        climate = location_info["climate"]
-        rainfall = location_info["rainfall"]
+        soil_type, climate, rainfall, location_humidity = self._location_query(location_info)
         
         # Get humidity from location if available and not provided
-        location_humidity = location_info.get("humidity", None)
         if humidity is None and location_humidity:
             humidity = location_humidity
         
-        recommendations = self.get_recommendations(soil_type, climate, current_season, rainfall, humidity, soil_fertility)
+        # A dictionary read when the materialized view covers the query
+        view = self._location_view
+        materialized = view.get(location_key) if view is not None else None
+        recommendations = None
+        if materialized is not None:
+            slot = tuple((value or "").strip().lower() for value in (current_season, humidity, soil_fertility))
+            recommendations = materialized[1].get(slot)
+        if recommendations is not None:
+            recommendations = list(recommendations)
+        else:
+            recommendations = self.get_recommendations(soil_type, climate, current_season, rainfall, humidity, soil_fertility)
         
         return recommendations, {
             "soil_type": soil_type,
@@ -171,13 +713,302 @@ class AgriWiz:
             "humidity": humidity,
             "soil_fertility": soil_fertility
         }
+    
+    def build_location_view(self, background=False):
+        """
+        Materialize get_recommendations_by_location for every stored location.
+        
+        For each location the view holds the recommendations for every
+        season it can be in, combined with each LOCATION_VIEW_LEVELS value
+        of humidity and soil fertility, so those queries become dictionary
+        reads. add_crop and add_location update it in place; reloading crops
+        or locations rebuilds it.
+        
+        Args:
+            background: Build in a daemon thread; queries are computed as
+                usual until the view is ready
+                
+        Returns:
+            The thread when background is True, else the number of locations
+        """
+        if background:
+            thread = threading.Thread(target=self.build_location_view, daemon=True)
+            thread.start()
+            return thread
+        try:
+            return self._refresh_location_view()
+        except Exception as e:
+            print(f"Error building location view: {e}")
+            return 0
+    
+    def _materialize_locations(self, location_keys):
+        """Compute the view entries of the given locations in one batch query."""
+        def normalize(value):
+            return (value or "").strip().lower()
+        
+        levels = self.LOCATION_VIEW_LEVELS
+        view, rows, slots = {}, [], []
+        for location_key in location_keys:
+            location_info = self.location_manager.location_data.get(location_key) or {}
+            soil_type, climate, rainfall, humidity = self._location_query(location_info)
+            view[location_key] = ((normalize(soil_type), normalize(climate), normalize(rainfall)), {})
+            
+            seasons = {self.location_manager.season_for(location_key, month) for month in range(1, 13)}
+            seasons = {normalize(season) for season in seasons if season} | set(self.CALENDAR_SEASONS)
+            humidities = set(levels) | {normalize(humidity)}
+            for season in seasons:
+                for humidity_level in humidities:
+                    for fertility_level in levels:
+                        rows.append((soil_type, climate, season, rainfall, humidity_level, fertility_level))
+                        slots.append((location_key, (season, humidity_level, fertility_level)))
+        
+        if rows:
+            catalog = self._loaded_catalog()
+            matches, order = self._recommendations_batch(catalog, *zip(*rows))
+            counts = matches.sum(axis=1)
+            for i, (location_key, slot) in enumerate(slots):
+                view[location_key][1][slot] = tuple(catalog[0][crop_id] for crop_id in order[i, :counts[i]].tolist())
+        return view
+    
+    def _refresh_location_view(self, location_keys=None):
+        """
+        Materialize the given locations (all if None) and install them in the
+        view, starting over if crops or locations changed in the meantime.
+        """
+        while True:
+            with self._location_view_lock:
+                generation = self._location_view_generation
+            keys = self.location_manager.get_all_locations() if location_keys is None else location_keys
+            view = self._materialize_locations(keys)
+            with self._location_view_lock:
+                if generation != self._location_view_generation:
+                    continue
+                if location_keys is None:
+                    self._location_view = view
+                elif self._location_view is not None:
+                    self._location_view.update(view)
+                return len(view)
+    
+    def _update_location_view(self, location_key):
+        """Change listener: recompute one location, or the whole view for None."""
+        with self._location_view_lock:
+            # Restarts a build in progress, which may have missed the change
+            self._location_view_generation += 1
+            active = self._location_view is not None
+            if active and location_key is None:
+                self._location_view = None
+        if active:
+            self._refresh_location_view(None if location_key is None else [location_key])
+    
+    def _add_crop_to_location_view(self, crop):
+        """Insert a newly indexed crop (the last in crop_data) into the view entries it matches."""
+        soil_types, climates, seasons = (crop.value_set(attr) for attr in ("soil_types", "climates", "seasons"))
+        humidity_values, fertility_values = crop.value_set("humidity_preference"), crop.value_set("soil_fertility")
+        with self._location_view_lock:
+            self._location_view_generation += 1
+            if self._location_view is None or not (soil_types and climates and seasons):
+                return
+            for (soil_type, climate, rainfall), entries in self._location_view.values():
+                if soil_type not in soil_types or climate not in climates:
+                    continue
+                for slot, crops in entries.items():
+                    season, humidity, soil_fertility = slot
+                    if (season not in seasons
+                            or (humidity and humidity_values is not None and humidity not in humidity_values)
+                            or (soil_fertility and fertility_values is not None and soil_fertility not in fertility_values)):
+                        continue
+                    # Crops are ordered by water-needs rank, then catalog order, so
+                    # the new crop goes after every crop of equal or better rank
+                    ranks = WATER_RANKS.get(rainfall)
+                    position = len(crops)
+                    if ranks is not None:
+                        rank = ranks.get(crop.water, 2)
+                        position = sum(1 for other in crops if ranks.get(other.water, 2) <= rank)
+                    entries[slot] = crops[:position] + (crop,) + crops[position:]
+
+# Non-interactive subcommands for scripts and cron jobs (python -m agri_wiz <command> --help)
+CLI_COMMANDS = ("recommend", "by-location", "yield", "weather")
+
+def _build_cli_parser():
+    """Argument parser of the non-interactive subcommands."""
+    import argparse
+    
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("--json", action="store_true", help="print the result as JSON")
+    common.add_argument("--verbose", action="store_true", help="show data loading messages on stderr")
+    
+    parser = argparse.ArgumentParser(
+        prog="agri_wiz.py",
+        description="Agri Wiz crop recommendations. Run without arguments for the interactive menu, or with --gui."
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+    
+    recommend = commands.add_parser("recommend", parents=[common], help="recommend crops for given conditions")
+    recommend.add_argument("--soil-type", required=True, help="clay/loamy/sandy/black soil")
+    recommend.add_argument("--climate", required=True, help="tropical/subtropical/temperate")
+    recommend.add_argument("--season", help="summer/winter/rainy/spring/fall (default: the current season)")
+    recommend.add_argument("--rainfall", help="low/medium/high")
+    recommend.add_argument("--humidity", help="low/medium/high")
+    recommend.add_argument("--soil-fertility", help="low/medium/high")
+    
+    by_location = commands.add_parser("by-location", parents=[common], help="recommend crops for a stored location")
+    by_location.add_argument("location", help='location name, e.g. "Punjab, India"')
+    by_location.add_argument("--humidity", help="low/medium/high (default: the location's)")
+    by_location.add_argument("--soil-fertility", help="low/medium/high")
+    
+    estimate = commands.add_parser("yield", parents=[common], help="estimate the yield and revenue of a crop")
+    estimate.add_argument("crop", help="crop name, e.g. Rice")
+    estimate.add_argument("--soil-fertility", default="medium", choices=("low", "medium", "high"))
+    estimate.add_argument("--water-availability", default="medium", choices=("low", "medium", "high"))
+    estimate.add_argument("--climate-match", default="fair", choices=("poor", "fair", "good", "excellent"))
+    estimate.add_argument("--farm-management", type=float, default=0.5, help="0 (poor) to 1 (excellent)")
+    estimate.add_argument("--area", type=float, default=1.0, help="land area in hectares")
+    estimate.add_argument("--price", type=float, help="price per unit, to estimate revenue")
+    
+    weather = commands.add_parser("weather", parents=[common], help="current weather and farming advice for a location")
+    weather.add_argument("location", help='location name, e.g. "Punjab, India"')
+    weather.add_argument("--api-key", help="OpenWeatherMap API key (default: synthetic weather)")
+    return parser
+
+def _crop_lines(crops):
+    """Numbered crop lines as printed by the interactive menu."""
+    return [f"{i}. {crop['crop_name']} (Water needs: {crop['water_needs']}, "
+            f"Humidity: {crop.get('humidity_preference', 'N/A')}, "
+            f"Soil fertility: {crop.get('soil_fertility', 'N/A')})" for i, crop in enumerate(crops, 1)]
+
+def _cli_recommend(args):
+    agri_wiz = AgriWiz()
+    season = args.season or agri_wiz.get_current_season()
+    crops = agri_wiz.get_recommendations(args.soil_type, args.climate, season,
+                                         args.rainfall, args.humidity, args.soil_fertility)
+    result = {"season": season, "recommendations": [crop.to_dict() for crop in crops]}
+    if crops:
+        return result, [f"Found {len(crops)} suitable crops for {season}:"] + _crop_lines(crops)
+    
+    alternatives = agri_wiz.get_alternatives(args.soil_type, args.climate, season, args.humidity, args.soil_fertility)
+    result["alternatives"] = [dict(crop.to_dict(), match_percentage=percentage)
+                              for crop, _, percentage in alternatives]
+    lines = ["No crops match your exact criteria. Consider these alternatives:"]
+    lines += [f"{i}. {crop['crop_name']} - {percentage:.0f}% match"
+              for i, (crop, _, percentage) in enumerate(alternatives, 1)]
+    return result, lines
+
+def _cli_by_location(args):
+    crops, details = AgriWiz().get_recommendations_by_location(args.location, args.humidity, args.soil_fertility)
+    if crops is None:
+        raise LookupError(f"{details}: {args.location}")
+    lines = [f"{name.replace('_', ' ').title()}: {value}" for name, value in details.items() if value]
+    if crops:
+        lines += ["", f"Found {len(crops)} suitable crops:"] + _crop_lines(crops)
+    else:
+        lines += ["", "No crops match this location's conditions."]
+    return {"location": args.location, "conditions": details,
+            "recommendations": [crop.to_dict() for crop in crops]}, lines
+
+def _cli_yield(args):
+    from yield_estimation import YieldEstimator
+    
+    estimator = YieldEstimator()
+    # Accept any capitalization of the crop name
+    crop_name = next((name for name in estimator.base_yields if name.lower() == args.crop.strip().lower()), args.crop)
+    estimate = estimator.estimate_yield(crop_name, {
+        "soil_fertility": args.soil_fertility,
+        "water_availability": args.water_availability,
+        "climate_match": args.climate_match,
+        "farm_management": args.farm_management,
+        "land_area": args.area
+    })
+    if estimate["status"] != "success":
+        raise LookupError(estimate["message"])
+    
+    unit, yield_range = estimate["unit"], estimate["yield_range"]
+    lines = [
+        f"{crop_name} on {args.area:g} ha: {yield_range['expected']:,.2f} {unit} expected "
+        f"({yield_range['low']:,.2f} - {yield_range['high']:,.2f})",
+        f"Yield per hectare: {estimate['yield_per_hectare']:,.2f} {unit}"
+    ]
+    result = {"yield": estimate}
+    if args.price is not None:
+        revenue = estimator.estimate_revenue(estimate, args.price)
+        revenue_range = revenue["revenue_range"]
+        lines.append(f"Expected revenue: {revenue['expected_revenue']:,.2f} "
+                     f"({revenue_range['low']:,.2f} - {revenue_range['high']:,.2f})")
+        result["revenue"] = revenue
+    return result, lines
+
+def _cli_weather(args):
+    from weather_api import WeatherAPI, get_humidity_level, get_rainfall_level
+    
+    weather_api = WeatherAPI(args.api_key)
+    try:
+        data = weather_api.get_weather_data(args.location)
+        advice = weather_api.get_weather_based_recommendations(data)
+    finally:
+        weather_api.close()
+    
+    humidity_level, rainfall_level = get_humidity_level(data["humidity"]), get_rainfall_level(data["rainfall"])
+    lines = [
+        f"Weather for {args.location}:",
+        f"Temperature: {data['temperature']}°C",
+        f"Humidity: {data['humidity']}% ({humidity_level})",
+        f"Rainfall: {data['rainfall']}mm ({rainfall_level})",
+        f"Description: {data['description']}",
+        "",
+        f"- {advice['watering_advice']}"
+    ]
+    lines += [f"- Alert: {alert}" for alert in advice["alerts"]]
+    lines += [f"- {tip}" for tip in advice["farming_tips"]]
+    return {"location": args.location, "weather": data, "humidity_level": humidity_level,
+            "rainfall_level": rainfall_level, "recommendations": advice}, lines
+
+def run_cli(argv):
+    """
+    Run a non-interactive subcommand and return its exit status.
+    
+    Each command loads only what it needs: recommend and yield never read
+    the location database, and the weather and yield modules are imported
+    on demand. Loading messages are discarded (or sent to stderr with
+    --verbose), so stdout carries just the result, which --json prints as
+    a JSON object ({"error": ...} when the command fails).
+    
+    Args:
+        argv: Command line arguments after the program name
+        
+    Returns:
+        0 on success, 1 if the location or crop is not known
+    """
+    import contextlib
+    import sys
+    
+    args = _build_cli_parser().parse_args(argv)
+    handler = {"recommend": _cli_recommend, "by-location": _cli_by_location,
+               "yield": _cli_yield, "weather": _cli_weather}[args.command]
+    try:
+        with contextlib.redirect_stdout(sys.stderr if args.verbose else io.StringIO()):
+            result, lines = handler(args)
+    except LookupError as e:
+        result, lines = {"error": str(e)}, None
+    
+    if args.json:
+        import json
+        print(json.dumps(result, indent=2))
+    elif lines is None:
+        print(f"Error: {result['error']}", file=sys.stderr)
+    else:
+        print("\n".join(lines))
+    return 1 if lines is None else 0
 
 def main():
     """Main entry point for Agri Wiz"""
     import sys
     
+    if len(sys.argv) > 1 and sys.argv[1] in CLI_COMMANDS + ("-h", "--help"):
+        sys.exit(run_cli(sys.argv[1:]))
+    
     # Check if GUI mode is requested
     if len(sys.argv) > 1 and sys.argv[1] == '--gui':
+        # Let gui's "from agri_wiz import AgriWiz" reuse this module rather than run it a second time
+        sys.modules.setdefault("agri_wiz", sys.modules[__name__])
         # Import and start GUI
         from gui import AgriWizGUI
         app = AgriWizGUI()
@@ -190,7 +1021,7 @@ def main():
     print("\n" + "="*50)
     print("🌱 Welcome to Agri Wiz - Crop Recommendation System 🌱")
     print("="*50)
-    print("\nTip: Run with --gui argument to use the graphical interface")
+    print("\nTip: Run with --gui argument to use the graphical interface, or --help for non-interactive commands")
     
     while True:
         print("\nPlease select an option:")
@@ -250,41 +1081,9 @@ def main():
                           f"Soil fertility: {crop.get('soil_fertility', 'N/A')})")
             else:
                 print("No crops match your exact criteria. Consider these alternatives:")
-                # Provide some close matches with fewer criteria matching
-                alternatives = []
-                for crop in agri_wiz.crop_data:
-                    matches = 0
-                    total_parameters = 3  # Core parameters
-                    
-                    # Check core parameters
-                    if any(s.strip().lower() == soil_type.lower() for s in crop["soil_types"].split(",")):
-                        matches += 1
-                    if any(c.strip().lower() == climate.lower() for c in crop["climates"].split(",")):
-                        matches += 1
-                    if any(s.strip().lower() == season.lower() for s in crop["seasons"].split(",")):
-                        matches += 1
-                    
-                    # Check optional parameters if provided
-                    if humidity and "humidity_preference" in crop:
-                        total_parameters += 1
-                        if any(h.strip().lower() == humidity.lower() for h in crop["humidity_preference"].split(",")):
-                            matches += 1
-                    
-                    if soil_fertility and "soil_fertility" in crop:
-                        total_parameters += 1
-                        if any(f.strip().lower() == soil_fertility.lower() for f in crop["soil_fertility"].split(",")):
-                            matches += 1
-                    
-                    # Calculate match percentage
-                    match_percentage = (matches / total_parameters) * 100
-                    
-                    if match_percentage >= 60:  # At least 60% match
-                        alternatives.append((crop, matches, match_percentage))
-                
-                # Sort alternatives by match percentage
-                alternatives.sort(key=lambda x: x[2], reverse=True)
+                alternatives = agri_wiz.get_alternatives(soil_type, climate, season, humidity, soil_fertility)
                 
-                for i, (crop, matches, percentage) in enumerate(alternatives[:5], 1):
+                for i, (crop, matches, percentage) in enumerate(alternatives, 1):
                     print(f"{i}. {crop['crop_name']} - {percentage:.0f}% match")
                     print(f"   Water needs: {crop['water_needs']}, "
                           f"Humidity: {crop.get('humidity_preference', 'N/A')}, "
@@ -0,0 +1,153 @@
+#!/usr/bin/env python
+# Async Weather API Module for Agri Wiz
+# Coroutine-based counterpart of WeatherAPI for async web front ends
+
+import asyncio
+import concurrent.futures
+import json
+from weather_api import WeatherAPI, WeatherCache, get_humidity_level, get_rainfall_level
+
+class AsyncWeatherAPI:
+    """
+    Asyncio version of WeatherAPI with the same methods, as coroutines.
+
+    Wraps a WeatherAPI (a new one unless passed in) and shares its cache,
+    shared cache, cache file, rate limit and mock data, so sync and async
+    callers in one process see the same entries. Requests for a location
+    share one in-flight fetch with each other and with the WeatherAPI's
+    own callers in other threads. A caller that is cancelled or times out
+    stops waiting without cancelling the fetch for the others. File and
+    database work (mock data, caching, history) and HTTP requests, which
+    share the WeatherAPI's pool of keep-alive connections, run in worker
+    threads, off the event loop; the WeatherAPI's blocking methods must not
+    be called from the event loop's thread.
+    """
+
+    def __init__(self, api_key=None, base_url="http://api.openweathermap.org/data/2.5/weather", weather_api=None):
+        self.weather_api = weather_api or WeatherAPI(api_key, base_url)
+        self.weather_cache = self.weather_api.weather_cache
+        self._tasks = set()  # Fetches this client started
+
+    async def get_weather_data(self, location, timeout=None):
+        """
+        Get current weather data for a location.
+
+        Waits at most timeout seconds for a fetch (the API's REQUEST_TIMEOUT
+        if None) and falls back to mock data if it fails or times out.
+        """
+        api = self.weather_api
+        cached, state = self.weather_cache.lookup(location)
+        if state is None and api.shared_cache is not None:
+            cached, state = await asyncio.to_thread(api._lookup_shared, location)
+        if state == "fresh":
+            print(f"Using cached weather data for {location}")
+            if api._should_refresh_early(cached):
+                self._start_fetch(location, refresh=True)
+            return cached
+        if state == "stale":
+            # Serve the expired entry now and refresh it in the background
+            print(f"Using stale weather data for {location} while it refreshes")
+            self._start_fetch(location, refresh=True)
+            return cached
+
+        fetch = asyncio.wrap_future(self._start_fetch(location))
+        try:
+            return await asyncio.wait_for(asyncio.shield(fetch), api.REQUEST_TIMEOUT if timeout is None else timeout)
+        except asyncio.TimeoutError:
+            print(f"Timed out fetching weather data for {location}")
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"Error fetching weather data for {location}: {e}")
+        # Return mock data as fallback
+        return await asyncio.to_thread(api._get_mock_weather_data, location)
+
+    async def get_weather_data_many(self, locations, timeout=None):
+        """Get weather data for several locations concurrently; returns a dict keyed by location as given."""
+        results = await asyncio.gather(*(self.get_weather_data(location, timeout) for location in locations))
+        return dict(zip(locations, results))
+
+    def get_weather_based_recommendations(self, weather_data):
+        """Get recommendations based on current weather conditions (no I/O, so not a coroutine)."""
+        return self.weather_api.get_weather_based_recommendations(weather_data)
+
+    def get_cache_stats(self):
+        return self.weather_api.get_cache_stats()
+
+    async def close(self):
+        """Cancel the fetches this client started and flush the shared cache."""
+        for task in list(self._tasks):
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        await asyncio.to_thread(self.weather_api.close)
+
+    def _start_fetch(self, location, refresh=False):
+        """
+        Return the in-flight fetch (a concurrent.futures.Future) for a
+        location's cache key from the WeatherAPI's single-flight map,
+        starting one on this event loop if there is none.
+
+        Like WeatherAPI._fetch_single_flight, an entry cached by a fetch that
+        finished since the caller's lookup is returned unless refresh is set.
+        """
+        api = self.weather_api
+        key = WeatherCache.normalize_key(location)
+        with api._flight_lock:
+            flight = api._in_flight.get(key)
+            if flight is not None:
+                return flight
+            cached, state = self.weather_cache.peek(location)
+            if state == "fresh" and not refresh:
+                flight = concurrent.futures.Future()
+                flight.set_result(cached)
+                return flight
+            flight = api._in_flight[key] = concurrent.futures.Future()
+        task = asyncio.ensure_future(self._fetch_weather_data(location))
+        self._tasks.add(task)
+        task.add_done_callback(lambda done: self._finish_fetch(key, flight, done))
+        return flight
+
+    def _finish_fetch(self, key, flight, task):
+        """Publish a finished fetch to everyone waiting on its flight."""
+        self._tasks.discard(task)
+        api = self.weather_api
+        with api._flight_lock:
+            if api._in_flight.get(key) is flight:
+                del api._in_flight[key]
+        if task.cancelled():
+            flight.cancel()
+        elif task.exception() is not None:
+            flight.set_exception(task.exception())
+        else:
+            flight.set_result(task.result())
+
+    async def _fetch_weather_data(self, location):
+        """Fetch weather data for a location and cache it."""
+        api = self.weather_api
+        if api.api_key == "demo_key":
+            # Return mock data for demo purposes
+            weather_data = await asyncio.to_thread(api._get_mock_weather_data, location)
+        else:
+            delay = api._rate_limiter.reserve()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            # Runs on the WeatherAPI's fetch workers over its keep-alive connections;
+            # unlike the loop's default executor, they don't hold up asyncio.run's exit
+            request = api._submit(api._http_get, api._weather_url(location), paced=False)
+            data = await asyncio.wait_for(asyncio.wrap_future(request), api.REQUEST_TIMEOUT)
+            weather_data = await asyncio.to_thread(api._parse_api_response, json.loads(data))
+        return await asyncio.to_thread(api._cache_weather_data, location, weather_data)
+
+# Simple test if run directly
+if __name__ == "__main__":
+    async def demo():
+        api = AsyncWeatherAPI()
+        locations = ["Punjab, India", "Kerala, India", "punjab india"]
+        weather = await api.get_weather_data_many(locations)
+        for location in locations:
+            data = weather[location]
+            print(f"{location}: {data['temperature']}°C, "
+                  f"humidity {get_humidity_level(data['humidity'])}, rainfall {get_rainfall_level(data['rainfall'])}")
+        await api.close()
+
+    asyncio.run(demo())
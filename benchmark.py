@@ -0,0 +1,426 @@
+#!/usr/bin/env python
+# Benchmarks for Agri Wiz
+# Compares the batch/compiled code paths against the scalar ones they replace, and times CLI startup
+
+import contextlib
+import csv
+import io
+import json
+import os
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+def _quiet(factory):
+    """Build an object while discarding its load messages."""
+    with contextlib.redirect_stdout(io.StringIO()):
+        return factory()
+
+def _timed(func, *args, **kwargs):
+    """Run func once and return (result, elapsed seconds)."""
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+def bench_batch_recommendations(parcels=100000, seed=42):
+    """Compare get_recommendations_batch with a per-parcel get_recommendations loop."""
+    from agri_wiz import AgriWiz
+    
+    agri_wiz = _quiet(AgriWiz)
+    rng = random.Random(seed)
+    soils = sorted(agri_wiz._index["soil_types"])
+    climates = sorted(agri_wiz._index["climates"])
+    seasons = sorted(agri_wiz._index["seasons"])
+    levels = ["", "low", "medium", "high"]
+    
+    soil_col = [rng.choice(soils) for _ in range(parcels)]
+    climate_col = [rng.choice(climates) for _ in range(parcels)]
+    season_col = [rng.choice(seasons) for _ in range(parcels)]
+    rainfall_col = [rng.choice(levels) for _ in range(parcels)]
+    humidity_col = [rng.choice(levels) for _ in range(parcels)]
+    fertility_col = [rng.choice(levels) for _ in range(parcels)]
+    
+    def scalar_loop():
+        return [
+            agri_wiz.get_recommendations(*row)
+            for row in zip(soil_col, climate_col, season_col, rainfall_col, humidity_col, fertility_col)
+        ]
+    
+    expected, loop_time = _timed(scalar_loop)
+    (matches, order), batch_time = _timed(
+        agri_wiz.get_recommendations_batch,
+        soil_col, climate_col, season_col, rainfall_col, humidity_col, fertility_col
+    )
+    
+    # The batch result must agree with the scalar path parcel by parcel
+    counts = matches.sum(axis=1)
+    for i, crops in enumerate(expected):
+        batch_crops = [agri_wiz.crop_data[crop_id] for crop_id in order[i, :counts[i]]]
+        if batch_crops != crops:
+            raise AssertionError(f"Batch result differs from get_recommendations for parcel {i}")
+    
+    print(f"Batch recommendations for {parcels} parcels x {len(agri_wiz.crop_data)} crops:")
+    print(f"  scalar loop: {loop_time:.3f}s ({parcels / loop_time:,.0f} parcels/s)")
+    print(f"  batch:       {batch_time:.3f}s ({parcels / batch_time:,.0f} parcels/s)")
+    print(f"  speedup:     {loop_time / batch_time:.1f}x")
+
+def _write_variety_catalog(path, agri_wiz, rows, seed=42):
+    """Write a synthetic CSV of crop varieties derived from the real catalog."""
+    rng = random.Random(seed)
+    with open(path, "w", newline="") as file:
+        writer = csv.DictWriter(file, fieldnames=agri_wiz.CROP_FIELDS)
+        writer.writeheader()
+        for i in range(rows):
+            crop = dict(rng.choice(agri_wiz.crop_data))
+            crop["crop_name"] = f"{crop['crop_name']} variety {i}"
+            writer.writerow(crop)
+
+def _measure_load(agri_wiz):
+    """Return (seconds, peak traced bytes) for load_crop_data, timed without tracing."""
+    _, elapsed = _timed(_quiet, agri_wiz.load_crop_data)
+    tracemalloc.start()
+    _quiet(agri_wiz.load_crop_data)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return elapsed, peak
+
+def bench_catalog_loading(rows=100000):
+    """Compare loading crops from the CSV file with loading the compiled catalog."""
+    from agri_wiz import AgriWiz
+    from crop_catalog import compile_catalog
+    
+    agri_wiz = _quiet(AgriWiz)
+    with tempfile.TemporaryDirectory() as directory:
+        agri_wiz.crop_file = os.path.join(directory, "crop_data.csv")
+        agri_wiz.catalog_file = os.path.join(directory, "crop_data.bin")
+        _write_variety_catalog(agri_wiz.crop_file, agri_wiz, rows)
+        
+        csv_time, csv_peak = _measure_load(agri_wiz)
+        csv_recommendations = agri_wiz.get_recommendations("loamy", "tropical", "rainy", "high")
+        
+        _, compile_time = _timed(compile_catalog, agri_wiz.crop_file, agri_wiz.catalog_file)
+        catalog_time, catalog_peak = _measure_load(agri_wiz)
+        if agri_wiz.get_recommendations("loamy", "tropical", "rainy", "high") != csv_recommendations:
+            raise AssertionError("Compiled catalog gives different recommendations than the CSV")
+        
+        print(f"Loading {rows} crop rows:")
+        print(f"  CSV:              {csv_time:.3f}s, peak {csv_peak / 2 ** 20:.1f} MiB")
+        print(f"  compiled catalog: {catalog_time:.3f}s, peak {catalog_peak / 2 ** 20:.1f} MiB "
+              f"(compiled once in {compile_time:.3f}s, "
+              f"{os.path.getsize(agri_wiz.catalog_file) / 2 ** 20:.1f} MiB on disk)")
+        print(f"  speedup:          {csv_time / catalog_time:.1f}x")
+
+def bench_synthetic_weather(locations=1000, days=1000):
+    """Compare SyntheticWeather.grid with a per-day observation() loop."""
+    import datetime
+    from synthetic_weather import SyntheticWeather
+    
+    weather = SyntheticWeather()
+    names = [f"Location {i}" for i in range(locations)]
+    start = datetime.date(2024, 1, 1)
+    dates = [start + datetime.timedelta(days=day) for day in range(days)]
+    sample = names[:max(1, locations // 100)]
+    
+    _, loop_time = _timed(lambda: [weather.observation(name, date) for name in sample for date in dates])
+    grid, grid_time = _timed(weather.grid, names, start, days)
+    loop_rate = len(sample) * days / loop_time
+    grid_rate = grid["temperature"].size / grid_time
+    
+    print(f"Synthetic weather for {locations} locations x {days} days:")
+    print(f"  observation loop: {loop_rate:,.0f} samples/s (measured on {len(sample)} locations)")
+    print(f"  grid:             {grid_time:.3f}s ({grid_rate:,.0f} samples/s)")
+    print(f"  speedup:          {grid_rate / loop_rate:.1f}x")
+
+def bench_yield_grid(managements=11, areas=10, price=400):
+    """Compare estimate_yield_batch over a full condition grid with an estimate_yield/estimate_revenue loop."""
+    import itertools
+    from yield_estimation import YieldEstimator
+    
+    estimator = YieldEstimator()
+    crops = list(estimator.base_yields)
+    fertility = list(estimator.soil_fertility_factors)
+    water = list(estimator.water_availability_factors)
+    climate = list(estimator.climate_match_factors)
+    management = [i / (managements - 1) for i in range(managements)]
+    area = [float(i + 1) for i in range(areas)]
+    axes = (crops, fertility, water, climate, management, area)
+    
+    def scalar_loop():
+        revenues = []
+        for crop, soil, water_level, match, level, hectares in itertools.product(*axes):
+            yield_data = estimator.estimate_yield(crop, {
+                "soil_fertility": soil, "water_availability": water_level, "climate_match": match,
+                "farm_management": level, "land_area": hectares
+            })
+            revenues.append(estimator.estimate_revenue(yield_data, price)["expected_revenue"])
+        return revenues
+    
+    expected, loop_time = _timed(scalar_loop)
+    estimator.estimate_yield_batch(crops[:1])  # Warm up (imports NumPy)
+    result, batch_time = _timed(estimator.estimate_yield_batch, *axes, price_per_unit=price)
+    if result["expected_revenue"].ravel().tolist() != expected:
+        raise AssertionError("estimate_yield_batch differs from estimate_yield/estimate_revenue")
+    
+    combinations = len(expected)
+    print(f"Yield and revenue for {combinations} crop x condition combinations:")
+    print(f"  scalar loop: {loop_time:.3f}s ({combinations / loop_time:,.0f} combinations/s)")
+    print(f"  batch:       {batch_time:.3f}s ({combinations / batch_time:,.0f} combinations/s)")
+    print(f"  speedup:     {loop_time / batch_time:.1f}x")
+
+def bench_farm_planner(sizes=(1000, 5000, 20000), varieties=60, seed=42):
+    """Time FarmPlanner.plan on farms of increasing size, against its Lagrangian upper bound."""
+    from agri_wiz import AgriWiz
+    from farm_planner import FarmPlanner
+    from yield_estimation import YieldEstimator
+    
+    agri_wiz = _quiet(AgriWiz)
+    estimator = YieldEstimator()
+    rng = random.Random(seed)
+    with tempfile.TemporaryDirectory() as directory:
+        # Extend the catalog with varieties of the crops that have yield data
+        agri_wiz.crop_file = os.path.join(directory, "crop_data.csv")
+        agri_wiz.catalog_file = os.path.join(directory, "crop_data.bin")
+        base_crops = [crop for crop in agri_wiz.crop_data if crop["crop_name"] in estimator.base_yields]
+        with open(agri_wiz.crop_file, "w", newline="") as file:
+            writer = csv.DictWriter(file, fieldnames=agri_wiz.CROP_FIELDS)
+            writer.writeheader()
+            writer.writerows(dict(crop) for crop in base_crops)
+            for i in range(varieties):
+                crop = dict(rng.choice(base_crops))
+                estimator.base_yields[f"{crop['crop_name']} variety {i}"] = estimator.base_yields[crop["crop_name"]]
+                crop["crop_name"] = f"{crop['crop_name']} variety {i}"
+                writer.writerow(crop)
+        _quiet(agri_wiz.load_crop_data)
+    
+    planner = FarmPlanner(agri_wiz, estimator)
+    prices = {name: rng.uniform(100, 2000) if low < 1000 else rng.uniform(0.1, 0.5)
+              for name, (low, _) in estimator.base_yields.items()}
+    locations = sorted(_quiet(lambda: agri_wiz.location_manager).location_data)  # Loaded on first use
+    seasons = ["winter", "summer", "rainy", "spring"]
+    fertility = [None, "low", "medium", "high"]
+    
+    print(f"Farm planning over {len(agri_wiz.crop_data)} crops ({len(prices)} with yield data and prices):")
+    for size in sizes:
+        parcels = [{"area": rng.uniform(0.5, 10), "location": rng.choice(locations),
+                    "season": rng.choice(seasons), "soil_fertility": rng.choice(fertility)}
+                   for _ in range(size)]
+        unlimited, plan_time = _timed(planner.plan, parcels, prices)
+        budget = unlimited["water_used"] / 2
+        plan, budget_time = _timed(planner.plan, parcels, prices, water_budget=budget)
+        if plan["water_used"] > budget * (1 + 1e-9):
+            raise AssertionError("Farm plan exceeds its water budget")
+        print(f"  {size:>6} parcels: {plan_time:.3f}s unconstrained, {budget_time:.3f}s with half the water "
+              f"({plan['total_revenue'] / plan['upper_bound']:.2%} of the upper bound)")
+
+def bench_storage(sizes=(10000, 100000, 1000000), queries=200, writes=1000, location_sizes=(1000, 10000),
+                  updates=20, seed=42):
+    """
+    Compare the flat files with SQLiteStorage: loading, querying and writing
+    crops, then loading and updating locations and weather cache entries.
+    """
+    from agri_wiz import AgriWiz
+    from file_utils import atomic_write
+    from location_data import LocationManager
+    from storage import SQLiteStorage, import_files
+    from weather_api import WeatherAPI, WeatherCache
+    
+    agri_wiz = _quiet(AgriWiz)
+    agri_wiz.RECOMMENDATION_CACHE_SIZE = 0  # Time the matching, not the cache
+    rng = random.Random(seed)
+    soils = sorted(agri_wiz._index["soil_types"])
+    climates = sorted(agri_wiz._index["climates"])
+    seasons = sorted(agri_wiz._index["seasons"])
+    levels = ["", "low", "medium", "high"]
+    query_rows = [(rng.choice(soils), rng.choice(climates), rng.choice(seasons),
+                   rng.choice(levels), rng.choice(levels), rng.choice(levels)) for _ in range(queries)]
+    new_crops = [dict(rng.choice(agri_wiz.crop_data).to_dict(), crop_name=f"New crop {i}") for i in range(writes)]
+    
+    for rows in sizes:
+        with tempfile.TemporaryDirectory() as directory:
+            agri_wiz.crop_file = os.path.join(directory, "crop_data.csv")
+            agri_wiz.catalog_file = os.path.join(directory, "crop_data.bin")
+            _write_variety_catalog(agri_wiz.crop_file, agri_wiz, rows)
+            storage = SQLiteStorage(os.path.join(directory, "agri_wiz.db"))
+            _, import_time = _timed(import_files, storage, agri_wiz.crop_file, "", "")
+            
+            _, csv_load = _timed(_quiet, agri_wiz.load_crop_data)
+            _, sql_load = _timed(storage.load_crops)
+            
+            expected, csv_query = _timed(lambda: [agri_wiz.get_recommendations(*row) for row in query_rows])
+            results, sql_query = _timed(lambda: [storage.get_recommendations(*row) for row in query_rows])
+            if results != expected:
+                raise AssertionError("SQL recommendations differ from get_recommendations")
+            
+            _, csv_write = _timed(_quiet, lambda: [agri_wiz.add_crop(crop) for crop in new_crops])
+            _, sql_write = _timed(lambda: [storage.append_crops([crop]) for crop in new_crops])
+            _, csv_save = _timed(_quiet, agri_wiz.save_crop_data)
+            _, sql_save = _timed(storage.save_crops, agri_wiz.crop_data)
+            storage.close()
+        
+        print(f"Crop storage with {rows} rows (imported into SQLite in {import_time:.2f}s):")
+        print(f"  load:           CSV {csv_load:.3f}s, SQLite {sql_load:.3f}s")
+        print(f"  queries:        in-memory index {queries / csv_query:,.0f}/s, SQL {queries / sql_query:,.0f}/s")
+        print(f"  single adds:    CSV append {writes / csv_write:,.0f}/s, SQLite {writes / sql_write:,.0f}/s")
+        print(f"  full rewrite:   CSV {csv_save:.3f}s, SQLite {sql_save:.3f}s")
+    
+    # Locations: LocationManager rewrites the whole JSON file for one new
+    # location, where a storage backend writes that location's rows
+    base_locations = list(_quiet(LocationManager).location_data.values())
+    for count in location_sizes:
+        locations = {f"location_{i}": rng.choice(base_locations) for i in range(count)}
+        with tempfile.TemporaryDirectory() as directory:
+            location_file = os.path.join(directory, "location_data.json")
+            with open(location_file, "w") as file:
+                json.dump(locations, file, indent=4)
+            storage = SQLiteStorage(os.path.join(directory, "agri_wiz.db"))
+            _, import_time = _timed(import_files, storage, "", location_file, "")
+            
+            json_manager = _quiet(LocationManager)
+            json_manager.data_file = location_file
+            json_manager.data_dir = os.path.join(directory, "location_data")
+            _, json_load = _timed(_quiet, json_manager.load_location_data)
+            sql_manager, sql_load = _timed(_quiet, lambda: LocationManager(storage))
+            if sql_manager.location_data != json_manager.location_data:
+                raise AssertionError("SQLite locations differ from the JSON file")
+            
+            new_locations = [(f"new location {i}", rng.choice(base_locations)) for i in range(updates)]
+            _, json_write = _timed(_quiet, lambda: [json_manager.add_location(*item) for item in new_locations])
+            _, sql_write = _timed(_quiet, lambda: [sql_manager.add_location(*item) for item in new_locations])
+            storage.close()
+        
+        print(f"Location storage with {count} locations (imported into SQLite in {import_time:.2f}s):")
+        print(f"  load:           JSON {json_load:.3f}s, SQLite {sql_load:.3f}s")
+        print(f"  single adds:    JSON rewrite {updates / json_write:,.0f}/s, SQLite {updates / sql_write:,.0f}/s")
+    
+    # Weather cache: a full cache of entries, saved one fetched entry at a
+    # time as WeatherAPI._save_cache does for each backend
+    now = time.time()
+    descriptions = ["Clear sky", "Light rain", "Overcast", "Spring showers"]
+    entries = {
+        WeatherCache.normalize_key(f"Location {i}"): {
+            "temperature": round(rng.uniform(5, 40), 1), "humidity": rng.randint(20, 95),
+            "rainfall": round(rng.uniform(0, 20), 1), "description": rng.choice(descriptions),
+            "timestamp": now - rng.uniform(0, 3600)
+        }
+        for i in range(WeatherAPI.CACHE_MAX_ENTRIES)
+    }
+    with tempfile.TemporaryDirectory() as directory:
+        weather_file = os.path.join(directory, "weather_cache.json")
+        with open(weather_file, "w") as file:
+            json.dump(entries, file)
+        storage = SQLiteStorage(os.path.join(directory, "agri_wiz.db"))
+        _, import_time = _timed(import_files, storage, "", "", weather_file)
+        
+        def load_from_file():
+            with open(weather_file, "r") as file:
+                return json.load(file)
+        
+        json_entries, json_load = _timed(load_from_file)
+        sql_entries, sql_load = _timed(storage.load_weather)
+        if sql_entries != json_entries:
+            raise AssertionError("SQLite weather entries differ from the JSON file")
+        
+        keys = [rng.choice(list(entries)) for _ in range(updates)]
+        
+        def save_to_file():
+            for key in keys:
+                entries[key] = dict(entries[key], timestamp=time.time())
+                with atomic_write(weather_file, "w") as file:
+                    json.dump(entries, file)
+        
+        def save_to_storage():
+            for key in keys:
+                entries[key] = dict(entries[key], timestamp=time.time())
+                storage.save_weather({key: entries[key]}, expire_before=now - 3600 - WeatherAPI.CACHE_STALE_SECONDS)
+        
+        _, json_write = _timed(save_to_file)
+        _, sql_write = _timed(save_to_storage)
+        storage.close()
+    
+    print(f"Weather cache with {len(entries)} entries (imported into SQLite in {import_time:.2f}s):")
+    print(f"  load:           JSON {json_load:.3f}s, SQLite {sql_load:.3f}s")
+    print(f"  single saves:   JSON rewrite {updates / json_write:,.0f}/s, SQLite {updates / sql_write:,.0f}/s")
+
+# Wall time a CLI command may add to the bare interpreter's startup; the
+# commands measure 25-65 ms (median of 20 runs, bytecode cached)
+STARTUP_BUDGET = 0.1
+
+# Arguments of each timed CLI command and modules it must not import
+STARTUP_COMMANDS = {
+    "recommend": (["recommend", "--soil-type", "loamy", "--climate", "tropical", "--season", "rainy"],
+                  ("location_data", "weather_api", "yield_estimation", "numpy")),
+    "by-location": (["by-location", "Punjab, India"], ("weather_api", "yield_estimation", "numpy")),
+    "yield": (["yield", "Rice", "--price", "400"], ("location_data", "weather_api", "numpy")),
+    "weather": (["weather", "Kerala, India"], ("http.client", "yield_estimation", "numpy")),
+}
+
+def bench_startup(runs=20):
+    """Time python -m agri_wiz <command> --json from process start to exit against STARTUP_BUDGET."""
+    directory = os.path.dirname(os.path.abspath(__file__))
+    # Installed code has its bytecode cached; without it every run would
+    # compile the modules again, adding 20-30 ms
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [directory, os.environ.get("PYTHONPATH")])))
+    env.pop("PYTHONDONTWRITEBYTECODE", None)
+    
+    with tempfile.TemporaryDirectory() as data_dir:
+        # The commands run on copies of the data files, so the weather
+        # command's cache writes leave the working tree alone
+        for name in ("crop_data.csv", "crop_data.bin", "location_data.json", "weather_cache.json"):
+            if os.path.exists(os.path.join(directory, name)):
+                shutil.copy(os.path.join(directory, name), data_dir)
+        if os.path.isdir(os.path.join(directory, "location_data")):
+            shutil.copytree(os.path.join(directory, "location_data"), os.path.join(data_dir, "location_data"))
+        
+        def median_time(args):
+            times = []
+            for _ in range(runs):
+                start = time.perf_counter()
+                subprocess.run(args, cwd=data_dir, env=env, stdout=subprocess.DEVNULL, check=True)
+                times.append(time.perf_counter() - start)
+            return statistics.median(times)
+        
+        interpreter = median_time([sys.executable, "-c", "pass"])
+        print(f"CLI startup, median of {runs} runs (interpreter alone: {interpreter * 1000:.1f} ms):")
+        over_budget = []
+        for name, (args, unneeded) in STARTUP_COMMANDS.items():
+            command = [sys.executable, "-m", "agri_wiz", *args, "--json"]
+            # Also warms the bytecode cache before timing
+            profile = subprocess.run([sys.executable, "-X", "importtime", *command[1:]], cwd=data_dir, env=env,
+                                     capture_output=True, text=True, check=True)
+            imported = {line.split("|")[-1].strip() for line in profile.stderr.splitlines()
+                        if line.startswith("import time:") and not line.endswith("imported package")}
+            loaded = sorted(imported.intersection(unneeded))
+            if loaded:
+                raise AssertionError(f"{name} imports {', '.join(loaded)}, which it does not need")
+            
+            elapsed = median_time(command) - interpreter
+            if elapsed > STARTUP_BUDGET:
+                over_budget.append(name)
+            print(f"  {name + ':':<13} +{elapsed * 1000:5.1f} ms, {len(imported)} modules imported "
+                  f"({'over' if elapsed > STARTUP_BUDGET else 'within'} the {STARTUP_BUDGET * 1000:.0f} ms budget)")
+    if over_budget:
+        raise AssertionError(f"Over the startup budget: {', '.join(over_budget)}")
+
+BENCHMARKS = {
+    "batch": bench_batch_recommendations,
+    "catalog": bench_catalog_loading,
+    "planner": bench_farm_planner,
+    "startup": bench_startup,
+    "storage": bench_storage,
+    "synthetic": bench_synthetic_weather,
+    "yield": bench_yield_grid,
+}
+
+if __name__ == "__main__":
+    names = sys.argv[1:] or list(BENCHMARKS)
+    for name in names:
+        if name not in BENCHMARKS:
+            print(f"Unknown benchmark: {name}. Available: {', '.join(BENCHMARKS)}")
+            sys.exit(1)
+        BENCHMARKS[name]()
+        print()
@@ -0,0 +1,422 @@
+#!/usr/bin/env python
+# Crop Catalog Module for Agri Wiz
+# Compiles crop_data.csv into a binary columnar file that loads through mmap
+
+import csv
+import json
+import mmap
+import os
+import struct
+import sys
+from collections.abc import Sequence
+from enum import IntEnum
+from file_utils import atomic_write
+
+MAGIC = b"AGWZCAT2"
+FIELDS = ["crop_name", "soil_types", "climates", "seasons", "water_needs", "humidity_preference", "soil_fertility"]
+MULTI_VALUE_FIELDS = ["soil_types", "climates", "seasons", "humidity_preference", "soil_fertility"]
+
+# Layout of a compiled catalog file:
+#   MAGIC | uint32 header length | JSON header | padding to 8 bytes | column data
+# The header holds the vocabulary of each multi-valued field and the
+# (offset, length) of every column in the data area:
+#   codes:<field>     uint32 per row, index into the field's string dictionary
+#                     (NO_VALUE for a row without the field)
+#   offsets:<field>   uint64 per dictionary string plus one, where it starts in text:<field>
+#   text:<field>      the field's dictionary strings, UTF-8, back to back
+#   bitset:<field>:j  one bit per row (little endian), rows that list vocab[j]
+#   missing:<field>   one bit per row, rows without a value for the field
+NO_VALUE = 0xFFFFFFFF
+
+def _split_values(text):
+    """Split a comma-separated field into normalized values, as the matcher does."""
+    return [value.strip().lower() for value in text.split(",")]
+
+class WaterNeeds(IntEnum):
+    """Water needs of a crop; values that are not a single level map to None."""
+    LOW = 0
+    MEDIUM = 1
+    HIGH = 2
+
+    @classmethod
+    def parse(cls, text):
+        return _WATER_NEEDS.get(text)
+
+_WATER_NEEDS = {"low": WaterNeeds.LOW, "medium": WaterNeeds.MEDIUM, "high": WaterNeeds.HIGH}
+
+# Raw field text -> shared objects, so identical values across rows cost one copy
+_interned_text = {}
+_interned_values = {}
+_interned_profiles = {}
+
+def _intern(text):
+    if text is None:
+        return None
+    return _interned_text.setdefault(text, text)
+
+def _value_set(text):
+    """Pre-split, normalized and interned frozenset of a comma-separated field."""
+    if text is None:
+        return None
+    values = _interned_values.get(text)
+    if values is None:
+        values = _interned_values[text] = frozenset(_intern(value) for value in _split_values(text))
+    return values
+
+def _profile(*texts):
+    """
+    Shared attribute values for a combination of the non-name fields:
+    the interned texts, their value sets (aligned with MULTI_VALUE_FIELDS)
+    and the WaterNeeds level. Many rows share a combination, so each is
+    built once.
+    """
+    profile = _interned_profiles.get(texts)
+    if profile is None:
+        soil_types, climates, seasons, water_needs, humidity_preference, soil_fertility = map(_intern, texts)
+        value_sets = tuple(_value_set(text) for text in (soil_types, climates, seasons, humidity_preference, soil_fertility))
+        profile = _interned_profiles[texts] = (soil_types, climates, seasons, water_needs, humidity_preference,
+                                               soil_fertility, value_sets, WaterNeeds.parse(water_needs))
+    return profile
+
+class Crop:
+    """
+    Compact crop record.
+    
+    Keeps the raw field text (shared between rows) for display and CSV
+    output, plus pre-split value sets of the multi-valued fields and a
+    WaterNeeds level for matching. Supports the read-only dict operations
+    the rest of the code uses on crop rows (crop["crop_name"], get, in,
+    keys, items), and to_dict() gives a plain dict for JSON responses.
+    A field set to None is treated as missing.
+    """
+    __slots__ = ("crop_name", "soil_types", "climates", "seasons", "water_needs",
+                 "humidity_preference", "soil_fertility", "value_sets", "water")
+
+    def __init__(self, crop_name, soil_types, climates, seasons, water_needs,
+                 humidity_preference=None, soil_fertility=None):
+        self.crop_name = crop_name
+        (self.soil_types, self.climates, self.seasons, self.water_needs, self.humidity_preference,
+         self.soil_fertility, self.value_sets, self.water) = _profile(
+            soil_types, climates, seasons, water_needs, humidity_preference, soil_fertility)
+
+    @classmethod
+    def from_dict(cls, data):
+        """Build a Crop from a crop row dict (or return it unchanged if it already is one)."""
+        if isinstance(data, cls):
+            return data
+        unknown = set(data) - set(FIELDS)
+        if unknown:
+            raise ValueError(f"Unknown crop fields: {', '.join(sorted(map(str, unknown)))}")
+        return cls(**{field: data.get(field) for field in FIELDS})
+
+    def value_set(self, field):
+        """Normalized values of a multi-valued field, or None if the crop lacks it."""
+        return self.value_sets[_VALUE_SET_POSITIONS[field]]
+
+    def to_dict(self):
+        return {field: getattr(self, field) for field in FIELDS if getattr(self, field) is not None}
+
+    def keys(self):
+        return [field for field in FIELDS if getattr(self, field) is not None]
+
+    def items(self):
+        return self.to_dict().items()
+
+    def get(self, field, default=None):
+        value = getattr(self, field, None) if field in _FIELD_SET else None
+        return default if value is None else value
+
+    def __getitem__(self, field):
+        value = self.get(field)
+        if value is None:
+            raise KeyError(field)
+        return value
+
+    def __contains__(self, field):
+        return self.get(field) is not None
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def __len__(self):
+        return len(self.keys())
+
+    def __eq__(self, other):
+        if isinstance(other, (Crop, dict)):
+            return self.to_dict() == {field: value for field, value in other.items() if value is not None}
+        return NotImplemented
+
+    __hash__ = None
+
+    def __repr__(self):
+        return f"Crop({self.to_dict()!r})"
+
+_FIELD_SET = frozenset(FIELDS)
+_VALUE_SET_POSITIONS = {field: position for position, field in enumerate(MULTI_VALUE_FIELDS)}
+
+def _set_bit(bitmap, position):
+    bitmap[position >> 3] |= 1 << (position & 7)
+
+def read_crop_rows(csv_path):
+    """
+    Read the rows of a crop CSV file as dicts of FIELDS.
+
+    Columns the catalog doesn't know (or values beyond the header) are
+    ignored. An append interrupted by a crash leaves a short last row,
+    which is dropped.
+
+    Returns:
+        (rows, extra, torn): the rows, the sorted names of the ignored
+        columns and whether a torn last row was dropped
+    """
+    with open(csv_path, "r", newline="") as file:
+        reader = csv.DictReader(file)
+        rows = list(reader)
+
+    extra = {str(name) for name in reader.fieldnames or () if name not in _FIELD_SET}
+    if any(None in row for row in rows):
+        extra.add("unnamed values past the last column")
+    rows = [{field: row.get(field) for field in FIELDS} for row in rows]
+
+    torn = len(rows) > 1 and None in rows[-1].values() and None not in rows[-2].values()
+    if torn:
+        rows.pop()
+    return rows, sorted(extra), torn
+
+def compile_catalog(csv_path="crop_data.csv", catalog_path="crop_data.bin"):
+    """
+    Convert a crop CSV file into a compiled catalog.
+
+    The CSV stays the editable source of truth: the catalog records the size
+    and modification time of the CSV it was built from, and load_catalog
+    ignores it once the CSV changes.
+
+    Rows are read as the CSV loader reads them (see read_crop_rows), so a
+    torn last row is left out of the catalog too.
+
+    Returns the number of rows written.
+    """
+    source = os.stat(csv_path)
+    rows, _, _ = read_crop_rows(csv_path)
+    count = len(rows)
+    bitmap_size = count // 8 + 1
+
+    strings = {field: [] for field in FIELDS}
+    string_codes = {field: {} for field in FIELDS}
+    codes = {field: [] for field in FIELDS}
+    vocab = {field: {} for field in MULTI_VALUE_FIELDS}
+    bitsets = {field: {} for field in MULTI_VALUE_FIELDS}
+    missing = {field: bytearray(bitmap_size) for field in MULTI_VALUE_FIELDS}
+
+    for row_id, row in enumerate(rows):
+        for field in FIELDS:
+            text = row.get(field)
+            if text is None:
+                codes[field].append(NO_VALUE)
+                continue
+            code = string_codes[field].get(text)
+            if code is None:
+                code = string_codes[field][text] = len(strings[field])
+                strings[field].append(text)
+            codes[field].append(code)
+
+        for field in MULTI_VALUE_FIELDS:
+            text = row.get(field)
+            if text is None:
+                _set_bit(missing[field], row_id)
+                continue
+            for value in _split_values(text):
+                position = vocab[field].setdefault(value, len(vocab[field]))
+                if position not in bitsets[field]:
+                    bitsets[field][position] = bytearray(bitmap_size)
+                _set_bit(bitsets[field][position], row_id)
+
+    # Assemble the column data, keeping every column 8-byte aligned
+    columns = {}
+    chunks = []
+    offset = 0
+
+    def add_column(name, data):
+        nonlocal offset
+        padding = -len(data) % 8
+        columns[name] = [offset, len(data)]
+        chunks.append(data + b"\0" * padding)
+        offset += len(data) + padding
+
+    for field in FIELDS:
+        encoded = [text.encode("utf-8") for text in strings[field]]
+        offsets = [0]
+        for text in encoded:
+            offsets.append(offsets[-1] + len(text))
+        add_column(f"codes:{field}", struct.pack(f"<{count}I", *codes[field]))
+        add_column(f"offsets:{field}", struct.pack(f"<{len(offsets)}Q", *offsets))
+        add_column(f"text:{field}", b"".join(encoded))
+    for field in MULTI_VALUE_FIELDS:
+        for position, bitmap in bitsets[field].items():
+            add_column(f"bitset:{field}:{position}", bytes(bitmap))
+        add_column(f"missing:{field}", bytes(missing[field]))
+
+    header = json.dumps({
+        "rows": count,
+        "source": {"size": source.st_size, "mtime_ns": source.st_mtime_ns},
+        "fields": FIELDS,
+        "vocab": {field: list(values) for field, values in vocab.items()},
+        "columns": columns
+    }).encode("utf-8")
+    prefix = MAGIC + struct.pack("<I", len(header)) + header
+    prefix += b"\0" * (-len(prefix) % 8)
+
+    with atomic_write(catalog_path, "wb") as file:
+        file.write(prefix)
+        for chunk in chunks:
+            file.write(chunk)
+    return count
+
+class CropCatalog:
+    """
+    Read-only view of a compiled catalog file, backed by mmap.
+    
+    Rows are decoded from the mapped columns when they are accessed, so an
+    open catalog costs memory for its index only, however many rows it has.
+    """
+
+    def __init__(self, catalog_path):
+        with open(catalog_path, "rb") as file:
+            self._mmap = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._mmap[:len(MAGIC)] != MAGIC:
+            self._mmap.close()
+            raise ValueError(f"{catalog_path} is not a compiled crop catalog")
+
+        header_length = struct.unpack_from("<I", self._mmap, len(MAGIC))[0]
+        header_end = len(MAGIC) + 4 + header_length
+        self.header = json.loads(self._mmap[len(MAGIC) + 4:header_end].decode("utf-8"))
+        self._data_start = header_end + (-header_end % 8)
+        self.rows = self.header["rows"]
+        self._codes = {field: self._column(f"codes:{field}").cast("I") for field in FIELDS}
+        self._offsets = {field: self._column(f"offsets:{field}").cast("Q") for field in FIELDS}
+        self._texts = {field: self._column(f"text:{field}") for field in FIELDS}
+        # Attribute texts repeat across rows, so each is decoded once; names are decoded on every access
+        self._decoded = {field: {} for field in FIELDS if field != "crop_name"}
+
+    def close(self):
+        # The mmap can only be closed once no views of it are left
+        for views in (self._codes, self._offsets, self._texts):
+            for view in views.values():
+                view.release()
+            views.clear()
+        self._mmap.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def is_current(self, csv_path):
+        """Check whether the catalog was built from the CSV file as it is now."""
+        try:
+            source = os.stat(csv_path)
+        except OSError:
+            return False
+        recorded = self.header["source"]
+        return recorded["size"] == source.st_size and recorded["mtime_ns"] == source.st_mtime_ns
+
+    def _column(self, name):
+        offset, length = self.header["columns"][name]
+        start = self._data_start + offset
+        return memoryview(self._mmap)[start:start + length]
+
+    def _text(self, field, row):
+        code = self._codes[field][row]
+        if code == NO_VALUE:
+            return None
+        decoded = self._decoded.get(field)
+        text = decoded.get(code) if decoded is not None else None
+        if text is None:
+            offsets = self._offsets[field]
+            text = str(self._texts[field][offsets[code]:offsets[code + 1]], "utf-8")
+            if decoded is not None:
+                decoded[code] = text
+        return text
+
+    def record(self, row):
+        """Decode one row as a Crop record."""
+        return Crop(*(self._text(field, row) for field in FIELDS))
+
+    def records(self):
+        """The rows as a list-like CatalogRecords, which keeps the catalog open."""
+        return CatalogRecords(self)
+
+    def value_bitsets(self):
+        """Per field, map each normalized value to an int bitset of the rows listing it."""
+        bitsets = {}
+        for field in MULTI_VALUE_FIELDS:
+            bitsets[field] = {
+                value: int.from_bytes(self._column(f"bitset:{field}:{position}"), "little")
+                for position, value in enumerate(self.header["vocab"][field])
+            }
+        return bitsets
+
+    def missing_bitsets(self):
+        """Per field, an int bitset of the rows that have no value for it."""
+        return {
+            field: int.from_bytes(self._column(f"missing:{field}"), "little")
+            for field in MULTI_VALUE_FIELDS
+        }
+
+class CatalogRecords(Sequence):
+    """
+    Crop records of an open CropCatalog, decoded on access, with list-style
+    append and extend for crops added after loading (kept in memory).
+    """
+
+    def __init__(self, catalog):
+        self._catalog = catalog
+        self._rows = catalog.rows
+        self._added = []
+
+    def __len__(self):
+        return self._rows + len(self._added)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("crop index out of range")
+        if index >= self._rows:
+            return self._added[index - self._rows]
+        return self._catalog.record(index)
+
+    def __iter__(self):
+        for row in range(self._rows):
+            yield self._catalog.record(row)
+        yield from self._added
+
+    def append(self, crop):
+        self._added.append(crop)
+
+    def extend(self, crops):
+        self._added.extend(crops)
+
+def load_catalog(catalog_path="crop_data.bin", csv_path="crop_data.csv"):
+    """Open a compiled catalog if it exists and is up to date with the CSV, else return None."""
+    if not os.path.exists(catalog_path):
+        return None
+    try:
+        catalog = CropCatalog(catalog_path)
+    except (OSError, ValueError) as e:
+        print(f"Error loading compiled crop catalog: {e}")
+        return None
+    if not catalog.is_current(csv_path):
+        catalog.close()
+        return None
+    return catalog
+
+# Convert the CSV when run directly
+if __name__ == "__main__":
+    csv_path = sys.argv[1] if len(sys.argv) > 1 else "crop_data.csv"
+    catalog_path = sys.argv[2] if len(sys.argv) > 2 else "crop_data.bin"
+    rows = compile_catalog(csv_path, catalog_path)
+    print(f"Compiled {rows} crops from {csv_path} into {catalog_path}.")
@@ -0,0 +1,222 @@
+#!/usr/bin/env python
+# Farm Planner Module for Agri Wiz
+# Chooses a crop for every parcel of a farm to maximize expected revenue under water and area limits
+
+import numpy as np
+from agri_wiz import AgriWiz
+from yield_estimation import YieldEstimator
+
+# Seasonal irrigation water per hectare (cubic meters) by crop water needs
+WATER_USE = {"low": 3000.0, "medium": 5500.0, "high": 9000.0}
+WATER_LEVELS = ["low", "medium", "high"]
+
+def _water_level(crop):
+    """Water needs level of a crop; a crop listing several levels counts as the highest."""
+    levels = [value.strip().lower() for value in (crop.get("water_needs") or "medium").split(",")]
+    return max((level for level in levels if level in WATER_USE), key=WATER_LEVELS.index, default="medium")
+
+class FarmPlanner:
+    """
+    Crop allocation across a farm's parcels.
+
+    Candidates for each parcel come from the AgriWiz recommendation filter
+    (get_recommendations_batch on the parcel's soil and its location's
+    climate, season, rainfall and humidity). Each candidate is scored with
+    YieldEstimator (climate match and water availability from
+    determine_climate_match and determine_water_availability) times the
+    crop's price. The plan maximizes total expected revenue subject to a
+    water budget and a planted-area budget.
+
+    The solver relaxes the water budget with a price per cubic meter found
+    by bisection: at a given price every parcel takes the candidate with
+    the best revenue net of water cost, and the area budget goes to the
+    parcels with the best net revenue per hectare. Water and area left over
+    at the final price are then filled greedily.
+    """
+
+    BISECTION_STEPS = 50
+
+    def __init__(self, agri_wiz=None, estimator=None):
+        self.agri_wiz = agri_wiz or AgriWiz()
+        self.estimator = estimator or YieldEstimator()
+        self._climate_matches = {}
+
+    def _climate_match(self, crop, climate):
+        """Best climate match of any of a crop's climates."""
+        key = (crop.get("climates"), climate)
+        match = self._climate_matches.get(key)
+        if match is None:
+            ranks = list(self.estimator.climate_match_factors)
+            matches = [self.estimator.determine_climate_match(preference.strip().lower(), climate)
+                       for preference in (crop.get("climates") or "").split(",")]
+            match = self._climate_matches[key] = max(matches, key=ranks.index, default="poor")
+        return match
+
+    def _describe_parcels(self, parcels):
+        """Soil, climate, season, rainfall, humidity and fertility of every parcel, as columns."""
+        location_manager = self.agri_wiz.location_manager
+        default_season = self.agri_wiz.get_current_season()
+        columns = {name: [] for name in ("soil_type", "climate", "season", "rainfall", "humidity", "soil_fertility")}
+        locations = {}
+        for parcel in parcels:
+            location = parcel.get("location")
+            if location not in locations:
+                info = location_manager.get_location_info(location) if location else None
+                season = location_manager.season_for(location) if info else None
+                locations[location] = (info or {}, season)
+            info, season = locations[location]
+            soils = info.get("common_soil_types") or ["loamy"]
+            columns["soil_type"].append(parcel.get("soil_type") or soils[0])
+            columns["climate"].append(parcel.get("climate") or info.get("climate", ""))
+            columns["season"].append(parcel.get("season") or season or default_season)
+            columns["rainfall"].append(parcel.get("rainfall") or info.get("rainfall"))
+            columns["humidity"].append(parcel.get("humidity") or info.get("humidity"))
+            columns["soil_fertility"].append(parcel.get("soil_fertility"))
+        return columns
+
+    def score(self, parcels, prices, farm_management=0.5):
+        """
+        Expected revenue and water use of every candidate crop on every parcel.
+
+        Returns:
+            Tuple (crop_names, revenue, water): revenue and water are
+            parcels x crops arrays, with revenue -inf where the crop is not
+            recommended for the parcel
+        """
+        columns = self._describe_parcels(parcels)
+        areas = np.array([float(parcel.get("area", 1.0)) for parcel in parcels])
+        matches, _ = self.agri_wiz.get_recommendations_batch(
+            columns["soil_type"], columns["climate"], columns["season"],
+            columns["rainfall"], columns["humidity"], columns["soil_fertility"]
+        )
+        # Yield per hectare depends only on fertility, climate and rainfall, which
+        # few distinct combinations cover, so score each combination once
+        combinations = {}
+        codes = np.array([
+            combinations.setdefault(((fertility or "medium"), climate, (rainfall or "medium").lower()), len(combinations))
+            for fertility, climate, rainfall in zip(columns["soil_fertility"], columns["climate"], columns["rainfall"])
+        ], dtype=np.intp)
+        fertility, climates, rainfall = (list(values) for values in zip(*combinations)) if combinations else ([], [], [])
+
+        crop_ids = [crop_id for crop_id, crop in enumerate(self.agri_wiz.crop_data)
+                    if crop["crop_name"] in self.estimator.base_yields and crop["crop_name"] in prices
+                    and matches[:, crop_id].any()]
+        revenue = np.full((len(parcels), len(crop_ids)), -np.inf)
+        water = np.zeros((len(parcels), len(crop_ids)))
+        for k, crop_id in enumerate(crop_ids):
+            crop = self.agri_wiz.crop_data[crop_id]
+            needs = _water_level(crop)
+            climate_match = [self._climate_match(crop, climate) for climate in climates]
+            water_availability = [self.estimator.determine_water_availability(needs, level) for level in rainfall]
+            result = self.estimator.estimate_yield_batch(
+                [crop["crop_name"]], fertility, water_availability, climate_match,
+                [farm_management], [1.0], price_per_unit=prices[crop["crop_name"]], grid=False
+            )
+            suited = matches[:, crop_id]
+            revenue[suited, k] = result["expected_revenue"][0][codes[suited]] * areas[suited]
+            water[:, k] = WATER_USE[needs] * areas
+        return [self.agri_wiz.crop_data[crop_id]["crop_name"] for crop_id in crop_ids], revenue, water
+
+    def _allocate(self, revenue, water, areas, water_price, area_budget):
+        """Best crop per parcel at a water price, and which parcels get planted within the area budget."""
+        net = revenue - water_price * water
+        choice = np.argmax(net, axis=1) if net.shape[1] else np.zeros(len(areas), dtype=np.intp)
+        value = net[np.arange(len(areas)), choice] if net.shape[1] else np.full(len(areas), -np.inf)
+        planted = value > 0
+        if area_budget is not None:
+            order = np.argsort(-(value / areas), kind="stable")
+            order = order[planted[order]]
+            planted = np.zeros(len(areas), dtype=bool)
+            planted[order[np.cumsum(areas[order]) <= area_budget]] = True
+        return choice, planted, value
+
+    def plan(self, parcels, prices, water_budget=None, area_budget=None, farm_management=0.5):
+        """
+        Choose a crop (or none) for every parcel.
+
+        Args:
+            parcels: Sequence of dicts with "area" (hectares), "location" and
+                optionally "soil_type", "soil_fertility" and "season"
+                (defaults come from the location)
+            prices: Dict of crop name -> price per unit; crops without a
+                price or yield data are not considered
+            water_budget: Total irrigation water available (cubic meters), or None
+            area_budget: Total area that may be planted (hectares), or None
+            farm_management: 0-1 management level used for every parcel
+
+        Returns:
+            Dict with per-parcel columns "crops" (name or None), "revenue" and
+            "water", plus "total_revenue", "water_used", "area_used",
+            "water_price" and, when only water is limited, "upper_bound" (the
+            Lagrangian bound no allocation can beat)
+        """
+        crop_names, revenue, water = self.score(parcels, prices, farm_management)
+        areas = np.array([float(parcel.get("area", 1.0)) for parcel in parcels])
+        rows = np.arange(len(parcels))
+
+        def water_used(price):
+            choice, planted, _ = self._allocate(revenue, water, areas, price, area_budget)
+            return water[rows, choice][planted].sum() if len(crop_names) else 0.0
+
+        water_price = 0.0
+        if water_budget is not None and water_used(0.0) > water_budget:
+            # Revenue per cubic meter above which no candidate is worth planting
+            low, high = 0.0, float(np.max(np.where(np.isfinite(revenue), revenue / water, 0.0)))
+            for _ in range(self.BISECTION_STEPS):
+                middle = (low + high) / 2
+                if water_used(middle) > water_budget:
+                    low = middle
+                else:
+                    high = middle
+            water_price = high
+
+        choice, planted, value = self._allocate(revenue, water, areas, water_price, area_budget)
+        chosen = np.where(planted, choice, -1)
+        upper_bound = None
+        if water_budget is not None and area_budget is None:
+            upper_bound = float(np.maximum(value, 0).sum() + water_price * water_budget)
+
+        # Fill the water and area the relaxed solution leaves unused
+        water_left = np.inf if water_budget is None else water_budget - water[rows, choice][planted].sum()
+        area_left = np.inf if area_budget is None else area_budget - areas[planted].sum()
+        if len(crop_names):
+            best_rate = np.max(np.where(np.isfinite(revenue), revenue / water, 0.0), axis=1)
+            for parcel in np.argsort(-best_rate, kind="stable"):
+                if planted[parcel] or best_rate[parcel] <= 0 or areas[parcel] > area_left:
+                    continue
+                options = np.where(water[parcel] <= water_left, revenue[parcel], -np.inf)
+                crop = int(np.argmax(options))
+                if np.isfinite(options[crop]) and options[crop] > 0:
+                    chosen[parcel] = crop
+                    planted[parcel] = True
+                    water_left -= water[parcel, crop]
+                    area_left -= areas[parcel]
+
+        parcel_revenue = np.where(planted, revenue[rows, np.maximum(chosen, 0)] if len(crop_names) else 0.0, 0.0)
+        parcel_water = np.where(planted, water[rows, np.maximum(chosen, 0)] if len(crop_names) else 0.0, 0.0)
+        return {
+            "crops": [crop_names[crop] if crop >= 0 else None for crop in chosen],
+            "revenue": parcel_revenue,
+            "water": parcel_water,
+            "total_revenue": float(parcel_revenue.sum()),
+            "water_used": float(parcel_water.sum()),
+            "area_used": float(areas[planted].sum()),
+            "water_price": water_price,
+            "upper_bound": upper_bound
+        }
+
+# Simple test if run directly
+if __name__ == "__main__":
+    planner = FarmPlanner()
+    parcels = [
+        {"area": 4.0, "location": "Punjab, India", "soil_fertility": "high", "season": "winter"},
+        {"area": 2.5, "location": "Punjab, India", "soil_type": "loamy", "season": "winter"},
+        {"area": 6.0, "location": "Kerala, India"},
+        {"area": 3.0, "location": "Kerala, India", "soil_fertility": "medium"},
+    ]
+    prices = {"Rice": 400, "Wheat": 350, "Corn": 250, "Cotton": 1500, "Sugarcane": 40, "Potato": 150,
+              "Banana": 300, "Coconut": 0.3, "Tea": 2500, "Coffee": 3000, "Black Pepper": 6000}
+    plan = planner.plan(parcels, prices, water_budget=100000)
+    for parcel, crop, revenue in zip(parcels, plan["crops"], plan["revenue"]):
+        print(f"{parcel['location']} ({parcel['area']} ha): {crop or 'leave fallow'} (${revenue:,.0f})")
+    print(f"Total expected revenue: ${plan['total_revenue']:,.0f} using {plan['water_used']:,.0f} m³ of water")
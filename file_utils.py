@@ -0,0 +1,38 @@
+#!/usr/bin/env python
+# File Utilities for Agri Wiz
+# Crash-safe helpers shared by the modules that persist data to disk
+
+import os
+import stat
+from contextlib import contextmanager
+
+@contextmanager
+def atomic_write(path, mode="w", **kwargs):
+    """
+    Write a file atomically.
+    
+    Yields a temporary file in the same directory as path and renames it
+    over path once the block finishes, so readers only ever see the old or
+    the new contents. If the block raises, path is left untouched.
+    """
+    import tempfile  # Slow to import, and only writers need it
+    
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, temp_path = tempfile.mkstemp(dir=directory, prefix=f".{os.path.basename(path)}.", suffix=".tmp")
+    try:
+        # mkstemp creates the file as 0600; keep the permissions of the file being replaced
+        if os.path.exists(path):
+            os.chmod(temp_path, stat.S_IMODE(os.stat(path).st_mode))
+        else:
+            os.chmod(temp_path, 0o644)
+        with os.fdopen(fd, mode, **kwargs) as file:
+            yield file
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(temp_path, path)
+    except BaseException:
+        try:
+            os.unlink(temp_path)
+        except OSError:
+            pass
+        raise
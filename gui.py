@@ -323,25 +323,13 @@ class AgriWizGUI:
         else:
             self.results_text.insert(tk.END, "No crops match your criteria exactly.\n")
             # Get alternative recommendations with lower match requirements
-            alternatives = []
-            for crop in self.agri_wiz.crop_data:
-                matches = 0
-                total_parameters = 3
-                
-                if any(s.strip().lower() == soil_type.lower() for s in crop["soil_types"].split(",")):
-                    matches += 1
-                if any(c.strip().lower() == climate.lower() for c in crop["climates"].split(",")):
-                    matches += 1
-                if any(s.strip().lower() == season.lower() for s in crop["seasons"].split(",")):
-                    matches += 1
-                
-                match_percentage = (matches / total_parameters) * 100
-                if match_percentage >= 60:
-                    alternatives.append((crop, match_percentage))
+            alternatives = self.agri_wiz.get_alternatives(
+                soil_type, climate, season, humidity, soil_fertility
+            )
             
             if alternatives:
                 self.results_text.insert(tk.END, "\nConsider these alternatives:\n\n")
-                for crop, percentage in sorted(alternatives, key=lambda x: x[1], reverse=True)[:5]:
+                for crop, _, percentage in alternatives:
                     self.results_text.insert(tk.END,
                         f"{crop['crop_name']} - {percentage:.0f}% match\n"
                         f"   Water needs: {crop['water_needs']}\n"
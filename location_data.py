@@ -4,18 +4,211 @@
 
 import json
 import os
-from datetime import datetime
+import re
+import sys
+import threading
+import unicodedata
+from datetime import date, datetime
+from file_utils import atomic_write
+
+MONTHS = ["january", "february", "march", "april", "may", "june",
+          "july", "august", "september", "october", "november", "december"]
+_MONTH_NUMBERS = {name: number for number, name in enumerate(MONTHS, 1)}
+_MONTH_NUMBERS.update({name[:3]: number for number, name in enumerate(MONTHS, 1)})
+
+def compile_season_table(seasons):
+    """
+    Compile a location's seasons block into a 12-entry month -> season tuple.
+    
+    Index 0 is January. A month listed under several seasons (Punjab lists
+    July as both summer and rainy) belongs to the first season listed,
+    which is what the month-by-month scan always returned.
+    """
+    table = [None] * 12
+    for season, months in (seasons or {}).items():
+        for month in months:
+            number = _MONTH_NUMBERS.get(str(month).strip().lower())
+            if number and table[number - 1] is None:
+                table[number - 1] = season
+    return tuple(table)
+
+# Runs of letters and digits in any script; everything else separates words
+_NAME_WORD = re.compile(r"[^\W_]+")
+
+def normalize_location_name(name):
+    """
+    Normalize a location name to database key form ("Punjab, India" -> "punjab_india").
+    
+    Accents are folded away, so "São Paulo" and "Sao Paulo" share the key
+    "sao_paulo"; letters without an ASCII base (as in "東京") are kept.
+    """
+    name = name.casefold()
+    if not name.isascii():
+        name = "".join(char for char in unicodedata.normalize("NFKD", name) if not unicodedata.combining(char))
+    return "_".join(_NAME_WORD.findall(name))
+
+def _trigrams(key):
+    """Character trigrams of a normalized key, padded so word boundaries count."""
+    padded = f"  {key.replace('_', ' ')} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+def shard_for(location_key, location_info):
+    """
+    Name of the shard a location is stored in: its "region" or "country"
+    field when present, otherwise the first character of its key.
+    """
+    region = (location_info or {}).get("region") or (location_info or {}).get("country")
+    return normalize_location_name(region) if region else (location_key[:1] or "_")
+
+class ShardedLocationStore:
+    """
+    Location database split into one JSON file per shard, loaded on demand.
+    
+    Each shard is stored as <data_dir>/<shard>.json (the full location
+    records) plus <data_dir>/<shard>.index.json (keys and aliases only).
+    Opening the store reads just the small index files, a shard's records
+    are read the first time one of its locations is accessed, and saving a
+    location rewrites only its shard. Supports the dict operations
+    LocationManager uses on location_data.
+    """
+    
+    def __init__(self, data_dir):
+        self.data_dir = data_dir
+        self._shard_of = {}
+        self._aliases = {}
+        self._shards = {}
+        self._lock = threading.Lock()
+        for file_name in sorted(os.listdir(data_dir)):
+            if file_name.endswith(".index.json"):
+                shard = file_name[:-len(".index.json")]
+                with open(os.path.join(data_dir, file_name), "r") as file:
+                    for key, aliases in json.load(file).items():
+                        self._shard_of[key] = shard
+                        self._aliases[key] = aliases
+    
+    def _shard_path(self, shard, suffix=".json"):
+        return os.path.join(self.data_dir, f"{shard}{suffix}")
+    
+    def _load_shard(self, shard):
+        """Return a shard's records, reading its file on first use."""
+        records = self._shards.get(shard)
+        if records is None:
+            with self._lock:
+                records = self._shards.get(shard)
+                if records is None:
+                    path = self._shard_path(shard)
+                    records = {}
+                    if os.path.exists(path):
+                        with open(path, "r") as file:
+                            records = json.load(file)
+                    self._shards[shard] = records
+        return records
+    
+    def aliases(self, key):
+        return self._aliases.get(key, [])
+    
+    def loaded_shards(self):
+        return list(self._shards)
+    
+    def get(self, key, default=None):
+        shard = self._shard_of.get(key)
+        if shard is None:
+            return default
+        return self._load_shard(shard).get(key, default)
+    
+    def __getitem__(self, key):
+        shard = self._shard_of.get(key)
+        if shard is None:
+            raise KeyError(key)
+        return self._load_shard(shard)[key]
+    
+    def __setitem__(self, key, info):
+        shard = shard_for(key, info)
+        previous = self._shard_of.get(key)
+        if previous is not None and previous != shard:
+            self._load_shard(previous).pop(key, None)
+            self.save_shard(previous)
+        self._load_shard(shard)[key] = info
+        self._shard_of[key] = shard
+        self._aliases[key] = list(info.get("aliases", [])) if info else []
+    
+    def __contains__(self, key):
+        return key in self._shard_of
+    
+    def __iter__(self):
+        return iter(self._shard_of)
+    
+    def __len__(self):
+        return len(self._shard_of)
+    
+    def keys(self):
+        return self._shard_of.keys()
+    
+    def items(self):
+        return [(key, self[key]) for key in self._shard_of]
+    
+    def save_shard(self, shard):
+        """Atomically rewrite one shard's records and index file."""
+        records = self._load_shard(shard)
+        with atomic_write(self._shard_path(shard), "w") as file:
+            json.dump(records, file, indent=4)
+        with atomic_write(self._shard_path(shard, ".index.json"), "w") as file:
+            json.dump({key: self._aliases.get(key, []) for key in records}, file)
+    
+    def save_location(self, key):
+        """Persist the shard holding a location."""
+        self.save_shard(self._shard_of[key])
+    
+    def save_all(self):
+        for shard in sorted(set(self._shard_of.values())):
+            self.save_shard(shard)
+
+def migrate_to_shards(json_path="location_data.json", data_dir="location_data"):
+    """
+    Split a monolithic location JSON file into a sharded store.
+    
+    Returns the number of shards written. The source file is left in place;
+    LocationManager prefers the sharded directory once it exists.
+    """
+    with open(json_path, "r") as file:
+        location_data = json.load(file)
+    os.makedirs(data_dir, exist_ok=True)
+    store = ShardedLocationStore(data_dir)
+    for key, info in location_data.items():
+        store[key] = info
+    store.save_all()
+    return len(set(store._shard_of.values()))
 
 class LocationManager:
-    def __init__(self):
+    # Minimum trigram similarity (Jaccard) for a fuzzy name match
+    FUZZY_MATCH_THRESHOLD = 0.5
+    
+    # Maximum number of raw names remembered by the resolution cache
+    RESOLUTION_CACHE_SIZE = 10000
+    
+    def __init__(self, storage=None):
         self.location_data = {}
+        self.data_file = "location_data.json"
+        self.data_dir = "location_data"  # Sharded storage, see migrate_to_shards
+        self.storage = storage  # Optional Storage backend (see storage.py) used instead of the files
+        self.change_listeners = []  # Called with the key of an added location, or None after a reload
         self.load_location_data()
     
     def load_location_data(self):
-        """Load location data from JSON file."""
+        """Load location data from the storage backend or sharded store if present, else from the JSON file."""
         try:
-            if os.path.exists("location_data.json"):
-                with open("location_data.json", "r") as file:
+            if self.storage is not None:
+                self.location_data = self.storage.load_locations()
+                if self.location_data:
+                    print(f"Loaded {len(self.location_data)} locations from {self.storage}.")
+                else:
+                    print("Location database is empty. Creating sample data.")
+                    self.create_sample_data()
+            elif os.path.isdir(self.data_dir):
+                self.location_data = ShardedLocationStore(self.data_dir)
+                print(f"Found {len(self.location_data)} locations in sharded database.")
+            elif os.path.exists(self.data_file):
+                with open(self.data_file, "r") as file:
                     self.location_data = json.load(file)
                 print(f"Loaded {len(self.location_data)} locations from database.")
             else:
@@ -24,6 +217,119 @@ class LocationManager:
         except Exception as e:
             print(f"Error loading location data: {e}")
             self.create_sample_data()
+        self._build_lookup_index()
+        self._notify(None)
+    
+    def _notify(self, location_key):
+        """Tell the change listeners that a location (or, for None, the whole database) changed."""
+        for listener in self.change_listeners:
+            listener(location_key)
+    
+    def _build_lookup_index(self):
+        """
+        Index location names for forgiving lookups.
+        
+        Besides the normalized key itself, a location can be found through
+        the names in its optional "aliases" list, through its name tokens
+        ("Kerala" -> kerala_india, "Pune, Maharashtra" -> pune), or by
+        trigram similarity for misspellings.
+        """
+        self._names = {}
+        self._tokens = {}
+        self._key_tokens = {}
+        self._trigram_index = {}
+        self._trigram_counts = {}
+        self._resolved = {}
+        self._season_tables = {}
+        for key in self.location_data.keys():
+            self._index_location(key, self._aliases_of(key))
+    
+    def _aliases_of(self, key):
+        """Aliases of a stored location, without loading a shard when sharded."""
+        if isinstance(self.location_data, ShardedLocationStore):
+            return self.location_data.aliases(key)
+        return (self.location_data.get(key) or {}).get("aliases", [])
+    
+    def _index_location(self, key, aliases):
+        """Add one location to the lookup index."""
+        self._names[normalize_location_name(key)] = key
+        for alias in aliases:
+            self._names.setdefault(normalize_location_name(alias), key)
+        
+        tokens = frozenset(normalize_location_name(key).split("_"))
+        self._key_tokens[key] = tokens
+        for token in tokens:
+            self._tokens.setdefault(token, set()).add(key)
+        
+        trigrams = _trigrams(normalize_location_name(key))
+        self._trigram_counts[key] = len(trigrams)
+        for trigram in trigrams:
+            self._trigram_index.setdefault(trigram, set()).add(key)
+        
+        # Compiled again on next use, from the location's current seasons
+        self._season_tables.pop(key, None)
+        
+        # Names that failed (or matched fuzzily) before may resolve differently now
+        self._resolved = {}
+    
+    def resolve_location(self, location_name):
+        """
+        Resolve a user-supplied location name to its database key.
+        
+        Tries, in order: the key as given, the normalized name or an alias,
+        an unambiguous token match and a trigram fuzzy match. Returns None
+        when nothing matches or the name is ambiguous (e.g. just "India").
+        """
+        if location_name in self.location_data:
+            return location_name
+        if location_name in self._resolved:
+            return self._resolved[location_name]
+        
+        key = self._resolve_uncached(normalize_location_name(location_name))
+        if len(self._resolved) >= self.RESOLUTION_CACHE_SIZE:
+            self._resolved = {}
+        self._resolved[location_name] = key
+        return key
+    
+    def _resolve_uncached(self, name):
+        if not name:
+            return None
+        if name in self._names:
+            return self._names[name]
+        
+        # Token match: keys containing every query token ("kerala" -> kerala_india),
+        # preferring the one with the fewest extra tokens
+        tokens = frozenset(name.split("_"))
+        candidates = set.intersection(*(self._tokens.get(token, set()) for token in tokens))
+        if candidates:
+            return self._pick_unique(candidates, lambda key: len(self._key_tokens[key]))
+        
+        # Keys whose tokens all appear in the query ("pune_maharashtra_india" -> pune),
+        # preferring the most specific one
+        candidates = {key for token in tokens for key in self._tokens.get(token, ())
+                      if self._key_tokens[key] <= tokens}
+        if candidates:
+            return self._pick_unique(candidates, lambda key: -len(self._key_tokens[key]))
+        
+        # Fuzzy match on trigram (Jaccard) similarity; a tie for the best score is ambiguous
+        trigrams = _trigrams(name)
+        shared = {}
+        for trigram in trigrams:
+            for key in self._trigram_index.get(trigram, ()):
+                shared[key] = shared.get(key, 0) + 1
+        scores = {key: count / (len(trigrams) + self._trigram_counts[key] - count) for key, count in shared.items()}
+        candidates = [key for key, score in scores.items() if score >= self.FUZZY_MATCH_THRESHOLD]
+        if candidates:
+            return self._pick_unique(candidates, lambda key: -scores[key])
+        return None
+    
+    @staticmethod
+    def _pick_unique(candidates, rank):
+        """Return the best-ranked candidate, or None if several share the best rank."""
+        ranked = sorted(candidates, key=rank)
+        if len(ranked) > 1 and rank(ranked[0]) == rank(ranked[1]):
+            return None
+        return ranked[0]
     
     def create_sample_data(self):
         """Create sample location data if no data file exists."""
@@ -72,37 +378,88 @@ class LocationManager:
         self.save_location_data()
         print("Location data saved successfully.")
     
-    def save_location_data(self):
-        """Save location data to JSON file."""
+    def save_location_data(self, location_key=None):
+        """
+        Save location data.
+        
+        With a storage backend only location_key is written (every location
+        if no key is given). With sharded storage only the shard holding
+        location_key is rewritten (every shard if no key is given);
+        otherwise the whole JSON file is. Either way the file is replaced
+        atomically.
+        """
         try:
-            with open("location_data.json", "w") as file:
+            if self.storage is not None:
+                if location_key is None:
+                    self.storage.save_locations(self.location_data)
+                else:
+                    self.storage.save_location(location_key, self.location_data[location_key])
+                return
+            if isinstance(self.location_data, ShardedLocationStore):
+                if location_key is None:
+                    self.location_data.save_all()
+                else:
+                    self.location_data.save_location(location_key)
+                return
+            with atomic_write(self.data_file, "w") as file:
                 json.dump(self.location_data, file, indent=4)
         except Exception as e:
             print(f"Error saving location data: {e}")
     
     def get_location_info(self, location_name):
         """Get information for a specific location."""
-        location_key = location_name.lower().replace(" ", "_")
+        location_key = self.resolve_location(location_name)
+        if location_key is None:
+            return None
         return self.location_data.get(location_key)
     
     def add_location(self, location_name, location_info):
         """Add a new location to the database."""
-        location_key = location_name.lower().replace(" ", "_")
+        location_key = normalize_location_name(location_name)
         self.location_data[location_key] = location_info
-        self.save_location_data()
+        self._index_location(location_key, (location_info or {}).get("aliases", []))
+        self.save_location_data(location_key)
+        self._notify(location_key)
         print(f"Added {location_name} to the database.")
     
-    def get_current_season_for_location(self, location_name):
-        """Get the current season for a location based on current month."""
-        location_info = self.get_location_info(location_name)
-        if not location_info or "seasons" not in location_info:
+    def season_for(self, location_name, month=None):
+        """
+        Get the season of a location in a given month.
+        
+        The location's month -> season table (see compile_season_table) is
+        compiled the first time it is asked for and kept until the location
+        is reloaded or added again, so locations that are never queried cost
+        nothing.
+        
+        Args:
+            location_name: Location name (resolved like get_location_info)
+            month: Month number (1-12), month name, date/datetime, or None for the current month
+            
+        Returns:
+            Season name, or None if the location or month is unknown
+        """
+        location_key = self.resolve_location(location_name)
+        if location_key is None:
             return None
         
-        current_month = datetime.now().strftime("%B").lower()
-        for season, months in location_info["seasons"].items():
-            if current_month in months:
-                return season
-        return None
+        if month is None:
+            month = datetime.now().month
+        elif isinstance(month, (date, datetime)):
+            month = month.month
+        elif isinstance(month, str):
+            month = _MONTH_NUMBERS.get(month.strip().lower())
+        if not month or not 1 <= month <= 12:
+            return None
+        
+        table = self._season_tables.get(location_key)
+        if table is None:
+            location_info = self.location_data.get(location_key) or {}
+            table = self._season_tables[location_key] = compile_season_table(location_info.get("seasons"))
+        return table[month - 1]
+    
+    def get_current_season_for_location(self, location_name):
+        """Get the current season for a location based on current month."""
+        return self.season_for(location_name)
     
     def get_all_locations(self):
         """Get list of all locations in the database."""
@@ -134,4 +491,14 @@ class LocationManager:
         location_info = self.get_location_info(location_name)
         if location_info and "soil_fertility" in location_info:
             return location_info["soil_fertility"]
-        return None
\ No newline at end of file
+        return None
+
+# Split location_data.json into a sharded store when run as "python location_data.py migrate"
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "migrate":
+        json_path = sys.argv[2] if len(sys.argv) > 2 else "location_data.json"
+        data_dir = sys.argv[3] if len(sys.argv) > 3 else "location_data"
+        shards = migrate_to_shards(json_path, data_dir)
+        print(f"Migrated {json_path} into {shards} shards in {data_dir}/.")
+    else:
+        print("Usage: python location_data.py migrate [location_data.json] [location_data]")
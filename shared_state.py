@@ -0,0 +1,271 @@
+#!/usr/bin/env python
+# Shared State Module for Agri Wiz
+# Keeps the crop catalog, location database and weather cache consistent across worker processes
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from file_utils import atomic_write
+from weather_api import WeatherCache
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+class FileLock:
+    """
+    Advisory lock on a file, shared between processes.
+
+    Every acquisition opens the lock file anew, so threads of one process
+    exclude each other the same way separate processes do. On Windows a
+    shared lock is taken as an exclusive one.
+    """
+
+    def __init__(self, path):
+        self.path = path
+
+    @contextmanager
+    def hold(self, exclusive=True):
+        file = open(self.path, "a+b")
+        try:
+            if fcntl is not None:
+                fcntl.flock(file.fileno(), fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            else:
+                file.seek(0)
+                msvcrt.locking(file.fileno(), msvcrt.LK_LOCK, 1)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(file.fileno(), fcntl.LOCK_UN)
+                else:
+                    file.seek(0)
+                    msvcrt.locking(file.fileno(), msvcrt.LK_UNLCK, 1)
+        finally:
+            file.close()
+
+def file_stamp(path):
+    """Cheap change marker of a file or directory: (inode, mtime in ns, size), or None if it is missing."""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_ino, stat.st_mtime_ns, stat.st_size
+
+class SharedWeatherCache:
+    """
+    Weather cache entries shared by every process through an SQLite
+    database in WAL mode, so readers never wait for the writer.
+
+    Entries are keyed like WeatherCache; for a key the entry with the
+    newest timestamp wins.
+    """
+
+    # Seconds a write waits for another process's write to finish
+    BUSY_TIMEOUT = 10.0
+
+    def __init__(self, path="weather_cache.db"):
+        self.path = path
+        self._local = threading.local()
+        connection = self._connection()
+        connection.execute("PRAGMA journal_mode=WAL")
+        with connection:
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS weather ("
+                "key TEXT PRIMARY KEY, timestamp REAL NOT NULL, data TEXT NOT NULL)"
+            )
+
+    def _connection(self):
+        """The calling thread's connection (SQLite connections can't be shared between threads)."""
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = self._local.connection = sqlite3.connect(self.path, timeout=self.BUSY_TIMEOUT)
+            # Durable at checkpoints rather than every commit; a lost entry is just refetched
+            connection.execute("PRAGMA synchronous=NORMAL")
+        return connection
+
+    def get(self, location):
+        """Saved weather data for a location, or None."""
+        row = self._connection().execute(
+            "SELECT data FROM weather WHERE key = ?", (WeatherCache.normalize_key(location),)
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def put(self, location, data):
+        """Save weather data (dated by data["timestamp"]) unless a newer entry is already saved."""
+        connection = self._connection()
+        with connection:
+            connection.execute(
+                "INSERT INTO weather (key, timestamp, data) VALUES (?, ?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET timestamp = excluded.timestamp, data = excluded.data "
+                "WHERE excluded.timestamp >= weather.timestamp",
+                (WeatherCache.normalize_key(location), data.get("timestamp", 0), json.dumps(data))
+            )
+
+    def sweep(self, max_age):
+        """Delete entries older than max_age seconds; returns how many were deleted."""
+        connection = self._connection()
+        with connection:
+            return connection.execute("DELETE FROM weather WHERE timestamp < ?", (time.time() - max_age,)).rowcount
+
+    def close(self):
+        """Close the calling thread's connection."""
+        connection = getattr(self._local, "connection", None)
+        if connection is not None:
+            connection.close()
+            self._local.connection = None
+
+class SharedState:
+    """
+    Lets several processes (e.g. web server workers) serve one AgriWiz
+    database.
+
+    Writers run inside update(part), which holds an exclusive file lock,
+    brings this process up to date first and then bumps the part's
+    generation counter in the generations file. refresh(), meant to run
+    before every request, compares the generations file and the data
+    files' stamps (inode, mtime, size) with what this process last loaded
+    and reloads only the parts that changed, so an unchanged state costs a
+    few stat calls. Given a WeatherAPI, its cache is also shared through
+    SharedWeatherCache.
+    """
+
+    PARTS = ("crops", "locations")
+
+    def __init__(self, agri_wiz, weather_api=None, state_dir=None):
+        self.agri_wiz = agri_wiz
+        self.state_dir = state_dir or os.path.dirname(os.path.abspath(agri_wiz.crop_file))
+        self.lock = FileLock(os.path.join(self.state_dir, "shared_state.lock"))
+        self.generations_file = os.path.join(self.state_dir, "shared_state.json")
+        self._thread_lock = threading.Lock()
+        self._generations_stamp = None
+        self._generations = {}
+        self._loaded = {}  # part -> (generation, data file stamps) as of the last load
+        self.reloads = {part: 0 for part in self.PARTS}
+
+        if weather_api is not None:
+            weather_api.shared_cache = SharedWeatherCache(os.path.join(self.state_dir, "weather_cache.db"))
+
+        with self.lock.hold(exclusive=False):
+            for part in self.PARTS:
+                self._loaded[part] = (self._generation(part), self._stamps(part))
+
+    def _paths(self, part):
+        if part == "crops":
+            return self.agri_wiz.crop_file, self.agri_wiz.catalog_file
+        location_manager = self.agri_wiz.location_manager
+        return location_manager.data_file, location_manager.data_dir
+
+    def _stamps(self, part):
+        return tuple(file_stamp(path) for path in self._paths(part))
+
+    def _generation(self, part):
+        """A part's generation counter, rereading the generations file only when it changed."""
+        stamp = file_stamp(self.generations_file)
+        if stamp != self._generations_stamp:
+            try:
+                with open(self.generations_file, "r") as file:
+                    self._generations = json.load(file)
+            except (OSError, ValueError):
+                self._generations = {}
+            self._generations_stamp = stamp
+        return self._generations.get(part, 0)
+
+    def _reload(self, part, repair=True):
+        """Reload a part; returns True if the crop file has a torn row that was not repaired."""
+        torn = False
+        if part == "crops":
+            torn = bool(self.agri_wiz.load_crop_data(repair=repair))
+        else:
+            self.agri_wiz.location_manager.load_location_data()
+        self.reloads[part] += 1
+        return torn
+
+    def _changed_parts(self):
+        return [part for part in self.PARTS
+                if self._loaded[part] != (self._generation(part), self._stamps(part))]
+
+    def _catch_up(self, parts, repair=True):
+        """
+        Reload parts (with the file lock held) and remember what was loaded.
+
+        Returns True if repair is False and the crop file needs rewriting.
+        """
+        torn = False
+        for part in parts:
+            torn = self._reload(part, repair) or torn
+            self._loaded[part] = (self._generation(part), self._stamps(part))
+        return torn
+
+    def refresh(self):
+        """
+        Reload whatever another process changed since this one last loaded it.
+
+        Returns the list of parts reloaded.
+        """
+        with self._thread_lock:
+            changed = self._changed_parts()
+            if not changed:
+                return []
+            # Writers hold the lock exclusively, so no file is read mid-append
+            with self.lock.hold(exclusive=False):
+                changed = self._changed_parts()
+                torn = self._catch_up(changed, repair=False)
+            if torn:
+                # Dropping a torn row rewrites the crop file, which needs the exclusive lock
+                with self.lock.hold(exclusive=True):
+                    if "crops" not in self._changed_parts():
+                        self.agri_wiz.save_crop_data()
+                        self._loaded["crops"] = (self._generation("crops"), self._stamps("crops"))
+            return changed
+
+    @contextmanager
+    def update(self, part):
+        """
+        Context for changing a part ("crops" or "locations") of the shared state.
+
+        Holds the exclusive file lock, reloads any changes from other
+        processes first (so the write builds on the latest data), and bumps
+        the part's generation when the block completes.
+        """
+        if part not in self.PARTS:
+            raise ValueError(f"Unknown shared state part: {part}")
+        with self._thread_lock, self.lock.hold(exclusive=True):
+            self._catch_up(self._changed_parts())
+            yield
+            generations = {name: self._generation(name) for name in self.PARTS}
+            generations[part] += 1
+            with atomic_write(self.generations_file, "w") as file:
+                json.dump(generations, file)
+            self._loaded[part] = (self._generation(part), self._stamps(part))
+
+# Show two handles on one database directory picking up each other's changes when run directly
+if __name__ == "__main__":
+    import contextlib
+    import io
+    import shutil
+    import tempfile
+    from agri_wiz import AgriWiz
+
+    with tempfile.TemporaryDirectory() as directory:
+        def worker():
+            with contextlib.redirect_stdout(io.StringIO()):
+                agri_wiz = AgriWiz()
+            agri_wiz.crop_file = os.path.join(directory, "crop_data.csv")
+            agri_wiz.catalog_file = os.path.join(directory, "crop_data.bin")
+            return agri_wiz, SharedState(agri_wiz, state_dir=directory)
+
+        shutil.copy("crop_data.csv", directory)
+        first, first_state = worker()
+        second, second_state = worker()
+        with first_state.update("crops"):
+            first.add_crop({"crop_name": "Quinoa", "soil_types": "sandy,loamy", "climates": "temperate",
+                            "seasons": "spring", "water_needs": "low"})
+        print(f"Second worker reloaded: {second_state.refresh()}, "
+              f"knows Quinoa: {any(crop['crop_name'] == 'Quinoa' for crop in second.crop_data)}")
+        print(f"Nothing changed since: {second_state.refresh() == []}")
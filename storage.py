@@ -0,0 +1,388 @@
+#!/usr/bin/env python
+# Storage Module for Agri Wiz
+# Pluggable persistence for crops, locations and weather cache entries, with an SQLite implementation
+
+import csv
+import json
+import os
+import sqlite3
+import sys
+import threading
+from abc import ABC, abstractmethod
+from crop_catalog import FIELDS, MULTI_VALUE_FIELDS, Crop, WaterNeeds, read_crop_rows
+from file_utils import atomic_write
+
+# Location fields stored in their own columns or tables; any others are kept as JSON
+LOCATION_COLUMNS = ["climate", "rainfall", "humidity", "soil_fertility"]
+LOCATION_FIELDS = ["common_soil_types"] + LOCATION_COLUMNS + ["seasons", "aliases"]
+
+# Sort position of each WaterNeeds level when rainfall is high or low (see agri_wiz.WATER_RANKS)
+WATER_ORDER = {
+    "high": f"CASE water_level WHEN {WaterNeeds.HIGH:d} THEN 0 WHEN {WaterNeeds.MEDIUM:d} THEN 1 ELSE 2 END",
+    "low": f"CASE water_level WHEN {WaterNeeds.LOW:d} THEN 0 WHEN {WaterNeeds.MEDIUM:d} THEN 1 ELSE 2 END",
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS crops (
+    id INTEGER PRIMARY KEY,
+    crop_name TEXT NOT NULL,
+    soil_types TEXT,
+    climates TEXT,
+    seasons TEXT,
+    water_needs TEXT,
+    humidity_preference TEXT,
+    soil_fertility TEXT,
+    water_level INTEGER
+);
+CREATE INDEX IF NOT EXISTS crops_name ON crops (crop_name);
+-- No foreign key on crop_id: crops are only replaced together with their
+-- values, and enforcing it makes bulk deletes several times slower
+CREATE TABLE IF NOT EXISTS crop_values (
+    attribute TEXT NOT NULL,
+    value TEXT NOT NULL,
+    crop_id INTEGER NOT NULL,
+    PRIMARY KEY (attribute, value, crop_id)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS locations (
+    key TEXT PRIMARY KEY,
+    position INTEGER NOT NULL,
+    climate TEXT,
+    rainfall TEXT,
+    humidity TEXT,
+    soil_fertility TEXT,
+    extra TEXT
+);
+CREATE INDEX IF NOT EXISTS locations_climate ON locations (climate);
+CREATE TABLE IF NOT EXISTS location_soil_types (
+    location_key TEXT NOT NULL REFERENCES locations (key) ON DELETE CASCADE,
+    position INTEGER NOT NULL,
+    soil_type TEXT NOT NULL,
+    PRIMARY KEY (location_key, position)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS location_soil_types_soil ON location_soil_types (soil_type);
+CREATE TABLE IF NOT EXISTS location_seasons (
+    location_key TEXT NOT NULL REFERENCES locations (key) ON DELETE CASCADE,
+    season_position INTEGER NOT NULL,
+    season TEXT NOT NULL,
+    month_position INTEGER NOT NULL,
+    month TEXT,
+    PRIMARY KEY (location_key, season_position, month_position)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS location_aliases (
+    location_key TEXT NOT NULL REFERENCES locations (key) ON DELETE CASCADE,
+    position INTEGER NOT NULL,
+    alias TEXT NOT NULL,
+    PRIMARY KEY (location_key, position)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS location_aliases_alias ON location_aliases (alias);
+
+CREATE TABLE IF NOT EXISTS weather (
+    key TEXT PRIMARY KEY,
+    timestamp REAL NOT NULL,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS weather_timestamp ON weather (timestamp);
+"""
+
+class Storage(ABC):
+    """
+    Interface of a persistence backend.
+
+    AgriWiz, LocationManager and WeatherAPI accept a Storage instance
+    (their storage argument) in place of crop_data.csv, location_data.json
+    and weather_cache.json.
+    """
+
+    @abstractmethod
+    def load_crops(self):
+        """All crops, as Crop records in catalog order."""
+
+    @abstractmethod
+    def save_crops(self, crops):
+        """Replace all crops."""
+
+    @abstractmethod
+    def append_crops(self, crops):
+        """Add crops after the existing ones."""
+
+    @abstractmethod
+    def get_recommendations(self, soil_type, climate, season, rainfall=None, humidity=None, soil_fertility=None):
+        """
+        The crops AgriWiz.get_recommendations returns for the same catalog,
+        in the same order, without loading the catalog. AgriWiz answers
+        with it until its catalog is loaded.
+        """
+
+    @abstractmethod
+    def load_locations(self):
+        """Dict of location key -> location info."""
+
+    @abstractmethod
+    def save_locations(self, locations):
+        """Replace all locations."""
+
+    @abstractmethod
+    def save_location(self, key, info):
+        """Add or replace one location."""
+
+    @abstractmethod
+    def load_weather(self):
+        """Dict of cache key -> weather data."""
+
+    @abstractmethod
+    def save_weather(self, entries, expire_before=None):
+        """
+        Add or replace weather cache entries (a dict of cache key -> weather
+        data), and drop every entry with a timestamp before expire_before.
+        """
+
+class SQLiteStorage(Storage):
+    """
+    Storage in one SQLite database, in WAL mode so readers in other
+    processes never wait for a writer.
+
+    Crops keep their field text in the crops table, and every normalized
+    value of a multi-valued field is a row of crop_values, indexed by
+    (attribute, value), so get_recommendations runs as an SQL query.
+    Locations are split into their scalar fields, soil types, season
+    months and aliases. Every write is one transaction.
+    """
+
+    # Seconds a write waits for another connection's write to finish
+    BUSY_TIMEOUT = 30.0
+
+    def __init__(self, path="agri_wiz.db"):
+        self.path = path
+        self._local = threading.local()
+        connection = self._connection()
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.executescript(SCHEMA)
+
+    def __str__(self):
+        return self.path
+
+    def _connection(self):
+        """The calling thread's connection (SQLite connections can't be shared between threads)."""
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = self._local.connection = sqlite3.connect(self.path, timeout=self.BUSY_TIMEOUT)
+            connection.execute("PRAGMA foreign_keys=ON")
+            connection.execute("PRAGMA synchronous=NORMAL")
+        return connection
+
+    def close(self):
+        """Close the calling thread's connection."""
+        connection = getattr(self._local, "connection", None)
+        if connection is not None:
+            connection.close()
+            self._local.connection = None
+
+    # Crops
+
+    def load_crops(self):
+        rows = self._connection().execute(f"SELECT {', '.join(FIELDS)} FROM crops ORDER BY id")
+        return [Crop(*row) for row in rows]
+
+    def _insert_crops(self, connection, crops, start):
+        crops = [Crop.from_dict(crop) for crop in crops]
+        connection.executemany(
+            f"INSERT INTO crops (id, {', '.join(FIELDS)}, water_level) VALUES ({', '.join('?' * (len(FIELDS) + 2))})",
+            ((crop_id, *(getattr(crop, field) for field in FIELDS), crop.water)
+             for crop_id, crop in enumerate(crops, start))
+        )
+        # Inserted in key order, which builds the index far faster than row order
+        connection.executemany(
+            "INSERT INTO crop_values (attribute, value, crop_id) VALUES (?, ?, ?)",
+            sorted((field, value, crop_id)
+                   for crop_id, crop in enumerate(crops, start)
+                   for field in MULTI_VALUE_FIELDS
+                   for value in (crop.value_set(field) or ()))
+        )
+
+    def save_crops(self, crops):
+        connection = self._connection()
+        with connection:
+            connection.execute("DELETE FROM crop_values")
+            connection.execute("DELETE FROM crops")
+            self._insert_crops(connection, crops, 0)
+
+    def append_crops(self, crops):
+        connection = self._connection()
+        with connection:
+            start = connection.execute("SELECT COALESCE(MAX(id) + 1, 0) FROM crops").fetchone()[0]
+            self._insert_crops(connection, crops, start)
+
+    def get_recommendations(self, soil_type, climate, season, rainfall=None, humidity=None, soil_fertility=None):
+        def normalize(value):
+            return (value or "").strip().lower()
+
+        conditions = []
+        parameters = []
+        for field, value in (("soil_types", soil_type), ("climates", climate), ("seasons", season)):
+            conditions.append("id IN (SELECT crop_id FROM crop_values WHERE attribute = ? AND value = ?)")
+            parameters += [field, normalize(value)]
+        # Optional parameters (if provided); crops without the attribute still match
+        for field, value in (("humidity_preference", humidity), ("soil_fertility", soil_fertility)):
+            if normalize(value):
+                conditions.append(f"({field} IS NULL OR id IN "
+                                  "(SELECT crop_id FROM crop_values WHERE attribute = ? AND value = ?))")
+                parameters += [field, normalize(value)]
+
+        order = WATER_ORDER.get(normalize(rainfall))
+        query = (f"SELECT {', '.join(FIELDS)} FROM crops WHERE {' AND '.join(conditions)} "
+                 f"ORDER BY {order + ', ' if order else ''}id")
+        return [Crop(*row) for row in self._connection().execute(query, parameters)]
+
+    # Locations
+
+    def load_locations(self):
+        connection = self._connection()
+        locations = {}
+        for key, *values, extra in connection.execute(
+                f"SELECT key, {', '.join(LOCATION_COLUMNS)}, extra FROM locations ORDER BY position"):
+            info = {"common_soil_types": []}
+            info.update((field, value) for field, value in zip(LOCATION_COLUMNS, values) if value is not None)
+            locations[key] = info
+            if extra:
+                info.update(json.loads(extra))
+
+        for key, soil_type in connection.execute(
+                "SELECT location_key, soil_type FROM location_soil_types ORDER BY location_key, position"):
+            locations[key]["common_soil_types"].append(soil_type)
+        for key, season, month in connection.execute(
+                "SELECT location_key, season, month FROM location_seasons "
+                "ORDER BY location_key, season_position, month_position"):
+            months = locations[key].setdefault("seasons", {}).setdefault(season, [])
+            if month is not None:
+                months.append(month)
+        for key, alias in connection.execute(
+                "SELECT location_key, alias FROM location_aliases ORDER BY location_key, position"):
+            locations[key].setdefault("aliases", []).append(alias)
+
+        # Put the fields back in their usual order
+        return {
+            key: {field: info[field] for field in sorted(info, key=lambda field: (
+                LOCATION_FIELDS.index(field) if field in LOCATION_FIELDS else len(LOCATION_FIELDS)))}
+            for key, info in locations.items()
+        }
+
+    def _insert_location(self, connection, key, info, position):
+        extra = {field: value for field, value in info.items() if field not in LOCATION_FIELDS}
+        connection.execute(
+            f"INSERT INTO locations (key, position, {', '.join(LOCATION_COLUMNS)}, extra) "
+            f"VALUES ({', '.join('?' * (len(LOCATION_COLUMNS) + 3))})",
+            (key, position, *(info.get(field) for field in LOCATION_COLUMNS), json.dumps(extra) if extra else None)
+        )
+        connection.executemany(
+            "INSERT INTO location_soil_types (location_key, position, soil_type) VALUES (?, ?, ?)",
+            ((key, i, soil_type) for i, soil_type in enumerate(info.get("common_soil_types") or []))
+        )
+        # A season without months is kept as a single row with a NULL month
+        connection.executemany(
+            "INSERT INTO location_seasons (location_key, season_position, season, month_position, month) "
+            "VALUES (?, ?, ?, ?, ?)",
+            ((key, i, season, j, month)
+             for i, (season, months) in enumerate((info.get("seasons") or {}).items())
+             for j, month in (enumerate(months) if months else [(0, None)]))
+        )
+        connection.executemany(
+            "INSERT INTO location_aliases (location_key, position, alias) VALUES (?, ?, ?)",
+            ((key, i, alias) for i, alias in enumerate(info.get("aliases") or []))
+        )
+
+    def save_locations(self, locations):
+        connection = self._connection()
+        with connection:
+            connection.execute("DELETE FROM locations")
+            for position, (key, info) in enumerate(locations.items()):
+                self._insert_location(connection, key, info, position)
+
+    def save_location(self, key, info):
+        connection = self._connection()
+        with connection:
+            row = connection.execute("SELECT position FROM locations WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                row = connection.execute("SELECT COALESCE(MAX(position) + 1, 0) FROM locations").fetchone()
+            connection.execute("DELETE FROM locations WHERE key = ?", (key,))
+            self._insert_location(connection, key, info, row[0])
+
+    # Weather cache
+
+    def load_weather(self):
+        rows = self._connection().execute("SELECT key, data FROM weather ORDER BY timestamp")
+        return {key: json.loads(data) for key, data in rows}
+
+    def save_weather(self, entries, expire_before=None):
+        connection = self._connection()
+        with connection:
+            connection.executemany(
+                "INSERT INTO weather (key, timestamp, data) VALUES (?, ?, ?) "
+                "ON CONFLICT (key) DO UPDATE SET timestamp = excluded.timestamp, data = excluded.data",
+                ((key, data.get("timestamp", 0), json.dumps(data)) for key, data in entries.items())
+            )
+            if expire_before is not None:
+                connection.execute("DELETE FROM weather WHERE timestamp < ?", (expire_before,))
+
+def import_files(storage, crop_file="crop_data.csv", location_file="location_data.json",
+                 weather_file="weather_cache.json"):
+    """
+    Copy the flat CSV/JSON files into a storage backend; missing files are skipped. Returns row counts.
+
+    The crop file is read as AgriWiz reads it (see read_crop_rows): extra
+    columns are ignored and a torn last row is skipped. Weather entries are
+    stored under their WeatherCache keys, as WeatherAPI writes them; of
+    several names for one location the newest entry is kept.
+    """
+    counts = {}
+    if os.path.exists(crop_file):
+        rows, extra, torn = read_crop_rows(crop_file)
+        if extra:
+            print(f"Ignoring extra columns in {crop_file}: {', '.join(extra)}")
+        if torn:
+            print(f"Skipping incomplete last row in {crop_file}.")
+        crops = [Crop.from_dict(row) for row in rows]
+        storage.save_crops(crops)
+        counts["crops"] = len(crops)
+    if os.path.exists(location_file):
+        with open(location_file, "r") as file:
+            locations = json.load(file)
+        storage.save_locations(locations)
+        counts["locations"] = len(locations)
+    if os.path.exists(weather_file):
+        from weather_api import WeatherCache  # Pulls in the location and synthetic weather modules
+
+        with open(weather_file, "r") as file:
+            entries = json.load(file)
+        weather = {}
+        for location, data in sorted(entries.items(), key=lambda item: item[1].get("timestamp", 0)):
+            weather[WeatherCache.normalize_key(location)] = data
+        storage.save_weather(weather)
+        counts["weather"] = len(weather)
+    return counts
+
+def export_files(storage, crop_file="crop_data.csv", location_file="location_data.json",
+                 weather_file="weather_cache.json"):
+    """Write a storage backend's contents to the flat CSV/JSON files, each replaced atomically."""
+    with atomic_write(crop_file, "w", newline="") as file:
+        writer = csv.DictWriter(file, fieldnames=FIELDS)
+        writer.writeheader()
+        writer.writerows(crop.to_dict() for crop in storage.load_crops())
+    with atomic_write(location_file, "w") as file:
+        json.dump(storage.load_locations(), file, indent=4)
+    with atomic_write(weather_file, "w") as file:
+        json.dump(storage.load_weather(), file)
+
+# Convert between the flat files and a database:
+#   python storage.py import [agri_wiz.db]   or   python storage.py export [agri_wiz.db]
+if __name__ == "__main__":
+    if len(sys.argv) < 2 or sys.argv[1] not in ("import", "export"):
+        print("Usage: python storage.py import|export [database]")
+        sys.exit(1)
+    storage = SQLiteStorage(sys.argv[2] if len(sys.argv) > 2 else "agri_wiz.db")
+    if sys.argv[1] == "import":
+        counts = import_files(storage)
+        print(f"Imported {', '.join(f'{count} {name}' for name, count in counts.items())} into {storage}")
+    else:
+        export_files(storage)
+        print(f"Exported {storage} to crop_data.csv, location_data.json and weather_cache.json")
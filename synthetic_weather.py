@@ -0,0 +1,191 @@
+#!/usr/bin/env python
+# Synthetic Weather Module for Agri Wiz
+# Deterministic mock weather with seasonal curves, for demos, tests and benchmarks
+
+import datetime
+import hashlib
+import json
+import math
+import os
+from location_data import ShardedLocationStore, normalize_location_name, MONTHS
+
+# Climate -> (mean temperature, seasonal amplitude in °C, day of year of the warmest day)
+CLIMATE_PROFILES = {
+    "tropical": (27.0, 3.0, 130),
+    "subtropical": (24.0, 8.0, 150),
+    "temperate": (12.0, 10.0, 200),
+    "arid": (26.0, 9.0, 190),
+    "mediterranean": (17.0, 7.0, 210),
+}
+DEFAULT_CLIMATE_PROFILE = (20.0, 8.0, 180)
+
+# Location rainfall level -> mean hourly rainfall in mm, location humidity level -> mean humidity in %
+RAINFALL_LEVELS = {"low": 0.3, "medium": 0.9, "moderate": 0.9, "high": 1.6}
+HUMIDITY_LEVELS = {"low": 35.0, "medium": 55.0, "high": 72.0}
+
+# Adjustments in the months of a location's "rainy" season and in the other months
+RAINY_MONTH_RAINFALL = 2.5
+DRY_MONTH_RAINFALL = 0.4
+RAINY_MONTH_HUMIDITY = 12.0
+
+# Half-widths of the uniform day-to-day noise
+TEMPERATURE_NOISE = 3.0
+HUMIDITY_NOISE = 10.0
+
+_MASK64 = 0xFFFFFFFFFFFFFFFF
+_GOLDEN_GAMMA = 0x9E3779B97F4A7C15
+_EPOCH = datetime.date(1970, 1, 1)
+_DAYS_PER_YEAR = 365.2425
+
+def stable_hash(text):
+    """64-bit hash of a location name that is the same in every process (unlike hash())."""
+    key = normalize_location_name(text) or text.strip().lower()
+    return int.from_bytes(hashlib.blake2b(key.encode("utf-8"), digest_size=8).digest(), "little")
+
+def _splitmix64(x):
+    x = (x + _GOLDEN_GAMMA) & _MASK64
+    x = ((x ^ (x >> 30)) * 0xBF58476D1CE4E5B9) & _MASK64
+    x = ((x ^ (x >> 27)) * 0x94D049BB133111EB) & _MASK64
+    return x ^ (x >> 31)
+
+def _uniform(seed, day, stream):
+    """Uniform [0, 1) value for a location seed, day number and noise stream."""
+    return (_splitmix64((seed ^ (day * _GOLDEN_GAMMA) ^ (stream << 56)) & _MASK64) >> 11) / 2.0 ** 53
+
+def _describe(temperature, rainfall):
+    if rainfall > 3.0:
+        return "Heavy rain"
+    if rainfall > 1.5:
+        return "Light rain"
+    if rainfall > 0.5:
+        return "Cloudy"
+    if temperature > 30:
+        return "Sunny and hot"
+    if temperature < 5:
+        return "Cold and clear"
+    return "Clear sky"
+
+def _load_location_data():
+    if os.path.isdir("location_data"):
+        return ShardedLocationStore("location_data")
+    if os.path.exists("location_data.json"):
+        with open("location_data.json", "r") as file:
+            return json.load(file)
+    return {}
+
+class SyntheticWeather:
+    """
+    Deterministic synthetic weather per location and day.
+
+    Values depend only on the location name and the date: a location's
+    climate, rainfall and humidity levels and rainy-season months (from the
+    location database, with generic defaults for unknown names) give the
+    seasonal curves, and a stable hash of the name seeds the day-to-day
+    noise. observation() computes one day in pure Python; grid() computes
+    locations x days with NumPy using the same formulas.
+    """
+
+    def __init__(self, location_data=None):
+        self._location_data = location_data
+        self._profiles = {}
+
+    @property
+    def location_data(self):
+        if self._location_data is None:
+            self._location_data = _load_location_data()
+        return self._location_data
+
+    def profile(self, location):
+        """
+        Curve parameters of a location: (seed, mean temperature, amplitude,
+        warmest day of year, mean rainfall, mean humidity, rainy month flags).
+        """
+        key = normalize_location_name(location) or location.strip().lower()
+        profile = self._profiles.get(key)
+        if profile is None:
+            info = self.location_data.get(key) or {}
+            mean, amplitude, warmest_day = CLIMATE_PROFILES.get(info.get("climate"), DEFAULT_CLIMATE_PROFILE)
+            rainy_months = {month.lower() for month in (info.get("seasons") or {}).get("rainy", [])}
+            profile = self._profiles[key] = (
+                stable_hash(key), mean, amplitude, warmest_day,
+                RAINFALL_LEVELS.get(info.get("rainfall"), 0.8),
+                HUMIDITY_LEVELS.get(info.get("humidity"), 55.0),
+                tuple(month in rainy_months for month in MONTHS)
+            )
+        return profile
+
+    def observation(self, location, day=None):
+        """Weather for one location on one date (today by default), in the WeatherAPI format."""
+        day = day or datetime.date.today()
+        seed, mean, amplitude, warmest_day, rainfall_mean, humidity_mean, rainy_months = self.profile(location)
+        day_number = (day - _EPOCH).days
+        rainy = rainy_months[day.month - 1]
+
+        phase = 2 * math.pi * (day_number - warmest_day) / _DAYS_PER_YEAR
+        temperature = (mean + amplitude * math.cos(phase)
+                       + TEMPERATURE_NOISE * (2 * _uniform(seed, day_number, 0) - 1))
+        rainfall = (-math.log1p(-_uniform(seed, day_number, 1)) * rainfall_mean
+                    * (RAINY_MONTH_RAINFALL if rainy else DRY_MONTH_RAINFALL))
+        humidity = min(100.0, max(5.0, humidity_mean + (RAINY_MONTH_HUMIDITY if rainy else 0.0)
+                                  + HUMIDITY_NOISE * (2 * _uniform(seed, day_number, 2) - 1)))
+        return {
+            "temperature": round(temperature, 1),
+            "humidity": round(humidity, 0),
+            "rainfall": round(rainfall, 1),
+            "description": _describe(temperature, rainfall)
+        }
+
+    def grid(self, locations, start=None, days=365):
+        """
+        Weather for every location on each of `days` consecutive dates from
+        start (today by default), computed in one vectorized pass.
+
+        Returns a dict with "temperature", "humidity" and "rainfall" float64
+        arrays of shape (len(locations), days), unrounded, plus "dates"
+        (datetime64[D] array of the days).
+        """
+        import numpy as np
+
+        start = start or datetime.date.today()
+        profiles = [self.profile(location) for location in locations]
+        seeds = np.array([profile[0] for profile in profiles], dtype=np.uint64)[:, None]
+        mean, amplitude, warmest_day, rainfall_mean, humidity_mean = (
+            np.array([profile[i] for profile in profiles], dtype=np.float64)[:, None] for i in range(1, 6))
+        rainy_months = np.array([profile[6] for profile in profiles], dtype=bool).reshape(len(profiles), 12)
+
+        day_numbers = np.arange((start - _EPOCH).days, (start - _EPOCH).days + days, dtype=np.int64)
+        dates = day_numbers.astype("datetime64[D]")
+        months = dates.astype("datetime64[M]").astype(np.int64) % 12
+        rainy = rainy_months[:, months]
+
+        phase = 2 * np.pi * (day_numbers - warmest_day) / _DAYS_PER_YEAR
+        temperature = (mean + amplitude * np.cos(phase)
+                       + TEMPERATURE_NOISE * (2 * _uniform_grid(seeds, day_numbers, 0) - 1))
+        rainfall = (-np.log1p(-_uniform_grid(seeds, day_numbers, 1)) * rainfall_mean
+                    * np.where(rainy, RAINY_MONTH_RAINFALL, DRY_MONTH_RAINFALL))
+        humidity = np.clip(humidity_mean + np.where(rainy, RAINY_MONTH_HUMIDITY, 0.0)
+                           + HUMIDITY_NOISE * (2 * _uniform_grid(seeds, day_numbers, 2) - 1), 5.0, 100.0)
+        return {"temperature": temperature, "humidity": humidity, "rainfall": rainfall, "dates": dates}
+
+def _uniform_grid(seeds, day_numbers, stream):
+    """Vectorized _uniform over a column of seeds and a row of day numbers (uint64 arithmetic wraps)."""
+    import numpy as np
+
+    x = seeds ^ (day_numbers.astype(np.uint64) * np.uint64(_GOLDEN_GAMMA)) ^ np.uint64(stream << 56)
+    x = x + np.uint64(_GOLDEN_GAMMA)
+    x = (x ^ (x >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+    x = (x ^ (x >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    x = x ^ (x >> np.uint64(31))
+    return (x >> np.uint64(11)).astype(np.float64) / 2.0 ** 53
+
+# Print a week of synthetic weather when run directly
+if __name__ == "__main__":
+    weather = SyntheticWeather()
+    today = datetime.date.today()
+    for location in ["Punjab, India", "Kerala, India", "Unknown Place"]:
+        print(location)
+        for offset in range(7):
+            day = today + datetime.timedelta(days=offset)
+            data = weather.observation(location, day)
+            print(f"  {day}: {data['temperature']}°C, {data['humidity']}% humidity, "
+                  f"{data['rainfall']}mm rain, {data['description']}")
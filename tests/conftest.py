@@ -0,0 +1,67 @@
+import contextlib
+import io
+import json
+import os
+import shutil
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+@pytest.fixture
+def data_dir(tmp_path, monkeypatch):
+    """A working directory holding copies of the repository's data files."""
+    for name in ("crop_data.csv", "location_data.json"):
+        shutil.copy(os.path.join(ROOT, name), tmp_path)
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
+
+@pytest.fixture
+def agri_wiz(data_dir):
+    """An AgriWiz loaded from the copied crop database, with its load messages discarded."""
+    from agri_wiz import AgriWiz
+    
+    with contextlib.redirect_stdout(io.StringIO()):
+        return AgriWiz()
+
+class _UpstreamHandler(BaseHTTPRequestHandler):
+    """OpenWeatherMap stand-in: describes the weather as the location asked for."""
+    protocol_version = "HTTP/1.1"
+    
+    def log_message(self, *args):
+        pass
+    
+    def do_GET(self):
+        server = self.server
+        location = parse_qs(urlsplit(self.path).query)["q"][0]
+        with server.lock:
+            server.requests.append((location, self.client_address, time.monotonic()))
+        time.sleep(server.delays.get(location, server.delay))
+        if location == "broken":
+            status, body = 500, b"{}"
+        else:
+            status, body = 200, json.dumps({"main": {"temp": 20, "humidity": 50},
+                                            "weather": [{"description": location}]}).encode()
+        self.send_response(status)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+@pytest.fixture
+def upstream():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _UpstreamHandler)
+    server.daemon_threads = True
+    server.lock = threading.Lock()
+    server.requests = []
+    server.delay = 0.0
+    server.delays = {}
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield server
+    server.shutdown()
+    server.server_close()
@@ -0,0 +1,70 @@
+import contextlib
+import io
+import itertools
+
+LEVELS = ["", "low", "medium", "high"]
+
+def _names(crops):
+    return [crop["crop_name"] for crop in crops]
+
+def test_batch_matches_scalar_past_64_crops(agri_wiz):
+    varieties = [dict(crop.to_dict(), crop_name=f"{crop['crop_name']} {i}")
+                 for i, crop in enumerate(agri_wiz.crop_data * 2)]
+    with contextlib.redirect_stdout(io.StringIO()):
+        agri_wiz.add_crops_bulk(varieties)
+    assert len(agri_wiz.crop_data) > 64
+    
+    rows = list(itertools.product(sorted(agri_wiz._index["soil_types"]), sorted(agri_wiz._index["climates"]),
+                                  sorted(agri_wiz._index["seasons"]), LEVELS, ["", "medium"], ["", "high"]))
+    matches, order = agri_wiz.get_recommendations_batch(*zip(*rows))
+    for i, row in enumerate(rows):
+        batch = [agri_wiz.crop_data[crop_id] for crop_id in order[i, :matches[i].sum()]]
+        assert _names(batch) == _names(agri_wiz.get_recommendations(*row)), row
+
+def test_alternatives_are_cached_until_the_catalog_changes(agri_wiz):
+    first = agri_wiz.get_alternatives("loamy", "tropical", "winter", "high", top_k=None)
+    assert agri_wiz.get_alternatives(" Loamy", "TROPICAL", "winter", "high", top_k=None) == first
+    assert len(agri_wiz._alternatives_cache) == 1
+    
+    with contextlib.redirect_stdout(io.StringIO()):
+        agri_wiz.add_crop({"crop_name": "Taro", "soil_types": "loamy", "climates": "tropical",
+                           "seasons": "rainy", "water_needs": "high", "humidity_preference": "high"})
+    assert not agri_wiz._alternatives_cache
+    after = agri_wiz.get_alternatives("loamy", "tropical", "winter", "high", top_k=None)
+    assert "Taro" in _names(crop for crop, _, _ in after)
+
+def test_extra_csv_columns_are_ignored(agri_wiz):
+    with open(agri_wiz.crop_file) as file:
+        lines = file.read().splitlines()
+    lines[0] += ",notes"
+    lines[1] += ",grown since 1990"
+    lines[2] += ",,surplus value"
+    with open(agri_wiz.crop_file, "w") as file:
+        file.write("\n".join(lines) + "\n")
+    
+    with contextlib.redirect_stdout(io.StringIO()) as output:
+        agri_wiz.load_crop_data()
+    assert "Ignoring extra columns" in output.getvalue()
+    assert len(agri_wiz.crop_data) == len(lines) - 1
+    with open(agri_wiz.crop_file) as file:
+        assert file.read().splitlines() == lines
+
+def test_unreadable_crop_file_is_not_replaced(agri_wiz, monkeypatch):
+    with open(agri_wiz.crop_file, "rb") as file:
+        contents = file.read()
+    def broken_reader(file):
+        raise UnicodeDecodeError("utf-8", b"\xff", 0, 1, "invalid start byte")
+    monkeypatch.setattr("csv.DictReader", broken_reader)
+    with contextlib.redirect_stdout(io.StringIO()):
+        agri_wiz.load_crop_data()
+    assert agri_wiz.crop_data  # Sample data
+    with open(agri_wiz.crop_file, "rb") as file:
+        assert file.read() == contents
+
+def test_iter_bits_yields_set_positions_in_order():
+    from agri_wiz import SPARSE_BITS, _iter_bits
+    sparse = [0, 7, 8, 63, 64, 1000, 99999]
+    dense = list(range(0, 5 * SPARSE_BITS, 2)) + [4096, 4103]
+    for positions in ([], [0], sparse, dense):
+        bits = sum(1 << position for position in positions)
+        assert list(_iter_bits(bits)) == positions
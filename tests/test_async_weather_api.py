@@ -0,0 +1,72 @@
+import asyncio
+import contextlib
+import io
+import threading
+import time
+
+from async_weather_api import AsyncWeatherAPI
+from shared_state import SharedWeatherCache
+from weather_api import WeatherAPI
+
+def _async_api(upstream):
+    with contextlib.redirect_stdout(io.StringIO()):
+        return AsyncWeatherAPI(weather_api=WeatherAPI("test-key", f"http://127.0.0.1:{upstream.server_port}/data"))
+
+def _run(coroutine):
+    with contextlib.redirect_stdout(io.StringIO()):
+        return asyncio.run(coroutine)
+
+def test_sync_and_async_callers_share_one_fetch(data_dir, upstream):
+    upstream.delay = 0.3
+    api = _async_api(upstream)
+    results = {}
+    
+    async def async_first():
+        fetch = asyncio.ensure_future(api.get_weather_data("Pune"))
+        await asyncio.sleep(0.1)
+        thread = threading.Thread(target=lambda: results.update(sync=api.weather_api.get_weather_data("pune")))
+        thread.start()
+        results["async"] = await fetch
+        await asyncio.to_thread(thread.join)
+    
+    async def sync_first():
+        thread = threading.Thread(target=lambda: results.update(sync=api.weather_api.get_weather_data("Delhi")))
+        thread.start()
+        await asyncio.sleep(0.1)
+        results["async"] = await api.get_weather_data("delhi")
+        await asyncio.to_thread(thread.join)
+    
+    for scenario, location in ((async_first, "Pune"), (sync_first, "Delhi")):
+        _run(scenario())
+        assert results["sync"]["description"] == results["async"]["description"] == location
+    assert [location for location, _, _ in upstream.requests] == ["Pune", "Delhi"]
+    _run(api.close())
+
+def test_shared_cache_is_consulted(data_dir, upstream):
+    api = _async_api(upstream)
+    api.weather_api.shared_cache = SharedWeatherCache(str(data_dir / "weather_cache.db"))
+    api.weather_api.shared_cache.put("Pune", {"temperature": 25, "humidity": 40, "rainfall": 0,
+                                              "description": "from another worker", "timestamp": time.time()})
+    assert _run(api.get_weather_data("pune"))["description"] == "from another worker"
+    assert upstream.requests == []
+    _run(api.close())
+
+def test_zero_timeout_does_not_wait(data_dir, upstream):
+    upstream.delay = 1.0
+    api = _async_api(upstream)
+    start = time.monotonic()
+    data = _run(api.get_weather_data("Pune", timeout=0))
+    assert time.monotonic() - start < 0.5
+    assert data["description"] != "Pune"
+
+def test_requests_reuse_one_keep_alive_connection(data_dir, upstream):
+    api = _async_api(upstream)
+    
+    async def fetch_in_turn():
+        for location in ("Pune", "Delhi", "Nagpur"):
+            assert (await api.get_weather_data(location))["description"] == location
+    
+    _run(fetch_in_turn())
+    assert [location for location, _, _ in upstream.requests] == ["Pune", "Delhi", "Nagpur"]
+    assert len({client for _, client, _ in upstream.requests}) == 1
+    _run(api.close())
@@ -0,0 +1,43 @@
+import contextlib
+import io
+
+from crop_catalog import compile_catalog, load_catalog
+
+def test_compiled_catalog_matches_the_csv(agri_wiz):
+    with open(agri_wiz.crop_file, "a") as file:
+        file.write('Quinoa,sandy,temperate,spring,low,low,"low,medium"\n')
+    with contextlib.redirect_stdout(io.StringIO()):
+        agri_wiz.load_crop_data()
+    from_csv = [crop.to_dict() for crop in agri_wiz.crop_data]
+    expected = agri_wiz.get_recommendations("sandy", "temperate", "spring", "low", "high", "low")
+    
+    assert compile_catalog(agri_wiz.crop_file, agri_wiz.catalog_file) == len(from_csv)
+    with contextlib.redirect_stdout(io.StringIO()):
+        agri_wiz.load_crop_data()
+    assert type(agri_wiz.crop_data).__name__ == "CatalogRecords"
+    assert [crop.to_dict() for crop in agri_wiz.crop_data] == from_csv
+    assert agri_wiz.crop_data[-1]["crop_name"] == "Quinoa"
+    assert agri_wiz.get_recommendations("sandy", "temperate", "spring", "low", "high", "low") == expected
+    
+    with contextlib.redirect_stdout(io.StringIO()):
+        agri_wiz.add_crop({"crop_name": "Amaranth", "soil_types": "sandy", "climates": "temperate",
+                           "seasons": "spring", "water_needs": "low"})
+    assert len(agri_wiz.crop_data) == len(from_csv) + 1
+    assert "Amaranth" in [crop["crop_name"] for crop in agri_wiz.get_recommendations("sandy", "temperate", "spring")]
+
+def test_catalog_is_ignored_once_the_csv_changes(agri_wiz):
+    compile_catalog(agri_wiz.crop_file, agri_wiz.catalog_file)
+    with open(agri_wiz.crop_file, "a") as file:
+        file.write("Quinoa,sandy,temperate,spring,low,low,low\n")
+    assert load_catalog(agri_wiz.catalog_file, agri_wiz.crop_file) is None
+
+def test_torn_last_row_is_left_out_like_the_csv_loader_does(agri_wiz):
+    with open(agri_wiz.crop_file, "a") as file:
+        file.write("Jackfruit,loamy\n")
+    with contextlib.redirect_stdout(io.StringIO()):
+        agri_wiz.load_crop_data(repair=False)
+    
+    assert compile_catalog(agri_wiz.crop_file, agri_wiz.catalog_file) == len(agri_wiz.crop_data)
+    catalog = load_catalog(agri_wiz.catalog_file, agri_wiz.crop_file)
+    assert [crop.to_dict() for crop in catalog.records()] == [crop.to_dict() for crop in agri_wiz.crop_data]
+    assert "Jackfruit" not in [crop["crop_name"] for crop in catalog.records()]
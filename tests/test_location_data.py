@@ -0,0 +1,35 @@
+import contextlib
+import io
+
+import pytest
+
+from location_data import LocationManager
+
+@pytest.fixture
+def location_manager(data_dir):
+    with contextlib.redirect_stdout(io.StringIO()):
+        return LocationManager()
+
+def _add(location_manager, name):
+    with contextlib.redirect_stdout(io.StringIO()):
+        location_manager.add_location(name, {"common_soil_types": ["loamy"], "climate": "temperate",
+                                             "rainfall": "medium", "humidity": "medium", "seasons": {}})
+
+def test_resolve_location_forms(location_manager):
+    assert location_manager.resolve_location("Punjab, India") == "punjab_india"
+    assert location_manager.resolve_location("punjab india") == "punjab_india"
+    assert location_manager.resolve_location("Kerala") == "kerala_india"
+    assert location_manager.resolve_location("India") is None
+
+def test_fuzzy_match_ties_are_ambiguous(location_manager):
+    _add(location_manager, "Tamar")
+    assert location_manager.resolve_location("tama") == "tamar"
+    _add(location_manager, "Tamas")
+    assert location_manager.resolve_location("tama") is None
+
+def test_non_ascii_names_keep_their_letters(location_manager):
+    _add(location_manager, "São Paulo, Brazil")
+    assert "sao_paulo_brazil" in location_manager.location_data
+    assert location_manager.resolve_location("Sao Paulo, Brazil") == "sao_paulo_brazil"
+    _add(location_manager, "東京")
+    assert location_manager.resolve_location("東京") == "東京"
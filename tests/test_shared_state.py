@@ -0,0 +1,92 @@
+import contextlib
+import csv
+import io
+import sys
+import threading
+
+import shared_state
+from agri_wiz import AgriWiz
+from shared_state import SharedState
+
+def _write_crops(path, count):
+    with open(path, "w", newline="") as file:
+        writer = csv.DictWriter(file, fieldnames=AgriWiz.CROP_FIELDS)
+        writer.writeheader()
+        for i in range(count):
+            writer.writerow({"crop_name": f"Crop {i}", "soil_types": "loamy", "climates": "tropical",
+                             "seasons": "rainy", "water_needs": "medium", "humidity_preference": "",
+                             "soil_fertility": ""})
+
+def test_queries_during_reloads_see_one_catalog(data_dir, monkeypatch):
+    # Every query computes its result instead of reading the cache
+    monkeypatch.setattr(AgriWiz, "RECOMMENDATION_CACHE_SIZE", 0)
+    _write_crops(data_dir / "small.csv", 3)
+    _write_crops(data_dir / "large.csv", 300)
+    with contextlib.redirect_stdout(io.StringIO()):
+        agri_wiz = AgriWiz()
+        agri_wiz.crop_file = str(data_dir / "large.csv")
+        agri_wiz.load_crop_data()
+    stop = threading.Event()
+    errors = []
+    
+    def reader():
+        while not stop.is_set():
+            try:
+                count = len(agri_wiz.get_recommendations("loamy", "tropical", "rainy"))
+                alternatives = agri_wiz.get_alternatives("loamy", "tropical", "winter", top_k=None, min_match=0)
+                matches, _ = agri_wiz.get_recommendations_batch(["loamy"], ["tropical"], ["rainy"])
+                assert count in (3, 300) and len(alternatives) in (3, 300) and matches.sum() in (3, 300)
+            except Exception as e:
+                errors.append(e)
+                return
+    
+    # Switch threads often, so queries land between the steps of a reload
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-5)
+    try:
+        threads = [threading.Thread(target=reader) for _ in range(3)]
+        with contextlib.redirect_stdout(io.StringIO()):
+            for thread in threads:
+                thread.start()
+            for i in range(60):
+                agri_wiz.crop_file = str(data_dir / ("small.csv" if i % 2 else "large.csv"))
+                agri_wiz.load_crop_data()
+            stop.set()
+            for thread in threads:
+                thread.join()
+    finally:
+        sys.setswitchinterval(interval)
+    
+    assert errors == []
+
+def test_torn_row_is_repaired_under_the_exclusive_lock(data_dir, monkeypatch):
+    with contextlib.redirect_stdout(io.StringIO()):
+        agri_wiz = AgriWiz()
+        state = SharedState(agri_wiz, state_dir=str(data_dir))
+        crop_count = len(agri_wiz.crop_data)
+        with open(agri_wiz.crop_file, "a", newline="") as file:
+            file.write("Quinoa,sandy\r\n")
+        
+        held = []
+        hold = shared_state.FileLock.hold
+        
+        @contextlib.contextmanager
+        def recording_hold(self, exclusive=True):
+            with hold(self, exclusive):
+                held.append(exclusive)
+                try:
+                    yield
+                finally:
+                    held.pop()
+        
+        monkeypatch.setattr(shared_state.FileLock, "hold", recording_hold)
+        writes = []
+        save_crop_data = agri_wiz.save_crop_data
+        monkeypatch.setattr(agri_wiz, "save_crop_data", lambda: (writes.append(list(held)), save_crop_data()))
+        assert state.refresh() == ["crops"]
+    
+    assert writes == [[True]]
+    assert len(agri_wiz.crop_data) == crop_count
+    with open(agri_wiz.crop_file, newline="") as file:
+        assert "Quinoa" not in file.read()
+    assert state.refresh() == []
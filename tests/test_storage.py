@@ -0,0 +1,75 @@
+import contextlib
+import io
+import json
+import time
+
+import pytest
+
+from agri_wiz import AgriWiz
+from storage import SQLiteStorage, Storage, import_files
+from weather_api import WeatherAPI, WeatherCache
+
+@pytest.fixture
+def storage(data_dir):
+    storage = SQLiteStorage(str(data_dir / "agri_wiz.db"))
+    yield storage
+    storage.close()
+
+def test_storage_backends_must_implement_the_interface():
+    class PartialStorage(Storage):
+        def load_crops(self):
+            return []
+    
+    with pytest.raises(TypeError):
+        Storage()
+    with pytest.raises(TypeError):
+        PartialStorage()
+
+def test_recommendations_run_in_sql_until_the_catalog_is_loaded(agri_wiz, storage, monkeypatch):
+    import_files(storage, weather_file="")
+    queries = []
+    get_recommendations = storage.get_recommendations
+    monkeypatch.setattr(storage, "get_recommendations", lambda *args: queries.append(args) or get_recommendations(*args))
+    with contextlib.redirect_stdout(io.StringIO()):
+        stored = AgriWiz(storage=storage)
+        assert stored._catalog is None
+        for query in (("loamy", "tropical", "rainy"), ("Clay", "subtropical", "summer", "high", "high", "medium")):
+            assert stored.get_recommendations(*query) == agri_wiz.get_recommendations(*query)
+        assert len(queries) == 2 and stored._catalog is None
+        
+        assert len(stored.crop_data) == len(agri_wiz.crop_data)
+        assert stored.get_recommendations("loamy", "temperate", "winter") == agri_wiz.get_recommendations("loamy", "temperate", "winter")
+    assert len(queries) == 2
+
+def test_imported_weather_is_keyed_like_the_cache(data_dir, storage):
+    now = time.time()
+    with open(data_dir / "weather.json", "w") as file:
+        json.dump({"punjab india": {"temperature": 20, "timestamp": now - 60},
+                   "Punjab, India": {"temperature": 30, "timestamp": now}}, file)
+    assert import_files(storage, crop_file="", location_file="", weather_file=str(data_dir / "weather.json")) == {"weather": 1}
+    assert storage.load_weather() == {WeatherCache.normalize_key("Punjab, India"): {"temperature": 30, "timestamp": now}}
+    
+    with contextlib.redirect_stdout(io.StringIO()):
+        weather_api = WeatherAPI(storage=storage)
+        assert weather_api.get_weather_data("punjab india")["temperature"] == 30
+        weather_api.close()
+
+def test_expired_weather_is_pruned_when_the_cache_is_written(storage):
+    storage.save_weather({"old": {"temperature": 10, "timestamp": 0}})
+    with contextlib.redirect_stdout(io.StringIO()):
+        weather_api = WeatherAPI(storage=storage)
+        weather_api.get_weather_data("Pune")
+        weather_api.close()
+    assert list(storage.load_weather()) == [WeatherCache.normalize_key("Pune")]
+
+def test_crop_import_reads_the_csv_like_the_loader(agri_wiz, storage):
+    with open(agri_wiz.crop_file) as file:
+        lines = file.read().splitlines()
+    with open(agri_wiz.crop_file, "w") as file:
+        file.write("\n".join([lines[0] + ",notes"] + [line + ",checked" for line in lines[1:]] + ["Jackfruit,loamy", ""]))
+    with contextlib.redirect_stdout(io.StringIO()):
+        agri_wiz.load_crop_data(repair=False)
+        counts = import_files(storage, location_file="", weather_file="")
+    
+    assert counts == {"crops": len(lines) - 1}
+    assert storage.load_crops() == agri_wiz.crop_data
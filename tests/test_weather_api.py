@@ -0,0 +1,86 @@
+import atexit
+import contextlib
+import gc
+import io
+import json
+import time
+import weakref
+
+from weather_api import WeatherAPI
+
+def _quiet_api(*args, **kwargs):
+    with contextlib.redirect_stdout(io.StringIO()):
+        return WeatherAPI(*args, **kwargs)
+
+def _upstream_api(upstream):
+    return _quiet_api("test-key", base_url=f"http://127.0.0.1:{upstream.server_port}/data")
+
+def test_fetches_reuse_one_connection_per_worker(data_dir, upstream, monkeypatch):
+    monkeypatch.setattr(WeatherAPI, "MAX_WORKERS", 2)
+    monkeypatch.setattr(WeatherAPI, "MAX_REQUESTS_PER_SECOND", 1000)
+    weather_api = _upstream_api(upstream)
+    locations = [f"Town {i}" for i in range(12)]
+    with contextlib.redirect_stdout(io.StringIO()):
+        results = weather_api.get_weather_data_many(locations + ["town 0"])
+    weather_api.close()
+    
+    assert [results[location]["description"] for location in locations] == locations
+    assert results["town 0"] is results["Town 0"]
+    assert len(upstream.requests) == len(locations)
+    assert len({address for _, address, _ in upstream.requests}) <= 2
+
+def test_requests_are_rate_limited(data_dir, upstream, monkeypatch):
+    monkeypatch.setattr(WeatherAPI, "MAX_REQUESTS_PER_SECOND", 20)
+    monkeypatch.setattr(WeatherAPI, "MAX_WORKERS", 4)
+    weather_api = _upstream_api(upstream)
+    with contextlib.redirect_stdout(io.StringIO()):
+        weather_api.get_weather_data_many([f"Town {i}" for i in range(10)])
+    weather_api.close()
+    
+    times = sorted(sent for _, _, sent in upstream.requests)
+    assert times[-1] - times[0] >= 9 / 20 * 0.9
+
+def test_slow_and_failing_upstream_fall_back_to_mock_data(data_dir, upstream, monkeypatch):
+    monkeypatch.setattr(WeatherAPI, "REQUEST_TIMEOUT", 0.2)
+    upstream.delays["slow"] = 1.5
+    weather_api = _upstream_api(upstream)
+    with contextlib.redirect_stdout(io.StringIO()):
+        start = time.monotonic()
+        slow = weather_api.get_weather_data("slow")
+        elapsed = time.monotonic() - start
+        results = weather_api.get_weather_data_many(["broken", "Pune"])
+    weather_api.close()
+    
+    assert elapsed < 1.0 and slow["description"] != "slow"
+    assert results["broken"]["description"] != "broken"
+    assert results["Pune"]["description"] == "Pune"
+
+def test_unclosed_api_is_not_kept_alive(data_dir):
+    reference = weakref.ref(_quiet_api())
+    gc.collect()
+    assert reference() is None
+
+def test_exit_hook_flushes_until_closed(data_dir, monkeypatch):
+    hooks = []
+    monkeypatch.setattr(atexit, "register", hooks.append)
+    monkeypatch.setattr(atexit, "unregister", hooks.remove)
+    weather_api = _quiet_api()
+    assert hooks == [weather_api._exit_hook]
+    
+    with contextlib.redirect_stdout(io.StringIO()):
+        weather_api.get_weather_data("Punjab, India")
+    hooks[0]()
+    with open(weather_api.cache_file) as file:
+        assert "punjab_india" in json.load(file)
+    weather_api.close()
+    assert hooks == []
+
+def test_cache_duration_applies_to_cached_entries(data_dir):
+    weather_api = _quiet_api()
+    with contextlib.redirect_stdout(io.StringIO()):
+        weather_api.get_weather_data("Punjab, India")
+    assert weather_api._is_cache_valid("Punjab, India")
+    weather_api.cache_duration = 0
+    assert weather_api.weather_cache.ttl == 0
+    assert not weather_api._is_cache_valid("Punjab, India")
+    weather_api.close()
@@ -0,0 +1,108 @@
+import contextlib
+import io
+import json
+import threading
+import time
+from urllib.parse import parse_qs, urlsplit
+
+from weather_api import WeatherAPI, WeatherCache
+
+class FakeUpstream:
+    """Stands in for WeatherAPI._http_get: records every location asked for and answers after a delay."""
+    
+    def __init__(self, delay=0.2):
+        self.delay = delay
+        self.requests = []
+        self.lock = threading.Lock()
+    
+    def __call__(self, url, paced=True):
+        location = parse_qs(urlsplit(url).query)["q"][0]
+        with self.lock:
+            self.requests.append(location)
+        time.sleep(self.delay)
+        return json.dumps({"main": {"temp": 20, "humidity": 50}, "weather": [{"description": location}]})
+
+def _api(tmp_path, monkeypatch, upstream):
+    monkeypatch.chdir(tmp_path)
+    with contextlib.redirect_stdout(io.StringIO()):
+        weather_api = WeatherAPI("test-key")
+    monkeypatch.setattr(weather_api, "_http_get", upstream)
+    return weather_api
+
+def _run_threads(count, target):
+    start = threading.Barrier(count)
+    
+    def run(index):
+        start.wait()
+        target(index)
+    
+    threads = [threading.Thread(target=run, args=(index,)) for index in range(count)]
+    with contextlib.redirect_stdout(io.StringIO()):
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+def test_concurrent_misses_fetch_each_key_once(tmp_path, monkeypatch):
+    upstream = FakeUpstream()
+    weather_api = _api(tmp_path, monkeypatch, upstream)
+    names = ["Pune", "pune", " PUNE ", "Delhi", "DELHI", "delhi"]
+    results = {}
+    _run_threads(24, lambda index: results.update({index: weather_api.get_weather_data(names[index % len(names)])}))
+    weather_api.close()
+    
+    assert sorted(WeatherCache.normalize_key(location) for location in upstream.requests) == ["delhi", "pune"]
+    for index, weather_data in results.items():
+        assert weather_data["description"].strip().lower() == names[index % len(names)].strip().lower()
+
+def test_early_refresh_of_a_hot_entry_fetches_once(tmp_path, monkeypatch):
+    upstream = FakeUpstream()
+    weather_api = _api(tmp_path, monkeypatch, upstream)
+    # A fresh entry on the point of expiring is always refreshed early
+    expiring = {"temperature": 10, "humidity": 40, "rainfall": 0, "description": "old",
+                "timestamp": time.time() - weather_api.cache_duration + 1}
+    weather_api.weather_cache.put("Pune", expiring)
+    results = []
+    _run_threads(16, lambda index: results.append(weather_api.get_weather_data("Pune")))
+    
+    assert all(weather_data["description"] == "old" for weather_data in results)
+    deadline = time.monotonic() + 5
+    while weather_api.weather_cache.peek("Pune")[0]["description"] != "Pune" and time.monotonic() < deadline:
+        time.sleep(0.01)
+    time.sleep(0.1)
+    weather_api.close()
+    assert upstream.requests == ["Pune"]
+
+def test_single_and_batch_misses_fetch_each_key_once(tmp_path, monkeypatch):
+    upstream = FakeUpstream(delay=0.05)
+    weather_api = _api(tmp_path, monkeypatch, upstream)
+    locations = [f"Town {i}" for i in range(8)]
+    results = []
+    
+    def caller(index):
+        # Rotated, so some threads miss a key just as another thread's fetch of it finishes
+        names = [name.upper() if index % 3 else name for name in locations]
+        names = names[index % 8:] + names[:index % 8]
+        if index % 2:
+            results.append(weather_api.get_weather_data_many(names))
+        else:
+            results.append({name: weather_api.get_weather_data(name) for name in names})
+    
+    _run_threads(16, caller)
+    weather_api.close()
+    
+    assert sorted(location.lower() for location in upstream.requests) == [name.lower() for name in locations]
+    assert all(len(result) == len(locations) for result in results)
+
+def test_leader_reuses_an_entry_cached_since_its_miss(tmp_path, monkeypatch):
+    upstream = FakeUpstream(delay=0)
+    weather_api = _api(tmp_path, monkeypatch, upstream)
+    # Every lookup misses, as if another thread's fetch had finished just after it
+    monkeypatch.setattr(weather_api.weather_cache, "lookup", lambda location: (None, None))
+    with contextlib.redirect_stdout(io.StringIO()):
+        first = weather_api.get_weather_data("Pune")
+        second = weather_api.get_weather_data("pune")
+    weather_api.close()
+    
+    assert second is first
+    assert upstream.requests == ["Pune"]
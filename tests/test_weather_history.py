@@ -0,0 +1,42 @@
+import os
+import threading
+
+import numpy as np
+
+from weather_history import WeatherHistory
+
+def test_concurrent_appends_keep_rows_aligned(tmp_path):
+    history = WeatherHistory(str(tmp_path))
+    start = threading.Barrier(8)
+    
+    def writer(index):
+        start.wait()
+        for day in range(200):
+            history.append(f"Town {index}", day * 86400.0, index, index, index)
+    
+    threads = [threading.Thread(target=writer, args=(index,)) for index in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    history.close()
+    
+    reopened = WeatherHistory(str(tmp_path))
+    assert reopened.rows == 1600
+    assert sorted(reopened._locations.values()) == list(range(8))
+    for index in range(8):
+        data = reopened.query(f"Town {index}")
+        assert len(data["timestamp"]) == 200
+        assert np.all(data["temperature"] == index) and np.all(data["rainfall"] == index)
+
+def test_appends_are_synced_in_batches(tmp_path, monkeypatch):
+    history = WeatherHistory(str(tmp_path))
+    history.SYNC_ROWS = 50
+    history.append("Pune", 0.0, 25, 60, 1)
+    synced = []
+    monkeypatch.setattr(os, "fsync", synced.append)
+    for day in range(1, 120):
+        history.append("Pune", day * 86400.0, 25, 60, 1)
+    assert len(synced) == 2 * 5
+    history.close()
+    assert len(synced) == 3 * 5
@@ -0,0 +1,21 @@
+import math
+
+import numpy as np
+
+import weather_rules
+from weather_rules import HUMIDITY_LEVELS, RAINFALL_LEVELS
+
+VALUES = [-math.inf, -1, 0, 0.5, 0.6, 2, 2.5, 40, 40.1, 70, 71, 100, math.inf, math.nan]
+
+def test_batch_levels_match_scalar_levels():
+    for bands in (HUMIDITY_LEVELS, RAINFALL_LEVELS):
+        expected = [weather_rules.level_for(value, bands) for value in VALUES]
+        assert weather_rules.levels_many(VALUES, bands).tolist() == expected
+        assert expected[-1] == "high"
+
+def test_nan_readings_are_evaluated():
+    result = weather_rules.evaluate_many([math.nan, 25], [math.nan, 50], [math.nan, 0])
+    assert result["humidity_level"].tolist() == ["high", "medium"]
+    assert result["rainfall_level"].tolist() == ["high", "low"]
+    assert result["watering_advice"][0] == weather_rules.recommendations(
+        {"temperature": math.nan, "humidity": math.nan, "rainfall": math.nan})["watering_advice"]
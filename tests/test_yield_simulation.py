@@ -0,0 +1,30 @@
+import math
+
+import pytest
+
+from yield_simulation import simulate_yield_risk
+
+CONDITIONS = {"soil_fertility": "high", "climate_match": "good", "farm_management": 0.7, "land_area": 2.0}
+
+def test_results_are_reproducible_across_processes():
+    kwargs = dict(samples=20000, seed=7, chunk_size=5000, rainfall=[0.0, 1.0, 3.0], water_needs={"Rice": "high"})
+    local = simulate_yield_risk(["Rice", "Wheat"], CONDITIONS, 400, **kwargs)
+    pooled = simulate_yield_risk(["Rice", "Wheat"], CONDITIONS, 400, processes=2, **kwargs)
+    assert local == pooled
+    assert local["Rice"]["yield"]["percentiles"][5] < local["Rice"]["yield"]["mean"] < local["Rice"]["yield"]["percentiles"][95]
+
+@pytest.mark.parametrize("kwargs, message", [
+    (dict(samples=0), "samples"),
+    (dict(chunk_size=0), "chunk_size"),
+    (dict(prices={"Rice": 400}), "No price given for Wheat"),
+    (dict(rainfall=[1.0, math.nan], water_needs={"Rice": "high"}), "NaN"),
+])
+def test_invalid_inputs_are_rejected(kwargs, message):
+    kwargs = {"prices": {"Rice": 400, "Wheat": 350}, "samples": 100, **kwargs}
+    with pytest.raises(ValueError, match=message):
+        simulate_yield_risk(["Rice", "Wheat"], CONDITIONS, **kwargs)
+
+def test_crops_without_yield_data_need_no_price():
+    result = simulate_yield_risk(["Rice", "Unobtainium"], CONDITIONS, {"Rice": 400}, samples=100, seed=1)
+    assert result["Rice"]["status"] == "success"
+    assert result["Unobtainium"]["status"] == "error"
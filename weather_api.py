@@ -2,46 +2,295 @@
 # Weather API Module for Agri Wiz
 # Fetches real-time weather data for crop recommendations
 
+import atexit
+import functools
 import json
 import os
-import urllib.request
-import urllib.parse
-import datetime
+import random
+import threading
 import time
+import weakref
+from collections import OrderedDict
+from file_utils import atomic_write
+from location_data import normalize_location_name
+from synthetic_weather import SyntheticWeather
+from weather_rules import HUMIDITY_LEVELS, RAINFALL_LEVELS, level_for, recommendations
+
+def _flush_at_exit(reference):
+    """atexit hook of a WeatherAPI, holding it only through a weak reference."""
+    weather_api = reference()
+    if weather_api is not None:
+        weather_api.flush()
+
+class WeatherCache:
+    """
+    Bounded in-memory weather cache with LRU and TTL eviction.
+    
+    Keys are normalized location names, so "Delhi" and "delhi" share one
+    entry. An entry is fresh for ttl seconds after its timestamp, then
+    stale for another stale_ttl seconds, during which it may still be
+    served while a refresh runs. Older entries are dropped when looked up
+    or by a sweep that runs at most every sweep_interval seconds. Beyond
+    max_entries the least recently used entry is evicted.
+    """
+    
+    def __init__(self, max_entries=1000, ttl=3600, stale_ttl=600, sweep_interval=300):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.sweep_interval = sweep_interval
+        self._entries = OrderedDict()
+        self._lock = threading.RLock()
+        self._last_sweep = time.time()
+        self.stats = {"hits": 0, "misses": 0, "stale": 0, "evictions": 0, "expired": 0}
+    
+    @staticmethod
+    def normalize_key(location):
+        """Cache key of a location name ("Punjab, India" and "punjab india" -> "punjab_india")."""
+        return normalize_location_name(location) or location.strip().lower()
+    
+    def _state(self, entry, now):
+        age = now - entry.get("timestamp", 0)
+        if age < self.ttl:
+            return "fresh"
+        if age < self.ttl + self.stale_ttl:
+            return "stale"
+        return None
+    
+    def peek(self, location):
+        """Return (data, state) without touching stats or recency; state is "fresh", "stale" or None."""
+        with self._lock:
+            entry = self._entries.get(self.normalize_key(location))
+            state = self._state(entry, time.time()) if entry is not None else None
+            return (entry, state) if state else (None, None)
+    
+    def lookup(self, location):
+        """Like peek, but counts the access in stats, refreshes recency and drops an expired entry."""
+        key = self.normalize_key(location)
+        now = time.time()
+        with self._lock:
+            self._maybe_sweep(now)
+            entry = self._entries.get(key)
+            if entry is not None:
+                state = self._state(entry, now)
+                if state:
+                    self._entries.move_to_end(key)
+                    self.stats["hits" if state == "fresh" else "stale"] += 1
+                    return entry, state
+                del self._entries[key]
+                self.stats["expired"] += 1
+            self.stats["misses"] += 1
+            return None, None
+    
+    def put(self, location, data):
+        """Store an entry (data["timestamp"] dates it), evicting least recently used ones over the limit."""
+        key = self.normalize_key(location)
+        with self._lock:
+            self._entries[key] = data
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.stats["evictions"] += 1
+            self._maybe_sweep(time.time())
+    
+    def sweep(self):
+        """Remove every entry past its stale period; returns how many were removed."""
+        now = time.time()
+        with self._lock:
+            self._last_sweep = now
+            expired = [key for key, entry in self._entries.items() if self._state(entry, now) is None]
+            for key in expired:
+                del self._entries[key]
+            self.stats["expired"] += len(expired)
+            return len(expired)
+    
+    def _maybe_sweep(self, now):
+        if now - self._last_sweep >= self.sweep_interval:
+            self.sweep()
+    
+    def get_stats(self):
+        with self._lock:
+            return dict(self.stats, entries=len(self._entries), max_entries=self.max_entries)
+    
+    def to_dict(self):
+        """Snapshot of the entries, least recently used first."""
+        with self._lock:
+            return dict(self._entries)
+    
+    def update(self, entries):
+        """Add saved entries, skipping expired ones; for duplicate keys the newest entry wins."""
+        now = time.time()
+        for location, data in sorted(entries.items(), key=lambda item: item[1].get("timestamp", 0)):
+            if self._state(data, now):
+                self.put(location, data)
+    
+    def __contains__(self, location):
+        return self.peek(location)[1] is not None
+    
+    def __len__(self):
+        return len(self._entries)
+
+class RateLimiter:
+    """Spaces calls at least 1/rate seconds apart, across all threads sharing the limiter."""
+    
+    def __init__(self, rate):
+        self.interval = 1.0 / rate if rate else 0.0
+        self._next_slot = 0.0
+        self._lock = threading.Lock()
+    
+    def reserve(self):
+        """Claim the next call slot; returns how many seconds to wait for it."""
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot)
+            self._next_slot = slot + self.interval
+        return slot - now
+    
+    def wait(self):
+        delay = self.reserve()
+        if delay > 0:
+            time.sleep(delay)
 
 class WeatherAPI:
-    def __init__(self, api_key=None):
-        """Initialize the WeatherAPI with an optional API key."""
+    # Write-behind persistence: the cache file is rewritten at most once per
+    # FLUSH_INTERVAL seconds, or as soon as FLUSH_THRESHOLD entries are dirty
+    FLUSH_INTERVAL = 5.0
+    FLUSH_THRESHOLD = 100
+    
+    # Cache limits: entry count, and how long past cache_duration stale data may be served
+    CACHE_MAX_ENTRIES = 1000
+    CACHE_STALE_SECONDS = 600
+    
+    # Upstream requests: per-request timeout (seconds), worker threads for
+    # get_weather_data_many and AsyncWeatherAPI (also the most idle keep-alive
+    # connections kept per host) and the request rate allowed across all of them
+    REQUEST_TIMEOUT = 10.0
+    MAX_WORKERS = 8
+    MAX_REQUESTS_PER_SECOND = 10
+    
+    # Fraction of cache_duration before expiry in which a cache hit may start
+    # a background refresh, with probability rising towards expiry, so a busy
+    # entry is refreshed once ahead of time instead of expiring under load
+    EARLY_REFRESH_WINDOW = 0.1
+    
+    def __init__(self, api_key=None, base_url="http://api.openweathermap.org/data/2.5/weather", storage=None):
+        """Initialize the WeatherAPI with an optional API key and storage backend (see storage.py)."""
         self.api_key = api_key or "demo_key"  # Use demo key if none provided
+        self.base_url = base_url
         self.cache_file = "weather_cache.json"
+        self.storage = storage  # Used instead of cache_file when set
+        self.weather_cache = None
         self.cache_duration = 3600  # Cache weather data for 1 hour (in seconds)
+        self.synthetic_weather = SyntheticWeather()
+        self.history = None  # Optional WeatherHistory that keeps every fetched observation
+        self.shared_cache = None  # Optional SharedWeatherCache shared with other processes
         self.weather_cache = self._load_cache()
+        self._dirty = set()
+        self._flush_lock = threading.Lock()
+        self._flush_timer = None
+        self._in_flight = {}
+        self._flight_lock = threading.Lock()
+        self._rate_limiter = RateLimiter(self.MAX_REQUESTS_PER_SECOND)
+        self._idle_connections = {}  # (scheme, netloc) -> keep-alive connections not in use
+        self._connections_lock = threading.Lock()
+        self._executor = None
+        self._executor_lock = threading.Lock()
+        # Flush at exit without keeping this instance alive; close() unregisters it
+        self._exit_hook = functools.partial(_flush_at_exit, weakref.ref(self))
+        atexit.register(self._exit_hook)
+    
+    @property
+    def cache_duration(self):
+        """Seconds fetched weather data stays fresh; a new value applies to cached entries too."""
+        return self._cache_duration
+    
+    @cache_duration.setter
+    def cache_duration(self, seconds):
+        self._cache_duration = seconds
+        if self.weather_cache is not None:
+            self.weather_cache.ttl = seconds
     
     def _load_cache(self):
         """Load the weather cache from file if it exists."""
+        cache = WeatherCache(self.CACHE_MAX_ENTRIES, self.cache_duration, self.CACHE_STALE_SECONDS)
         try:
-            if os.path.exists(self.cache_file):
+            if self.storage is not None:
+                cache.update(self.storage.load_weather())
+            elif os.path.exists(self.cache_file):
                 with open(self.cache_file, "r") as f:
-                    return json.load(f)
-            return {}
+                    cache.update(json.load(f))
         except Exception as e:
             print(f"Error loading weather cache: {e}")
-            return {}
+        return cache
     
-    def _save_cache(self):
-        """Save the weather cache to file."""
+    def _save_cache(self, keys=None):
+        """Save the weather cache to file, or the entries with the given cache keys to the storage backend."""
         try:
-            with open(self.cache_file, "w") as f:
-                json.dump(self.weather_cache, f)
+            # Snapshot first: other threads may add entries while this writes
+            snapshot = self.weather_cache.to_dict()
+            if self.storage is not None:
+                if keys is not None:
+                    snapshot = {key: snapshot[key] for key in keys if key in snapshot}
+                # Entries too old to be served even as stale are dropped from the database
+                cache = self.weather_cache
+                self.storage.save_weather(snapshot, expire_before=time.time() - cache.ttl - cache.stale_ttl)
+                return
+            with atomic_write(self.cache_file, "w") as f:
+                json.dump(snapshot, f)
         except Exception as e:
             print(f"Error saving weather cache: {e}")
     
+    def _mark_dirty(self, location):
+        """
+        Record an unsaved cache entry and schedule a flush.
+        
+        Flushes immediately once FLUSH_THRESHOLD entries are dirty, otherwise
+        starts a timer so the file is written FLUSH_INTERVAL seconds later.
+        """
+        with self._flush_lock:
+            self._dirty.add(WeatherCache.normalize_key(location))
+            flush_now = len(self._dirty) >= self.FLUSH_THRESHOLD
+            if not flush_now and self._flush_timer is None:
+                self._flush_timer = threading.Timer(self.FLUSH_INTERVAL, self.flush)
+                self._flush_timer.daemon = True
+                self._flush_timer.start()
+        if flush_now:
+            self.flush()
+    
+    def flush(self):
+        """Write the cache file now if it has unsaved entries, and sync rows appended to the history."""
+        if self.history is not None:
+            self.history.flush()
+        with self._flush_lock:
+            if self._flush_timer is not None:
+                self._flush_timer.cancel()
+                self._flush_timer = None
+            if not self._dirty:
+                return
+            dirty, self._dirty = self._dirty, set()
+            self._save_cache(dirty)
+    
+    def close(self):
+        """Flush unsaved entries (also done automatically at interpreter exit) and stop the fetch workers."""
+        atexit.unregister(self._exit_hook)
+        with self._executor_lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True)
+        with self._connections_lock:
+            idle, self._idle_connections = self._idle_connections, {}
+        for connections in idle.values():
+            for connection in connections:
+                connection.close()
+        self.flush()
+    
     def _is_cache_valid(self, location):
         """Check if cache for a location is still valid."""
-        if location in self.weather_cache:
-            timestamp = self.weather_cache[location].get("timestamp", 0)
-            return (time.time() - timestamp) < self.cache_duration
-        return False
+        return self.weather_cache.peek(location)[1] == "fresh"
+    
+    def get_cache_stats(self):
+        """Hit, miss, stale, eviction and expiry counts of the weather cache."""
+        return self.weather_cache.get_stats()
     
     def get_weather_data(self, location):
         """
@@ -51,37 +300,227 @@ class WeatherAPI:
         In production, replace this with actual API calls using your API key.
         """
         # Check if we have valid cached data
-        if self._is_cache_valid(location):
+        cached, state = self.weather_cache.lookup(location)
+        if state is None and self.shared_cache is not None:
+            cached, state = self._lookup_shared(location)
+        if state == "fresh":
             print(f"Using cached weather data for {location}")
-            return self.weather_cache[location]
+            if self._should_refresh_early(cached):
+                self._refresh_in_background(location)
+            return cached
+        if state == "stale":
+            # Serve the expired entry now and refresh it in the background
+            print(f"Using stale weather data for {location} while it refreshes")
+            self._refresh_in_background(location)
+            return cached
             
         try:
-            # In a real implementation, use the API key and make actual HTTP requests
-            if self.api_key == "demo_key":
-                # Return mock data for demo purposes
-                weather_data = self._get_mock_weather_data(location)
-            else:
-                # Construct the API URL (OpenWeatherMap example)
-                encoded_location = urllib.parse.quote(location)
-                url = f"http://api.openweathermap.org/data/2.5/weather?q={encoded_location}&appid={self.api_key}&units=metric"
-                
-                # Make the API request
-                with urllib.request.urlopen(url) as response:
-                    data = response.read()
-                    weather_data = self._parse_api_response(json.loads(data))
-                    
-            # Cache the result
-            weather_data["timestamp"] = time.time()
-            self.weather_cache[location] = weather_data
-            self._save_cache()
-            
-            return weather_data
-            
+            return self._fetch_single_flight(location)
         except Exception as e:
             print(f"Error fetching weather data for {location}: {e}")
             # Return mock data as fallback
             return self._get_mock_weather_data(location)
     
+    def _lookup_shared(self, location):
+        """Look a location up in the shared cache, copying a usable entry into this process's cache."""
+        try:
+            cached = self.shared_cache.get(location)
+        except Exception as e:
+            print(f"Error reading shared weather cache: {e}")
+            return None, None
+        state = self.weather_cache._state(cached, time.time()) if cached is not None else None
+        if state:
+            self.weather_cache.put(location, cached)
+            return cached, state
+        return None, None
+    
+    def _should_refresh_early(self, weather_data):
+        """Randomly decide whether a fresh entry near expiry should be refreshed now."""
+        window = self.cache_duration * self.EARLY_REFRESH_WINDOW
+        remaining = self.cache_duration - (time.time() - weather_data.get("timestamp", 0))
+        return window > 0 and remaining < window and random.random() > remaining / window
+    
+    def _fetch_single_flight(self, location, refresh=False):
+        """
+        Fetch a location, or wait for the fetch of its cache key that another
+        thread already has in flight, so concurrent misses cost one request.
+        
+        A thread that missed the cache just as another thread's fetch finished
+        gets the entry that fetch cached instead of fetching again, unless
+        refresh is set to replace an entry that is still fresh.
+        """
+        from concurrent.futures import Future  # Pulls in logging, which cache hits never need
+        
+        key = WeatherCache.normalize_key(location)
+        with self._flight_lock:
+            flight = self._in_flight.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._in_flight[key] = Future()
+        if not leader:
+            return flight.result()
+        
+        try:
+            cached, state = self.weather_cache.peek(location)
+            if state == "fresh" and not refresh:
+                flight.set_result(cached)
+            else:
+                flight.set_result(self._fetch_weather_data(location))
+        except Exception as e:
+            flight.set_exception(e)
+        finally:
+            with self._flight_lock:
+                del self._in_flight[key]
+        return flight.result()
+    
+    def _fetch_weather_data(self, location):
+        """Fetch weather data for a location and cache it."""
+        # In a real implementation, use the API key and make actual HTTP requests
+        if self.api_key == "demo_key":
+            # Return mock data for demo purposes
+            weather_data = self._get_mock_weather_data(location)
+        else:
+            # Make the API request
+            data = self._http_get(self._weather_url(location))
+            weather_data = self._parse_api_response(json.loads(data))
+        
+        return self._cache_weather_data(location, weather_data)
+    
+    def _weather_url(self, location):
+        """Construct the API URL (OpenWeatherMap example)."""
+        import urllib.parse
+        
+        encoded_location = urllib.parse.quote(location)
+        return f"{self.base_url}?q={encoded_location}&appid={self.api_key}&units=metric"
+    
+    def _cache_weather_data(self, location, weather_data):
+        """Timestamp freshly fetched data, cache it and schedule it to be saved."""
+        weather_data["timestamp"] = time.time()
+        self.weather_cache.put(location, weather_data)
+        if self.shared_cache is not None:
+            # The shared cache replaces the cache file, which every process would rewrite
+            try:
+                self.shared_cache.put(location, weather_data)
+            except Exception as e:
+                print(f"Error saving to shared weather cache: {e}")
+        else:
+            self._mark_dirty(location)
+        if self.history is not None:
+            self.history.record(location, weather_data)
+        return weather_data
+    
+    def _http_get(self, url, paced=True):
+        """
+        GET a URL over a keep-alive connection from the per-host pool.
+        
+        Requests are paced by the shared rate limiter (unless paced is False,
+        for callers that already waited for it) and time out after
+        REQUEST_TIMEOUT seconds. A connection the server has closed since its
+        last use is reopened once.
+        """
+        # Only real API requests need these, and http.client is slow to import
+        import http.client
+        import urllib.error
+        import urllib.parse
+        
+        parts = urllib.parse.urlsplit(url)
+        path = parts.path + (f"?{parts.query}" if parts.query else "")
+        host = (parts.scheme, parts.netloc)
+        
+        if paced:
+            self._rate_limiter.wait()
+        for attempt in range(2):
+            with self._connections_lock:
+                idle = self._idle_connections.get(host)
+                connection = idle.pop() if idle else None
+            reused = connection is not None
+            if connection is None:
+                connection_class = http.client.HTTPSConnection if parts.scheme == "https" else http.client.HTTPConnection
+                connection = connection_class(parts.netloc, timeout=self.REQUEST_TIMEOUT)
+            try:
+                connection.request("GET", path)
+                response = connection.getresponse()
+                body = response.read()
+            except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError):
+                connection.close()
+                if reused and attempt == 0:
+                    continue
+                raise
+            except Exception:
+                connection.close()
+                raise
+            # The response is read in full, so the connection can serve the next request
+            with self._connections_lock:
+                idle = self._idle_connections.setdefault(host, [])
+                if len(idle) < self.MAX_WORKERS:
+                    idle.append(connection)
+                    connection = None
+            if connection is not None:
+                connection.close()
+            if response.status != 200:
+                raise urllib.error.HTTPError(url, response.status, response.reason, response.headers, None)
+            return body
+    
+    def get_weather_data_many(self, locations):
+        """
+        Get weather data for several locations at once.
+        
+        Names that normalize to the same cache key are fetched once, cache
+        hits are answered immediately and misses are fetched concurrently
+        on up to MAX_WORKERS threads. Returns a dict mapping each location
+        as given to its weather data.
+        """
+        from concurrent.futures import as_completed
+        
+        names_by_key = {}
+        for location in locations:
+            names_by_key.setdefault(WeatherCache.normalize_key(location), []).append(location)
+        
+        results = {}
+        pending = {}
+        for names in names_by_key.values():
+            location = names[0]
+            cached, state = self.weather_cache.lookup(location)
+            if state:
+                if state == "stale":
+                    self._refresh_in_background(location)
+                results.update(dict.fromkeys(names, cached))
+                continue
+            pending[self._submit(self._fetch_single_flight, location)] = names
+        
+        for future in as_completed(pending):
+            names = pending[future]
+            try:
+                weather_data = future.result()
+            except Exception as e:
+                print(f"Error fetching weather data for {names[0]}: {e}")
+                weather_data = self._get_mock_weather_data(names[0])
+            results.update(dict.fromkeys(names, weather_data))
+        
+        return {location: results[location] for location in locations}
+    
+    def _submit(self, fn, *args, **kwargs):
+        """Run fn on the fetch worker threads, started on first use; returns its Future."""
+        from concurrent.futures import ThreadPoolExecutor
+        
+        with self._executor_lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.MAX_WORKERS, thread_name_prefix="weather")
+            return self._executor.submit(fn, *args, **kwargs)
+    
+    def _refresh_in_background(self, location):
+        """Refetch a location on a daemon thread, unless a fetch for its cache key is already in flight."""
+        if WeatherCache.normalize_key(location) in self._in_flight:
+            return
+        
+        def refresh():
+            try:
+                self._fetch_single_flight(location, refresh=True)
+            except Exception as e:
+                print(f"Error refreshing weather data for {location}: {e}")
+        
+        threading.Thread(target=refresh, daemon=True).start()
+    
     def _parse_api_response(self, api_data):
         """Parse the OpenWeatherMap API response into our format."""
         try:
@@ -137,101 +576,28 @@ class WeatherAPI:
                     "timestamp": time.time()
                 }
         
-        # Generic mock data if location not recognized
-        current_month = datetime.datetime.now().month
-        
-        # Adjust temperature and rainfall based on season in northern hemisphere
-        if 3 <= current_month <= 5:  # Spring
-            temp = 20.0 + (hash(location) % 10) - 5
-            rainfall = 1.0 + (hash(location[::-1]) % 3)
-            humidity = 60 + (hash(location) % 20)
-            description = "Spring showers"
-        elif 6 <= current_month <= 8:  # Summer
-            temp = 28.0 + (hash(location) % 15) - 7
-            rainfall = 0.5 + (hash(location[::-1]) % 2)
-            humidity = 55 + (hash(location) % 25)
-            description = "Warm and humid"
-        elif 9 <= current_month <= 11:  # Fall
-            temp = 15.0 + (hash(location) % 10) - 5
-            rainfall = 0.7 + (hash(location[::-1]) % 2.5)
-            humidity = 50 + (hash(location) % 20)
-            description = "Cool and breezy"
-        else:  # Winter
-            temp = 5.0 + (hash(location) % 15) - 10
-            rainfall = 0.3 + (hash(location[::-1]) % 1.5)
-            humidity = 40 + (hash(location) % 30)
-            description = "Cold with occasional precipitation"
-        
-        return {
-            "temperature": round(temp, 1),
-            "humidity": round(humidity, 0),
-            "rainfall": round(rainfall, 1),
-            "description": description,
-            "timestamp": time.time()
-        }
+        # Otherwise synthesize today's weather from the location's climate and seasons,
+        # the same in every process for the same location and date
+        weather_data = self.synthetic_weather.observation(location)
+        weather_data["timestamp"] = time.time()
+        return weather_data
     
     def get_weather_based_recommendations(self, weather_data):
         """
         Get recommendations based on current weather conditions.
         
-        Returns a dictionary with recommendations and alerts.
+        Returns a dictionary with recommendations and alerts, from the rule
+        table in weather_rules (which also evaluates it over arrays).
         """
-        recommendations = {
-            "watering_advice": "",
-            "alerts": [],
-            "farming_tips": []
-        }
-        
-        # Watering advice
-        if weather_data["rainfall"] > 1.5:
-            recommendations["watering_advice"] = "Skip watering today due to recent rainfall."
-        elif weather_data["humidity"] > 80:
-            recommendations["watering_advice"] = "Light watering recommended due to high humidity."
-        elif weather_data["temperature"] > 30:
-            recommendations["watering_advice"] = "Increase watering frequency due to high temperatures."
-        else:
-            recommendations["watering_advice"] = "Regular watering schedule recommended."
-        
-        # Weather alerts
-        if weather_data["temperature"] > 35:
-            recommendations["alerts"].append("HEAT ALERT: Protect sensitive crops from extreme heat.")
-        elif weather_data["temperature"] < 5:
-            recommendations["alerts"].append("FROST ALERT: Take measures to protect crops from frost.")
-        
-        if weather_data["rainfall"] > 3.0:
-            recommendations["alerts"].append("HEAVY RAIN ALERT: Check for potential flooding and ensure proper drainage.")
-        
-        # Farming tips based on weather
-        if 20 <= weather_data["temperature"] <= 30:
-            recommendations["farming_tips"].append("Optimal temperature for most crop growth and development.")
-        
-        if weather_data["humidity"] > 70:
-            recommendations["farming_tips"].append("High humidity increases disease risk. Monitor crops for fungal infections.")
-        elif weather_data["humidity"] < 40:
-            recommendations["farming_tips"].append("Low humidity may cause excessive transpiration. Consider shade for sensitive crops.")
-        
-        if "rain" in weather_data["description"].lower():
-            recommendations["farming_tips"].append("Current rainfall presents a good opportunity for transplanting seedlings.")
-        
-        return recommendations
+        return recommendations(weather_data)
 
 # Helper function to get humidity level from percentage
 def get_humidity_level(humidity_percentage):
-    if humidity_percentage <= 40:
-        return "low"
-    elif humidity_percentage <= 70:
-        return "medium"
-    else:
-        return "high"
+    return level_for(humidity_percentage, HUMIDITY_LEVELS)
 
 # Helper function to get rainfall level from mm
 def get_rainfall_level(rainfall_mm):
-    if rainfall_mm <= 0.5:
-        return "low"
-    elif rainfall_mm <= 2:
-        return "medium"
-    else:
-        return "high"
+    return level_for(rainfall_mm, RAINFALL_LEVELS)
 
 # Simple test if run directly
 if __name__ == "__main__":
@@ -255,4 +621,6 @@ if __name__ == "__main__":
     if recommendations["farming_tips"]:
         print("\nFarming Tips:")
         for tip in recommendations["farming_tips"]:
-            print(f"- {tip}")
\ No newline at end of file
+            print(f"- {tip}")
+    
+    api.close()
\ No newline at end of file
@@ -0,0 +1,296 @@
+#!/usr/bin/env python
+# Weather History Module for Agri Wiz
+# Append-only, columnar store of weather observations with range queries and rolling aggregates
+
+import datetime
+import json
+import os
+import threading
+import numpy as np
+from file_utils import atomic_write
+from location_data import normalize_location_name
+
+# Column name -> dtype; each column is a flat little-endian array in its own file
+COLUMNS = {
+    "location": np.dtype("<u4"),
+    "timestamp": np.dtype("<f8"),
+    "temperature": np.dtype("<f4"),
+    "humidity": np.dtype("<f4"),
+    "rainfall": np.dtype("<f4"),
+}
+MEASUREMENTS = ["temperature", "humidity", "rainfall"]
+SECONDS_PER_DAY = 86400
+
+def _to_seconds(moment):
+    """Accept a Unix timestamp, a datetime or a date."""
+    if moment is None or isinstance(moment, (int, float)):
+        return moment
+    if not isinstance(moment, datetime.datetime):
+        moment = datetime.datetime.combine(moment, datetime.time())
+    return moment.timestamp()
+
+class WeatherHistory:
+    """
+    Time series of weather observations, stored column by column.
+
+    Each column is an append-only file in data_dir (location.u4,
+    timestamp.f8, temperature.f4, ...) that is read through np.memmap, and
+    locations.json maps location names to the ids in the location column.
+    A per-location offset index (index.order / index.offsets: the row ids
+    grouped by location and sorted by time) answers range queries without
+    scanning the store. Rows appended since the index was built are found
+    by scanning just that tail; the index is rebuilt once the tail exceeds
+    INDEX_REBUILD_ROWS.
+
+    Appends are serialized by a lock, so threads can record into one
+    history. Appended rows are fsynced once SYNC_ROWS of them are pending
+    and on flush() or close(); a crash may lose those pending rows, and a
+    torn append is cut off when the store is next opened.
+    """
+
+    INDEX_REBUILD_ROWS = 100000
+    SYNC_ROWS = 10000
+
+    def __init__(self, data_dir="weather_history"):
+        self.data_dir = data_dir
+        os.makedirs(data_dir, exist_ok=True)
+        self._locations = {}
+        locations_path = self._path("locations.json")
+        if os.path.exists(locations_path):
+            with open(locations_path, "r") as file:
+                self._locations = json.load(file)
+        self.rows = self._repair_columns()
+        self._maps = {}
+        self._lock = threading.RLock()
+        self._unsynced_rows = 0
+        self._load_index()
+
+    def _path(self, name):
+        return os.path.join(self.data_dir, name)
+
+    def _column_path(self, column):
+        return self._path(f"{column}.{COLUMNS[column].kind}{COLUMNS[column].itemsize}")
+
+    def _repair_columns(self):
+        """Cut every column to the number of complete rows, dropping a torn append."""
+        sizes = {}
+        for column, dtype in COLUMNS.items():
+            path = self._column_path(column)
+            sizes[column] = os.path.getsize(path) // dtype.itemsize if os.path.exists(path) else 0
+        rows = min(sizes.values())
+        for column, dtype in COLUMNS.items():
+            path = self._column_path(column)
+            if os.path.exists(path) and os.path.getsize(path) != rows * dtype.itemsize:
+                print(f"Dropping incomplete rows from {path}")
+                with open(path, "r+b") as file:
+                    file.truncate(rows * dtype.itemsize)
+        return rows
+
+    def column(self, column):
+        """Memory-mapped, read-only view of a whole column."""
+        mapped = self._maps.get(column)
+        if mapped is None or len(mapped) != self.rows:
+            if self.rows == 0:
+                return np.empty(0, COLUMNS[column])
+            mapped = self._maps[column] = np.memmap(self._column_path(column), COLUMNS[column], "r", shape=(self.rows,))
+        return mapped
+
+    def location_id(self, location, create=False):
+        key = normalize_location_name(location) or location.strip().lower()
+        location_id = self._locations.get(key)
+        if location_id is None and create:
+            with self._lock:
+                location_id = self._locations.get(key)
+                if location_id is None:
+                    location_id = self._locations[key] = len(self._locations)
+                    with atomic_write(self._path("locations.json"), "w") as file:
+                        json.dump(self._locations, file)
+        return location_id
+
+    def locations(self):
+        return list(self._locations)
+
+    def append_many(self, locations, timestamps, temperature, humidity, rainfall):
+        """Append observations given as equal-length sequences (or arrays), one per column."""
+        with self._lock:
+            return self._append_many(locations, timestamps, temperature, humidity, rainfall)
+
+    def _append_many(self, locations, timestamps, temperature, humidity, rainfall):
+        ids = {}
+        for location in locations:
+            if location not in ids:
+                ids[location] = self.location_id(location, create=True)
+        location_ids = np.array([ids[location] for location in locations], COLUMNS["location"])
+        values = {
+            "location": location_ids,
+            "timestamp": np.asarray(timestamps, COLUMNS["timestamp"]),
+            "temperature": np.asarray(temperature, COLUMNS["temperature"]),
+            "humidity": np.asarray(humidity, COLUMNS["humidity"]),
+            "rainfall": np.asarray(rainfall, COLUMNS["rainfall"]),
+        }
+        if len({len(array) for array in values.values()}) != 1:
+            raise ValueError("All columns must have the same number of observations")
+        for column, array in values.items():
+            with open(self._column_path(column), "ab") as file:
+                file.write(array.tobytes())
+        self.rows += len(location_ids)
+        self._unsynced_rows += len(location_ids)
+        if self._unsynced_rows >= self.SYNC_ROWS:
+            self.flush()
+        return len(location_ids)
+
+    def flush(self):
+        """Force appended rows to disk."""
+        with self._lock:
+            if not self._unsynced_rows:
+                return
+            for column in COLUMNS:
+                with open(self._column_path(column), "ab") as file:
+                    os.fsync(file.fileno())
+            self._unsynced_rows = 0
+
+    def close(self):
+        """Flush appended rows and release the column maps."""
+        self.flush()
+        self._maps = {}
+
+    def append(self, location, timestamp, temperature, humidity, rainfall):
+        return self.append_many([location], [_to_seconds(timestamp)], [temperature], [humidity], [rainfall])
+
+    def record(self, location, weather_data):
+        """Append an observation in the WeatherAPI format."""
+        return self.append(location, weather_data["timestamp"], weather_data["temperature"],
+                           weather_data["humidity"], weather_data["rainfall"])
+
+    def _load_index(self):
+        """Use the saved offset index if it describes a prefix of the store, else rebuild it."""
+        try:
+            with open(self._path("index.json"), "r") as file:
+                indexed_rows = json.load(file)["rows"]
+            order = np.fromfile(self._path("index.order"), np.int64)
+            offsets = np.fromfile(self._path("index.offsets"), np.int64)
+            if indexed_rows <= self.rows and len(order) == indexed_rows:
+                self._indexed_rows, self._order, self._offsets = indexed_rows, order, offsets
+                return
+        except (OSError, ValueError, KeyError):
+            pass
+        self.rebuild_index()
+
+    def rebuild_index(self):
+        """Group all row ids by location, sorted by time, and save the result."""
+        with self._lock:
+            self._rebuild_index()
+
+    def _rebuild_index(self):
+        location = self.column("location")
+        order = np.lexsort((self.column("timestamp"), location)).astype(np.int64)
+        counts = np.bincount(location, minlength=len(self._locations))
+        offsets = np.concatenate(([0], np.cumsum(counts))).astype(np.int64)
+        with atomic_write(self._path("index.order"), "wb") as file:
+            file.write(order.tobytes())
+        with atomic_write(self._path("index.offsets"), "wb") as file:
+            file.write(offsets.tobytes())
+        with atomic_write(self._path("index.json"), "w") as file:
+            json.dump({"rows": self.rows}, file)
+        self._indexed_rows, self._order, self._offsets = self.rows, order, offsets
+
+    def _rows_for(self, location_id):
+        """Row ids of a location's observations in time order."""
+        if self.rows - self._indexed_rows > self.INDEX_REBUILD_ROWS:
+            self.rebuild_index()
+        if location_id + 1 < len(self._offsets):
+            rows = self._order[self._offsets[location_id]:self._offsets[location_id + 1]]
+        else:
+            rows = np.empty(0, np.int64)
+        if self.rows > self._indexed_rows:
+            tail = np.flatnonzero(self.column("location")[self._indexed_rows:] == location_id) + self._indexed_rows
+            if len(tail):
+                rows = np.concatenate((rows, tail))
+                rows = rows[np.argsort(self.column("timestamp")[rows], kind="stable")]
+        return rows
+
+    def query(self, location, start=None, end=None):
+        """
+        Observations of a location with start <= timestamp < end.
+
+        Args:
+            location: Location name
+            start, end: Unix timestamps, datetimes or dates (None for unbounded)
+
+        Returns:
+            Dict of arrays: timestamp, temperature, humidity, rainfall
+        """
+        location_id = self.location_id(location)
+        rows = self._rows_for(location_id) if location_id is not None else np.empty(0, np.int64)
+        timestamps = self.column("timestamp")[rows]
+        low = 0 if start is None else np.searchsorted(timestamps, _to_seconds(start), "left")
+        high = len(rows) if end is None else np.searchsorted(timestamps, _to_seconds(end), "left")
+        rows = rows[low:high]
+        result = {"timestamp": np.asarray(timestamps[low:high])}
+        for column in MEASUREMENTS:
+            result[column] = np.asarray(self.column(column)[rows])
+        return result
+
+    def rolling(self, location, column, window_days=30, how="sum", start=None, end=None):
+        """
+        Rolling aggregate of a column over the window_days before each observation.
+
+        Returns (timestamps, values) where values[i] is the sum or mean of the
+        observations with timestamp in (timestamps[i] - window, timestamps[i]].
+        """
+        if how not in ("sum", "mean"):
+            raise ValueError(f"Unknown aggregate: {how}")
+        window = window_days * SECONDS_PER_DAY
+        start = _to_seconds(start)
+        # Include the observations that fall in the first window
+        data = self.query(location, None if start is None else start - window, end)
+        timestamps = data["timestamp"]
+        cumulative = np.concatenate(([0.0], np.cumsum(data[column], dtype=np.float64)))
+        first = np.searchsorted(timestamps, timestamps - window, "right")
+        last = np.arange(1, len(timestamps) + 1)
+        values = cumulative[last] - cumulative[first]
+        if how == "mean":
+            values = values / (last - first)
+        keep = slice(None) if start is None else slice(np.searchsorted(timestamps, start, "left"), None)
+        return timestamps[keep], values[keep]
+
+    def aggregate(self, location, column, days=30, how="mean", end=None):
+        """Sum or mean of a column over the last `days` days before end (now by default); None without data."""
+        end = _to_seconds(end) or datetime.datetime.now().timestamp()
+        values = self.query(location, end - days * SECONDS_PER_DAY, end)[column]
+        if len(values) == 0:
+            return None
+        return float(values.sum() if how == "sum" else values.mean())
+
+    def classify(self, location, days=30, end=None):
+        """
+        Rainfall and humidity levels of a location from its mean readings
+        over the last `days` days, rather than from a single reading.
+        """
+        from weather_api import get_humidity_level, get_rainfall_level
+
+        rainfall = self.aggregate(location, "rainfall", days, "mean", end)
+        humidity = self.aggregate(location, "humidity", days, "mean", end)
+        return {
+            "rainfall_level": None if rainfall is None else get_rainfall_level(rainfall),
+            "humidity_level": None if humidity is None else get_humidity_level(humidity)
+        }
+
+# Fill a history from synthetic weather and print 30-day aggregates when run directly
+if __name__ == "__main__":
+    import tempfile
+    from synthetic_weather import SyntheticWeather
+
+    locations = ["Punjab, India", "Kerala, India", "Delhi"]
+    start = datetime.date.today() - datetime.timedelta(days=365)
+    grid = SyntheticWeather().grid(locations, start, 366)
+    timestamps = (grid["dates"].astype("datetime64[s]").astype(np.int64)).astype(np.float64)
+
+    with tempfile.TemporaryDirectory() as directory:
+        history = WeatherHistory(directory)
+        for i, location in enumerate(locations):
+            history.append_many([location] * len(timestamps), timestamps,
+                                grid["temperature"][i], grid["humidity"][i], grid["rainfall"][i])
+        for location in locations:
+            total = history.aggregate(location, "rainfall", 30, "sum")
+            print(f"{location}: {total:.1f}mm rain in the last 30 days, {history.classify(location)}")
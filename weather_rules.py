@@ -0,0 +1,135 @@
+#!/usr/bin/env python
+# Weather Rules Module for Agri Wiz
+# Threshold and advisory table behind the weather classifications and recommendations
+
+import bisect
+import operator
+
+# Level bands as (inclusive upper bound, level), in increasing order
+HUMIDITY_LEVELS = [(40, "low"), (70, "medium"), (float("inf"), "high")]
+RAINFALL_LEVELS = [(0.5, "low"), (2, "medium"), (float("inf"), "high")]
+
+# Advisory rules as (group, field, operator, value, message), in output order.
+# "watering_advice" takes the message of the first matching rule; "alerts"
+# and "farming_tips" list the messages of every matching rule.
+RULES = [
+    ("watering_advice", "rainfall", ">", 1.5, "Skip watering today due to recent rainfall."),
+    ("watering_advice", "humidity", ">", 80, "Light watering recommended due to high humidity."),
+    ("watering_advice", "temperature", ">", 30, "Increase watering frequency due to high temperatures."),
+    ("watering_advice", None, "always", None, "Regular watering schedule recommended."),
+    ("alerts", "temperature", ">", 35, "HEAT ALERT: Protect sensitive crops from extreme heat."),
+    ("alerts", "temperature", "<", 5, "FROST ALERT: Take measures to protect crops from frost."),
+    ("alerts", "rainfall", ">", 3.0, "HEAVY RAIN ALERT: Check for potential flooding and ensure proper drainage."),
+    ("farming_tips", "temperature", "between", (20, 30), "Optimal temperature for most crop growth and development."),
+    ("farming_tips", "humidity", ">", 70, "High humidity increases disease risk. Monitor crops for fungal infections."),
+    ("farming_tips", "humidity", "<", 40, "Low humidity may cause excessive transpiration. Consider shade for sensitive crops."),
+    ("farming_tips", "description", "contains", "rain", "Current rainfall presents a good opportunity for transplanting seedlings."),
+]
+LIST_GROUPS = ["alerts", "farming_tips"]
+
+# Operators work on scalars and, through NumPy's overloads, on arrays alike;
+# only "contains" needs a separate array version
+OPERATORS = {
+    ">": operator.gt,
+    "<": operator.lt,
+    ">=": operator.ge,
+    "<=": operator.le,
+    "between": lambda value, bounds: (value >= bounds[0]) & (value <= bounds[1]),
+    "contains": lambda text, part: text is not None and part in text.lower(),
+    "always": lambda value, _: True,
+}
+
+def level_for(value, bands):
+    """Level of a single value in a band table; NaN gets the last level."""
+    if value != value:
+        # NaN fails every bound, as it did the original chained comparisons
+        return bands[-1][1]
+    return bands[bisect.bisect_left([bound for bound, _ in bands], value)][1]
+
+def recommendations(weather_data):
+    """Evaluate the rule table for one observation (a WeatherAPI weather dict)."""
+    result = {"watering_advice": "", "alerts": [], "farming_tips": []}
+    for group, field, name, value, message in RULES:
+        if group == "watering_advice" and result["watering_advice"]:
+            continue
+        if OPERATORS[name](weather_data.get(field), value):
+            if group == "watering_advice":
+                result["watering_advice"] = message
+            else:
+                result[group].append(message)
+    return result
+
+def level_codes_many(values, bands):
+    """Positions in a band table of an array of values (0 for the first level); NaN gets the last level."""
+    import numpy as np
+
+    bounds = np.array([bound for bound, _ in bands], dtype=np.float64)
+    codes = np.searchsorted(bounds, np.asarray(values, dtype=np.float64), side="left")
+    # NaN sorts after every bound, inf included, which would index past the table
+    return np.minimum(codes, len(bands) - 1)
+
+def levels_many(values, bands):
+    """Levels of an array of values in a band table, as an array of strings."""
+    import numpy as np
+
+    return np.array([level for _, level in bands])[level_codes_many(values, bands)]
+
+def _matches_many(columns, field, name, value, count):
+    import numpy as np
+
+    if name == "always":
+        return np.ones(count, dtype=bool)
+    if name == "contains":
+        text = columns.get(field)
+        if text is None:
+            return np.zeros(count, dtype=bool)
+        return np.char.find(np.char.lower(np.asarray(text, dtype=str)), value) >= 0
+    return np.asarray(OPERATORS[name](columns[field], value), dtype=bool)
+
+def evaluate_many(temperature, humidity, rainfall, description=None):
+    """
+    Evaluate the rule table over arrays of observations in one pass.
+
+    Args:
+        temperature, humidity, rainfall: Equal-length arrays (°C, %, mm)
+        description: Optional array of weather descriptions
+
+    Returns:
+        Dict with "humidity_level" and "rainfall_level" string arrays,
+        "watering_advice" (array of messages), "alerts" and "farming_tips"
+        (boolean arrays, observation x rule, whose columns follow
+        "alert_messages" and "farming_tip_messages")
+    """
+    import numpy as np
+
+    columns = {
+        "temperature": np.asarray(temperature, dtype=np.float64),
+        "humidity": np.asarray(humidity, dtype=np.float64),
+        "rainfall": np.asarray(rainfall, dtype=np.float64),
+        "description": description,
+    }
+    count = len(columns["temperature"])
+
+    watering_rules = [rule for rule in RULES if rule[0] == "watering_advice"]
+    conditions = [_matches_many(columns, field, name, value, count) for _, field, name, value, _ in watering_rules]
+    messages = np.array([message for *_, message in watering_rules], dtype=object)
+    result = {
+        "humidity_level": levels_many(columns["humidity"], HUMIDITY_LEVELS),
+        "rainfall_level": levels_many(columns["rainfall"], RAINFALL_LEVELS),
+        # First matching rule per observation (the last rule always matches)
+        "watering_advice": messages[np.argmax(np.stack(conditions, axis=1), axis=1)],
+    }
+    for group in LIST_GROUPS:
+        group_rules = [rule for rule in RULES if rule[0] == group]
+        result[group] = np.stack([_matches_many(columns, field, name, value, count)
+                                  for _, field, name, value, _ in group_rules], axis=1)
+        result[f"{group[:-1]}_messages"] = [message for *_, message in group_rules]
+    return result
+
+def recommendations_at(result, i):
+    """The recommendations dict of observation i from an evaluate_many result."""
+    return {
+        "watering_advice": result["watering_advice"][i],
+        "alerts": [message for message, hit in zip(result["alert_messages"], result["alerts"][i]) if hit],
+        "farming_tips": [message for message, hit in zip(result["farming_tip_messages"], result["farming_tips"][i]) if hit],
+    }
@@ -2,11 +2,19 @@
 from flask import Flask, render_template, request, jsonify, url_for
 from agri_wiz import AgriWiz
 from weather_api import WeatherAPI, get_humidity_level, get_rainfall_level
+from shared_state import SharedState
 import os
 
 app = Flask(__name__, static_url_path='/static', static_folder='static')
 agri_wiz = AgriWiz()
+agri_wiz.build_location_view(background=True)
 weather_api = WeatherAPI()
+# Workers (e.g. under gunicorn) each hold a copy of the data; see shared_state.py
+shared_state = SharedState(agri_wiz, weather_api)
+
+@app.before_request
+def refresh_shared_state():
+    shared_state.refresh()
 
 @app.route('/')
 def index():
@@ -36,6 +44,22 @@ def get_weather(location):
     except Exception as e:
         return jsonify({'error': str(e)}), 400
 
+def get_alternatives(data, params):
+    """Rank partial matches for the request, tunable through top_k and min_match."""
+    alternatives = agri_wiz.get_alternatives(
+        params['soil_type'],
+        params['climate'],
+        params['season'],
+        params.get('humidity'),
+        params.get('soil_fertility'),
+        top_k=int(data.get('top_k', 5)),
+        min_match=float(data.get('min_match', 60))
+    )
+    return [
+        dict(crop.to_dict(), match_percentage=round(percentage, 1))
+        for crop, _, percentage in alternatives
+    ]
+
 @app.route('/api/recommendations', methods=['POST'])
 def get_recommendations():
     data = request.json
@@ -46,8 +70,14 @@ def get_recommendations():
                 data.get('humidity'),
                 data.get('soil_fertility')
             )
+            if recommendations is None:
+                return jsonify({
+                    'recommendations': recommendations,
+                    'details': details
+                })
             return jsonify({
-                'recommendations': recommendations,
+                'recommendations': [crop.to_dict() for crop in recommendations],
+                'alternatives': get_alternatives(data, details),
                 'details': details
             })
         else:
@@ -59,19 +89,26 @@ def get_recommendations():
                 data.get('humidity'),
                 data.get('soil_fertility')
             )
-            return jsonify({'recommendations': recommendations})
+            return jsonify({
+                'recommendations': [crop.to_dict() for crop in recommendations],
+                'alternatives': get_alternatives(data, data)
+            })
     except Exception as e:
         return jsonify({'error': str(e)}), 400
 
 @app.route('/api/crops')
 def get_crops():
-    return jsonify(agri_wiz.crop_data)
+    return jsonify([crop.to_dict() for crop in agri_wiz.crop_data])
 
 @app.route('/api/crops', methods=['POST'])
 def add_crop():
     crop_data = request.json
     try:
-        agri_wiz.add_crop(crop_data)
+        with shared_state.update('crops'):
+            if isinstance(crop_data, list):
+                count = agri_wiz.add_crops_bulk(crop_data)
+                return jsonify({'message': f'{count} crops added successfully'})
+            agri_wiz.add_crop(crop_data)
         return jsonify({'message': 'Crop added successfully'})
     except Exception as e:
         return jsonify({'error': str(e)}), 400
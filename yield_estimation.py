@@ -148,6 +148,77 @@ class YieldEstimator:
             }
         }
     
+    def estimate_yield_batch(self, crop_names, soil_fertility=("medium",), water_availability=("medium",),
+                             climate_match=("fair",), farm_management=(0.5,), land_area=(1.0,),
+                             price_per_unit=None, grid=True):
+        """
+        Estimate yields (and revenue) for many crops and conditions at once (requires NumPy).
+        
+        Gives the same numbers as estimate_yield and estimate_revenue, computed
+        with NumPy broadcasting instead of one call per combination.
+        
+        Args:
+            crop_names: Sequence of crop names (first axis of every result)
+            soil_fertility, water_availability, climate_match, farm_management,
+                land_area: Sequences of condition values. With grid=True each
+                is its own axis, so the result covers every combination; with
+                grid=False they are equal-length columns (length-1 ones
+                broadcast) describing one scenario per row.
+            price_per_unit: Optional price, a scalar or one per crop
+            grid: Whether to combine the conditions as a grid or as columns
+            
+        Returns:
+            Dict of float arrays shaped (crops, fertility, water, climate,
+            management, area) for a grid, or (crops, scenarios) otherwise:
+            yield_per_hectare, total_yield, low, high and, with a price,
+            expected_revenue, revenue_low, revenue_high. Entries for crops
+            without yield data are NaN; "valid" marks the crops that have it.
+        """
+        import numpy as np
+        
+        def factors(values, table, default):
+            return np.array([table.get(value, default) for value in values], dtype=np.float64)
+        
+        axes = [
+            factors(soil_fertility, self.soil_fertility_factors, 1.0),
+            factors(water_availability, self.water_availability_factors, 1.0),
+            factors(climate_match, self.climate_match_factors, 0.9),
+            np.clip(np.asarray(farm_management, dtype=np.float64), 0, 1),
+            np.asarray(land_area, dtype=np.float64),
+        ]
+        if grid:
+            # Give condition k its own axis k + 1, after the crop axis
+            axes = [axis.reshape((1,) * (k + 1) + (-1,) + (1,) * (len(axes) - k - 1)) for k, axis in enumerate(axes)]
+        else:
+            axes = [axis[np.newaxis, :] for axis in axes]
+        soil_factor, water_factor, climate_factor, management, area = axes
+        
+        yields = np.array([self.base_yields.get(name, (np.nan, np.nan)) for name in crop_names], dtype=np.float64)
+        shape = (len(crop_names),) + (1,) * (len(axes) if grid else 1)
+        min_yield = yields[:, 0].reshape(shape)
+        max_yield = yields[:, 1].reshape(shape)
+        
+        # Same operations, in the same order, as estimate_yield
+        combined_factor = soil_factor * water_factor * climate_factor
+        adjusted_min_yield = min_yield * combined_factor * 0.9
+        adjusted_max_yield = max_yield * combined_factor * 1.1
+        expected_yield = adjusted_min_yield + management * (adjusted_max_yield - adjusted_min_yield)
+        total_yield = expected_yield * area
+        
+        result = {
+            "valid": ~np.isnan(yields[:, 0]),
+            "yield_per_hectare": np.broadcast_to(expected_yield, total_yield.shape),
+            "total_yield": total_yield,
+            "low": total_yield * 0.8,
+            "high": total_yield * 1.2,
+        }
+        if price_per_unit is not None:
+            price = np.broadcast_to(np.asarray(price_per_unit, dtype=np.float64), (len(crop_names),)).reshape(shape)
+            result["expected_revenue"] = total_yield * price
+            result["revenue_low"] = result["low"] * price
+            result["revenue_high"] = result["high"] * price
+        return result
+    
     def estimate_revenue(self, yield_data, price_per_unit):
         """
         Estimate revenue based on yield and market price.
@@ -0,0 +1,195 @@
+#!/usr/bin/env python
+# Yield Simulation Module for Agri Wiz
+# Monte Carlo yield and revenue risk estimates built on YieldEstimator
+
+import os
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from yield_estimation import YieldEstimator
+from weather_rules import RAINFALL_LEVELS, level_codes_many
+
+# Yields and revenues are counted in log-spaced histogram bins, so a run's
+# memory does not depend on the number of samples: BINS_PER_DECADE bins per
+# factor of ten between HISTOGRAM_MIN and HISTOGRAM_MIN * 10 ** HISTOGRAM_DECADES
+# (relative error of a percentile below 0.25%)
+HISTOGRAM_MIN = 1e-3
+HISTOGRAM_DECADES = 15
+BINS_PER_DECADE = 1000
+BINS = HISTOGRAM_DECADES * BINS_PER_DECADE
+
+RAINFALL_LEVEL_NAMES = [level for _, level in RAINFALL_LEVELS]
+
+def _histogram(values):
+    """Counts of values per log-spaced bin."""
+    positions = (np.log10(np.maximum(values, HISTOGRAM_MIN)) - np.log10(HISTOGRAM_MIN)) * BINS_PER_DECADE
+    return np.bincount(np.clip(positions.astype(np.int64), 0, BINS - 1), minlength=BINS)
+
+def _percentile(counts, q):
+    """Value below which q percent of the histogram's samples fall, interpolated within its bin."""
+    cumulative = np.cumsum(counts)
+    target = q / 100 * cumulative[-1]
+    position = min(int(np.searchsorted(cumulative, target)), BINS - 1)
+    before = cumulative[position - 1] if position else 0
+    fraction = (target - before) / counts[position] if counts[position] else 0.0
+    return float(10 ** (np.log10(HISTOGRAM_MIN) + (position + fraction) / BINS_PER_DECADE))
+
+def _simulate_chunk(task):
+    """Simulate one chunk of samples for every crop; returns (yield counts, revenue counts, yield sums, revenue sums)."""
+    (estimator, crop_names, conditions, prices, rainfall_codes, water_needs,
+     condition_volatility, price_volatility, management_spread, size, seed) = task
+    rng = np.random.default_rng(seed)
+    yield_counts = np.zeros((len(crop_names), BINS), dtype=np.int64)
+    revenue_counts = np.zeros((len(crop_names), BINS), dtype=np.int64)
+    yield_sums = np.zeros(len(crop_names))
+    revenue_sums = np.zeros(len(crop_names))
+
+    for c, crop_name in enumerate(crop_names):
+        management = conditions.get("farm_management", 0.5) + rng.normal(0, management_spread, size)
+        needs = water_needs.get(crop_name)
+        if rainfall_codes is not None and needs:
+            # Water availability from the rainfall level of a randomly drawn observation
+            water_by_level = np.array([estimator.determine_water_availability(needs, level)
+                                       for level in RAINFALL_LEVEL_NAMES])
+            water = water_by_level[rainfall_codes[rng.integers(0, len(rainfall_codes), size)]]
+        else:
+            water = [conditions.get("water_availability", "medium")]
+
+        result = estimator.estimate_yield_batch(
+            [crop_name], [conditions.get("soil_fertility", "medium")], water,
+            [conditions.get("climate_match", "fair")], management, [conditions.get("land_area", 1.0)], grid=False
+        )
+        # Unmodelled variation of the condition factors, mean 1 (yield is proportional to the combined factor)
+        total_yield = result["total_yield"][0] * rng.lognormal(-condition_volatility ** 2 / 2, condition_volatility, size)
+        price = prices[crop_name] * rng.lognormal(-price_volatility ** 2 / 2, price_volatility, size)
+        revenue = total_yield * price
+
+        yield_counts[c] = _histogram(total_yield)
+        revenue_counts[c] = _histogram(revenue)
+        yield_sums[c] = total_yield.sum()
+        revenue_sums[c] = revenue.sum()
+    return yield_counts, revenue_counts, yield_sums, revenue_sums
+
+def simulate_yield_risk(crop_names, conditions, prices, samples=100000, seed=None, rainfall=None, water_needs=None,
+                        condition_volatility=0.1, price_volatility=0.2, management_spread=0.1,
+                        percentiles=(5, 25, 50, 75, 95), var_level=0.95, chunk_size=50000, processes=None,
+                        estimator=None):
+    """
+    Monte Carlo distribution of yield and revenue per crop.
+
+    Each sample draws the farm management level around conditions["farm_management"],
+    a lognormal factor for the other conditions, a lognormal price around
+    the given one and, when rainfall observations are given, the water
+    availability implied by a randomly chosen observation.
+
+    Args:
+        crop_names: Crops to simulate
+        conditions: Conditions dict as for YieldEstimator.estimate_yield
+        prices: Dict of crop name -> expected price per unit (or one price for all)
+        samples: Number of samples per crop
+        seed: Seed for reproducible results (with the same chunk_size, whatever processes is)
+        rainfall: Optional sequence of rainfall readings in mm, e.g. from
+            WeatherHistory.query or SyntheticWeather.grid
+        water_needs: Dict of crop name -> low/medium/high water needs, used with rainfall
+        condition_volatility, price_volatility: Standard deviations of the log factors
+        management_spread: Standard deviation of the farm management level
+        percentiles: Percentiles to report
+        var_level: Confidence level of the value at risk
+        chunk_size: Samples simulated at a time, bounding memory use
+        processes: Worker processes for the chunks (None or 1 runs in this process)
+        estimator: YieldEstimator to use
+
+    Returns:
+        Dict of crop name -> dict with "yield" and "revenue" summaries (mean
+        and percentiles; revenue also "value_at_risk": the shortfall from the
+        mean revenue not exceeded with probability var_level), or an error
+        dict for crops without yield data
+
+    Raises:
+        ValueError: If samples or chunk_size is below 1, a crop with yield
+            data has no price, or a rainfall reading is NaN
+    """
+    if samples < 1:
+        raise ValueError(f"samples must be at least 1, got {samples}")
+    if chunk_size < 1:
+        raise ValueError(f"chunk_size must be at least 1, got {chunk_size}")
+    estimator = estimator or YieldEstimator()
+    if not isinstance(prices, dict):
+        prices = dict.fromkeys(crop_names, prices)
+    results = {
+        name: {"status": "error", "message": f"Yield data not available for {name}"}
+        for name in crop_names if name not in estimator.base_yields
+    }
+    crops = [name for name in crop_names if name in estimator.base_yields]
+    missing_prices = [name for name in crops if name not in prices]
+    if missing_prices:
+        raise ValueError(f"No price given for {', '.join(missing_prices)}")
+    rainfall_codes = None
+    if rainfall is not None and len(rainfall):
+        rainfall = np.asarray(rainfall, dtype=np.float64)
+        if np.isnan(rainfall).any():
+            # A NaN reading has no rainfall level to draw water availability from
+            raise ValueError("rainfall readings must not contain NaN; drop missing observations first")
+        rainfall_codes = level_codes_many(rainfall, RAINFALL_LEVELS)
+
+    # One seed per chunk, so the samples are the same however the chunks are run
+    seed_sequence = np.random.SeedSequence(seed)
+    sizes = [min(chunk_size, samples - start) for start in range(0, samples, chunk_size)]
+    tasks = [
+        (estimator, crops, conditions, prices, rainfall_codes, water_needs or {},
+         condition_volatility, price_volatility, management_spread, size, child)
+        for size, child in zip(sizes, seed_sequence.spawn(len(sizes)))
+    ]
+    yield_counts = np.zeros((len(crops), BINS), dtype=np.int64)
+    revenue_counts = np.zeros((len(crops), BINS), dtype=np.int64)
+    yield_sums = np.zeros(len(crops))
+    revenue_sums = np.zeros(len(crops))
+
+    pool = ProcessPoolExecutor(max_workers=processes) if processes and processes > 1 and len(tasks) > 1 else None
+    try:
+        chunk_results = pool.map(_simulate_chunk, tasks) if pool else map(_simulate_chunk, tasks)
+        # Added in chunk order, so the sums do not depend on which chunk finished first
+        for chunk_yield_counts, chunk_revenue_counts, chunk_yield_sums, chunk_revenue_sums in chunk_results:
+            yield_counts += chunk_yield_counts
+            revenue_counts += chunk_revenue_counts
+            yield_sums += chunk_yield_sums
+            revenue_sums += chunk_revenue_sums
+    finally:
+        if pool:
+            pool.shutdown()
+
+    for c, name in enumerate(crops):
+        mean_revenue = float(revenue_sums[c] / samples)
+        results[name] = {
+            "status": "success",
+            "samples": samples,
+            "yield": {
+                "mean": float(yield_sums[c] / samples),
+                "percentiles": {q: _percentile(yield_counts[c], q) for q in percentiles}
+            },
+            "revenue": {
+                "mean": mean_revenue,
+                "percentiles": {q: _percentile(revenue_counts[c], q) for q in percentiles},
+                "value_at_risk": mean_revenue - _percentile(revenue_counts[c], 100 * (1 - var_level))
+            },
+            "unit": "tons" if name != "Coconut" else "nuts",
+            "seed": seed_sequence.entropy
+        }
+    return {name: results[name] for name in crop_names}
+
+# Simple test if run directly
+if __name__ == "__main__":
+    conditions = {
+        "soil_fertility": "high",
+        "water_availability": "medium",
+        "climate_match": "good",
+        "farm_management": 0.7,
+        "land_area": 5.0
+    }
+    prices = {"Rice": 400, "Wheat": 350, "Cotton": 1500}
+    risk = simulate_yield_risk(list(prices), conditions, prices, samples=200000, seed=42,
+                               processes=os.cpu_count())
+    for crop_name, summary in risk.items():
+        revenue = summary["revenue"]
+        print(f"{crop_name}: mean revenue ${revenue['mean']:,.0f}, "
+              f"5th-95th percentile ${revenue['percentiles'][5]:,.0f} - ${revenue['percentiles'][95]:,.0f}, "
+              f"95% VaR ${revenue['value_at_risk']:,.0f}")